@@ -1,3 +1,21 @@
 from django.contrib import admin
 
 # Register your models here.
+
+from .models import ClaveIdempotencia, EventoOutbox
+
+
+@admin.register(ClaveIdempotencia)
+class ClaveIdempotenciaAdmin(admin.ModelAdmin):
+    list_display = ['alcance', 'clave', 'usuario', 'estado_http', 'fecha_creacion', 'expira']
+    list_filter = ['alcance']
+    search_fields = ['clave']
+    raw_id_fields = ['usuario']
+    exclude = ['respuesta']
+
+
+@admin.register(EventoOutbox)
+class EventoOutboxAdmin(admin.ModelAdmin):
+    list_display = ['id', 'tipo', 'estado', 'intentos', 'fecha_creacion', 'disponible_desde', 'fecha_procesado']
+    list_filter = ['estado', 'tipo']
+    readonly_fields = ['fecha_creacion', 'fecha_procesado']
@@ -0,0 +1,96 @@
+"""
+Router de base de datos para enviar las lecturas analíticas a una réplica.
+
+Solo las lecturas hechas dentro de use_replica() (reportes, dashboard y
+datos de entrenamiento del modelo) van al alias 'replica'. Todo lo demás
+(escrituras, checkout, autenticación) sigue en 'default'. Si la réplica no
+está configurada o no responde, las lecturas vuelven al primario.
+"""
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DatabaseError, DEFAULT_DB_ALIAS, connections
+
+logger = logging.getLogger(__name__)
+
+REPLICA_ALIAS = 'replica'
+
+# Apps cuyos modelos pueden leerse desde la réplica. Usuarios y tokens se
+# leen siempre del primario para no sufrir el retraso de replicación.
+REPLICA_APP_LABELS = {'sales', 'products', 'payments'}
+
+_analytics_reads = ContextVar('analytics_reads', default=False)
+
+_replica_state = {'checked_at': None, 'available': False}
+_replica_lock = threading.Lock()
+
+
+@contextmanager
+def use_replica():
+    """
+    Envía a la réplica las lecturas del bloque. Sirve también como
+    decorador: @use_replica()
+    """
+    token = _analytics_reads.set(True)
+    try:
+        yield
+    finally:
+        _analytics_reads.reset(token)
+
+
+def replica_available():
+    """
+    Indica si la réplica está configurada y responde. El resultado se
+    reutiliza durante DB_REPLICA_RECHECK_SECONDS para no probar la conexión
+    en cada consulta.
+    """
+    if REPLICA_ALIAS not in settings.DATABASES:
+        return False
+
+    recheck = getattr(settings, 'DB_REPLICA_RECHECK_SECONDS', 30)
+    now = time.monotonic()
+    with _replica_lock:
+        checked_at = _replica_state['checked_at']
+        if checked_at is not None and now - checked_at < recheck:
+            return _replica_state['available']
+
+    try:
+        connections[REPLICA_ALIAS].ensure_connection()
+        available = True
+    except DatabaseError as e:
+        logger.warning(f"⚠️ Réplica no disponible, usando el primario: {e}")
+        available = False
+
+    with _replica_lock:
+        _replica_state['checked_at'] = now
+        _replica_state['available'] = available
+    return available
+
+
+class AnalyticsReplicaRouter:
+
+    def db_for_read(self, model, **hints):
+        if not _analytics_reads.get():
+            return None
+        if model._meta.app_label not in REPLICA_APP_LABELS:
+            return None
+        # Dentro de una transacción del primario se leen las propias escrituras
+        if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return None
+        if not replica_available():
+            return None
+        return REPLICA_ALIAS
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # La réplica tiene los mismos datos que el primario
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return None
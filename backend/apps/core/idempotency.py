@@ -0,0 +1,149 @@
+"""
+Soporte de la cabecera Idempotency-Key para endpoints que crean recursos
+(checkout, pagos).
+
+La primera petición con una clave inserta una fila ClaveIdempotencia en la
+misma transacción que ejecuta la vista y guarda la respuesta comprimida.
+Una petición simultánea con la misma clave choca con la restricción única
+(en PostgreSQL espera a que la primera termine) y devuelve la respuesta
+guardada sin repetir el trabajo. Los reintentos posteriores se resuelven
+desde el caché, sin tocar la BD.
+
+Solo se guardan las respuestas 2xx: si la vista falla, la clave se libera
+y el cliente puede reintentar.
+"""
+import hashlib
+import json
+import zlib
+from datetime import timedelta
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.response import Response
+
+from .models import ClaveIdempotencia
+
+HEADER = 'Idempotency-Key'
+MAX_LONGITUD_CLAVE = 255
+
+
+def _ttl():
+    return timedelta(hours=getattr(settings, 'IDEMPOTENCY_TTL_HOURS', 24))
+
+
+def _huella(request):
+    contenido = json.dumps(request.data, sort_keys=True, cls=DjangoJSONEncoder, default=str)
+    return hashlib.sha256(f"{request.method}:{request.path}:{contenido}".encode()).hexdigest()
+
+
+def _cache_key(usuario_id, alcance, clave):
+    digest = hashlib.sha256(clave.encode()).hexdigest()
+    return f"idempotencia:{usuario_id}:{alcance}:{digest}"
+
+
+def _comprimir(data):
+    return zlib.compress(json.dumps(data, cls=DjangoJSONEncoder, separators=(',', ':')).encode())
+
+
+def _reproducir(huella, guardada_huella, estado_http, respuesta):
+    if huella != guardada_huella:
+        return Response(
+            {'error': f'La {HEADER} ya se usó con otro contenido'},
+            status=status.HTTP_422_UNPROCESSABLE_ENTITY,
+        )
+    data = json.loads(zlib.decompress(bytes(respuesta))) if respuesta else None
+    response = Response(data, status=estado_http)
+    response['Idempotent-Replayed'] = 'true'
+    return response
+
+
+def _reclamar(usuario, alcance, clave, huella):
+    """
+    Inserta la clave. Devuelve None si esta petición debe ejecutar la vista,
+    o la fila existente si otra ya la ejecutó.
+    """
+    for _ in range(2):
+        try:
+            with transaction.atomic():
+                ClaveIdempotencia.objects.create(
+                    usuario=usuario, alcance=alcance, clave=clave, huella=huella,
+                    expira=timezone.now() + _ttl(),
+                )
+            return None
+        except IntegrityError:
+            existente = ClaveIdempotencia.objects.select_for_update().filter(
+                usuario=usuario, alcance=alcance, clave=clave
+            ).first()
+            if existente is None:
+                continue  # Se liberó mientras tanto: reintentar la inserción
+            if existente.expira <= timezone.now():
+                existente.delete()
+                continue
+            return existente
+    raise IntegrityError(f"No se pudo reservar la {HEADER}")
+
+
+def idempotente(alcance):
+    """
+    Decorador para métodos de ViewSet (self, request, ...). Sin la cabecera
+    Idempotency-Key la vista se ejecuta normalmente.
+    """
+    def decorador(func):
+        @wraps(func)
+        def wrapper(self, request, *args, **kwargs):
+            clave = request.headers.get(HEADER)
+            if not clave or not request.user.is_authenticated:
+                return func(self, request, *args, **kwargs)
+            if len(clave) > MAX_LONGITUD_CLAVE:
+                return Response(
+                    {'error': f'{HEADER} no puede superar {MAX_LONGITUD_CLAVE} caracteres'},
+                    status=status.HTTP_400_BAD_REQUEST,
+                )
+
+            huella = _huella(request)
+            cache_key = _cache_key(request.user.pk, alcance, clave)
+            guardada = cache.get(cache_key)
+            if guardada is not None:
+                return _reproducir(huella, *guardada)
+
+            with transaction.atomic():
+                existente = _reclamar(request.user, alcance, clave, huella)
+                if existente is not None:
+                    if existente.estado_http is None:
+                        return Response(
+                            {'error': 'Hay una petición en curso con la misma clave'},
+                            status=status.HTTP_409_CONFLICT,
+                        )
+                    return _reproducir(huella, existente.huella, existente.estado_http, existente.respuesta)
+
+                response = func(self, request, *args, **kwargs)
+
+                if not 200 <= response.status_code < 300:
+                    # No se guarda: el cliente puede corregir y reintentar con la misma clave
+                    ClaveIdempotencia.objects.filter(
+                        usuario=request.user, alcance=alcance, clave=clave
+                    ).delete()
+                    return response
+
+                respuesta = _comprimir(response.data)
+                ClaveIdempotencia.objects.filter(
+                    usuario=request.user, alcance=alcance, clave=clave
+                ).update(estado_http=response.status_code, respuesta=respuesta)
+
+                guardada = (huella, response.status_code, respuesta)
+                timeout = int(_ttl().total_seconds())
+                transaction.on_commit(lambda: cache.set(cache_key, guardada, timeout))
+            return response
+        return wrapper
+    return decorador
+
+
+def limpiar_expiradas():
+    """Borra las claves vencidas. Devuelve cuántas se borraron."""
+    borradas, _ = ClaveIdempotencia.objects.filter(expira__lte=timezone.now()).delete()
+    return borradas
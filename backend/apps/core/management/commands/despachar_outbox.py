@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+
+from apps.core.outbox import despachar, purgar_procesados
+
+
+class Command(BaseCommand):
+    help = 'Entrega los eventos pendientes del outbox a sus manejadores'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--continuo', action='store_true', help='No termina: espera nuevos eventos')
+        parser.add_argument('--intervalo', type=float, default=1.0, help='Segundos de espera sin eventos (--continuo)')
+        parser.add_argument('--lote', type=int, help='Eventos por lote (por defecto OUTBOX_BATCH_SIZE)')
+        parser.add_argument('--purgar', action='store_true', help='Además borra los procesados más viejos que OUTBOX_RETENTION_DAYS')
+
+    def handle(self, *args, **options):
+        if options['purgar']:
+            borrados = purgar_procesados()
+            self.stdout.write(self.style.SUCCESS(f"✅ {borrados} eventos procesados borrados"))
+
+        if options['continuo']:
+            self.stdout.write("📬 Despachando eventos del outbox (Ctrl+C para salir)...")
+        try:
+            procesados, fallidos = despachar(
+                limite=options['lote'], continuo=options['continuo'], intervalo=options['intervalo']
+            )
+        except KeyboardInterrupt:
+            return
+        self.stdout.write(self.style.SUCCESS(f"✅ {procesados} eventos procesados, {fallidos} fallidos"))
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from apps.core.idempotency import limpiar_expiradas
+
+
+class Command(BaseCommand):
+    help = 'Borra las claves de idempotencia vencidas'
+
+    def handle(self, *args, **options):
+        borradas = limpiar_expiradas()
+        self.stdout.write(self.style.SUCCESS(f"✅ {borradas} claves de idempotencia vencidas borradas"))
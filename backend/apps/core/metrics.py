@@ -0,0 +1,117 @@
+"""
+Registro de métricas en memoria del proceso.
+
+Cada worker (gunicorn/runserver) mantiene sus propios histogramas; el
+endpoint /api/core/metrics/ los expone en formato de texto de Prometheus
+para que el scraper los agregue.
+"""
+import threading
+from bisect import bisect_left
+
+# Buckets por defecto (segundos), los mismos que usa el cliente oficial de Prometheus
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _escape_label(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value))
+
+
+class Histogram:
+    """
+    Histograma con etiquetas. Guarda, por cada combinación de etiquetas,
+    el conteo por bucket, la suma y el total de observaciones.
+    """
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(str(labels.get(label, '')) for label in self.labelnames)
+        # El último índice corresponde al bucket +Inf
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def snapshot(self):
+        """Copia consistente de las series: {etiquetas: (buckets, suma, conteo)}"""
+        with self._lock:
+            return {
+                key: (list(counts), total, count)
+                for key, (counts, total, count) in self._series.items()
+            }
+
+    def render(self):
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} histogram",
+        ]
+        for key, (counts, total, count) in sorted(self.snapshot().items()):
+            base_labels = [f'{name}="{_escape_label(value)}"' for name, value in zip(self.labelnames, key)]
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += bucket_count
+                labels = ','.join(base_labels + [f'le="{_format_value(bound)}"'])
+                lines.append(f"{self.name}_bucket{{{labels}}} {cumulative}")
+            labels = '{' + ','.join(base_labels) + '}' if base_labels else ''
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        """Obtiene (o registra) un histograma por nombre."""
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = Histogram(name, documentation, labelnames, buckets)
+            return metric
+
+    def render(self):
+        """Exposición en formato de texto de Prometheus (version 0.0.4)."""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+registry = MetricsRegistry()
+
+REQUEST_DURATION = registry.histogram(
+    'smartsales_request_duration_seconds',
+    'Tiempo total de respuesta por vista.',
+    labelnames=('view', 'method', 'status'),
+)
+DB_DURATION = registry.histogram(
+    'smartsales_db_duration_seconds',
+    'Tiempo acumulado en la base de datos por request.',
+    labelnames=('view', 'method'),
+)
+DB_QUERIES = registry.histogram(
+    'smartsales_db_queries_per_request',
+    'Cantidad de consultas SQL ejecutadas por request.',
+    labelnames=('view', 'method'),
+    buckets=(0, 1, 2, 5, 10, 20, 50, 100, 200, 500),
+)
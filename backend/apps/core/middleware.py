@@ -1,3 +1,14 @@
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+
+from .metrics import REQUEST_DURATION, DB_DURATION, DB_QUERIES
+from .profiling import profile_request, should_profile
+from .querylog import SlowQueryRecorder
+
+
 class AdminNoAuthMiddleware:
     def __init__(self, get_response):
         self.get_response = get_response
@@ -8,6 +19,111 @@ class AdminNoAuthMiddleware:
             from django.contrib.auth.models import AnonymousUser
             request.user = AnonymousUser()
             # Para bypass completo, podrías crear un usuario mock aquí si es necesario
-        
+
         response = self.get_response(request)
-        return response
\ No newline at end of file
+        return response
+
+
+def get_view_name(request):
+    """Nombre estable de la vista resuelta (ej. 'producto-list')."""
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return 'unresolved'
+    return match.view_name or match._func_path
+
+
+class QueryCounter:
+    """
+    Execute wrapper que cuenta las consultas SQL y acumula su duración.
+    Se instala con connection.execute_wrapper() durante un request.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.count += 1
+            self.duration += time.perf_counter() - start
+
+
+class RequestMetricsMiddleware:
+    """
+    Mide el tiempo total, la cantidad de consultas y el tiempo en BD de cada
+    request. Los resultados se registran en los histogramas de
+    apps.core.metrics y se envían al cliente en el header Server-Timing.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.server_timing = getattr(settings, 'SERVER_TIMING_ENABLED', True)
+
+    def __call__(self, request):
+        counter = QueryCounter()
+        start = time.perf_counter()
+
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(counter))
+            response = self.get_response(request)
+
+        total = time.perf_counter() - start
+        view_name = get_view_name(request)
+
+        REQUEST_DURATION.observe(total, view=view_name, method=request.method, status=response.status_code)
+        DB_DURATION.observe(counter.duration, view=view_name, method=request.method)
+        DB_QUERIES.observe(counter.count, view=view_name, method=request.method)
+
+        if self.server_timing:
+            timings = [
+                f'app;dur={(total - counter.duration) * 1000:.1f}',
+                f'db;dur={counter.duration * 1000:.1f};desc="{counter.count} queries"',
+                f'total;dur={total * 1000:.1f}',
+            ]
+            existing = response.get('Server-Timing')
+            if existing:
+                timings.insert(0, existing)
+            response['Server-Timing'] = ', '.join(timings)
+
+        return response
+
+
+class SlowQueryLogMiddleware:
+    """
+    Instala SlowQueryRecorder en todas las conexiones durante el request
+    para agregar estadísticas por huella SQL y registrar las consultas lentas.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.threshold_ms = getattr(settings, 'SLOW_QUERY_THRESHOLD_MS', 200)
+
+    def __call__(self, request):
+        recorder = SlowQueryRecorder(lambda: get_view_name(request), self.threshold_ms)
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(recorder))
+            return self.get_response(request)
+
+
+class ProfilerMiddleware:
+    """
+    Perfilado opcional del request con cProfile (ver apps.core.profiling).
+    Envuelve get_response, así que la vista corre por el camino normal
+    (ATOMIC_REQUESTS, process_view de los demás middlewares). Va al final de
+    MIDDLEWARE para que el perfil no incluya al resto de los middlewares.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if should_profile(request):
+            response = profile_request(self.get_response, request, lambda: get_view_name(request))
+            if response is not None:
+                return response
+        return self.get_response(request)
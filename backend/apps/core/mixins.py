@@ -0,0 +1,85 @@
+import hashlib
+
+from django.db.models import Count, Max
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import http_date, quote_etag
+from rest_framework.response import Response
+
+from .db_router import use_replica
+
+
+class ReplicaReadMixin:
+    """
+    Para ViewSets de solo lectura analítica: las consultas de la vista se
+    leen desde la réplica (ver apps.core.db_router).
+    """
+
+    def dispatch(self, request, *args, **kwargs):
+        with use_replica():
+            return super().dispatch(request, *args, **kwargs)
+
+
+class ConditionalGetMixin:
+    """
+    GET condicional (ETag / Last-Modified) para ModelViewSets.
+
+    El ETag se calcula con una sola consulta de agregación sobre el queryset
+    filtrado: max(etag_field) + count, más la URL y el usuario. Si el cliente
+    envía If-None-Match (o If-Modified-Since en 'retrieve') y coincide, se
+    responde 304 sin serializar nada.
+
+    Solo detecta cambios en el propio modelo: si el serializer incluye datos
+    de otros modelos, estos deben actualizar etag_field al cambiar.
+    """
+    etag_field = 'fecha_actualizacion'
+    conditional_actions = ('list', 'retrieve')
+
+    def _etag(self, ultima, total):
+        user = getattr(self.request, 'user', None)
+        base = ':'.join([
+            self.get_queryset().model._meta.label,
+            ultima.isoformat() if ultima else '',
+            str(total),
+            self.request.get_full_path(),
+            str(getattr(user, 'pk', None)),
+        ])
+        return quote_etag(hashlib.md5(base.encode()).hexdigest())
+
+    def _respuesta_condicional(self, etag, ultima, generar):
+        last_modified = int(ultima.timestamp()) if ultima else None
+        response = get_conditional_response(self.request, etag=etag, last_modified=last_modified)
+        if response is None:
+            response = generar()
+            if response.status_code != 200:
+                return response
+
+        response['ETag'] = etag
+        if last_modified is not None:
+            response['Last-Modified'] = http_date(last_modified)
+        # Las respuestas dependen del usuario: no deben compartirse entre clientes
+        patch_vary_headers(response, ['Authorization', 'Cookie'])
+        patch_cache_control(response, private=True, no_cache=True)
+        return response
+
+    def list(self, request, *args, **kwargs):
+        if 'list' not in self.conditional_actions:
+            return super().list(request, *args, **kwargs)
+
+        resumen = self.filter_queryset(self.get_queryset()).order_by().aggregate(
+            ultima=Max(self.etag_field), total=Count('pk')
+        )
+        etag = self._etag(resumen['ultima'], resumen['total'])
+        # Sin Last-Modified en listas: una baja no cambia la fecha máxima
+        return self._respuesta_condicional(
+            etag, None, lambda: super(ConditionalGetMixin, self).list(request, *args, **kwargs)
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        if 'retrieve' not in self.conditional_actions:
+            return super().retrieve(request, *args, **kwargs)
+
+        instance = self.get_object()
+        ultima = getattr(instance, self.etag_field)
+        return self._respuesta_condicional(
+            self._etag(ultima, 1), ultima, lambda: Response(self.get_serializer(instance).data)
+        )
@@ -1,3 +1,8 @@
+from django.conf import settings
+from django.db import models
+from django.utils import timezone
+
+
 class AdminNoAuthMiddleware:
     def __init__(self, get_response):
         self.get_response = get_response
@@ -9,4 +14,78 @@ class AdminNoAuthMiddleware:
             request.user = AnonymousUser()
         
         response = self.get_response(request)
-        return response
\ No newline at end of file
+        return response
+
+
+class ClaveIdempotencia(models.Model):
+    """
+    Respuesta guardada para una Idempotency-Key (ver idempotency.py). La
+    restricción única (usuario, alcance, clave) hace que dos peticiones
+    simultáneas con la misma clave no puedan ejecutarse ambas.
+    """
+    usuario = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='+'
+    )
+    alcance = models.CharField(max_length=50)
+    clave = models.CharField(max_length=255)
+    # Hash del contenido de la petición: la misma clave con otro contenido es un error
+    huella = models.CharField(max_length=64)
+    estado_http = models.PositiveSmallIntegerField(null=True, blank=True)
+    # JSON de la respuesta comprimido con zlib
+    respuesta = models.BinaryField(null=True, blank=True)
+    fecha_creacion = models.DateTimeField(auto_now_add=True)
+    expira = models.DateTimeField(db_index=True)
+
+    class Meta:
+        verbose_name = 'Clave de idempotencia'
+        verbose_name_plural = 'Claves de idempotencia'
+        constraints = [
+            models.UniqueConstraint(fields=['usuario', 'alcance', 'clave'], name='core_idempotencia_unica'),
+        ]
+
+    def __str__(self):
+        return f"{self.alcance}:{self.clave} ({self.usuario_id})"
+
+
+class EventoOutbox(models.Model):
+    """
+    Evento de dominio (venta completada, pago confirmado...) escrito en la
+    misma transacción que lo origina. despachar_outbox lo entrega después a
+    los manejadores registrados (ver outbox.py).
+    """
+    PENDIENTE = 'PENDIENTE'
+    PROCESADO = 'PROCESADO'
+    FALLIDO = 'FALLIDO'
+    ESTADO_CHOICES = [
+        (PENDIENTE, 'Pendiente'),
+        (PROCESADO, 'Procesado'),
+        (FALLIDO, 'Fallido'),
+    ]
+
+    tipo = models.CharField(max_length=100)
+    payload = models.JSONField(default=dict)
+    estado = models.CharField(max_length=20, choices=ESTADO_CHOICES, default=PENDIENTE)
+    intentos = models.PositiveIntegerField(default=0)
+    # Reintentos con espera creciente: no se despacha antes de esta fecha
+    disponible_desde = models.DateTimeField(default=timezone.now)
+    ultimo_error = models.TextField(blank=True)
+    fecha_creacion = models.DateTimeField(auto_now_add=True)
+    fecha_procesado = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        verbose_name = 'Evento (outbox)'
+        verbose_name_plural = 'Eventos (outbox)'
+        ordering = ['id']
+        indexes = [
+            # Solo los pendientes: el índice no crece con el histórico procesado
+            models.Index(
+                fields=['disponible_desde', 'id'],
+                name='core_outbox_pendientes',
+                condition=models.Q(estado='PENDIENTE'),
+            ),
+        ]
+
+    def __str__(self):
+        return f"#{self.id} {self.tipo} ({self.estado})"
@@ -0,0 +1,202 @@
+"""
+Outbox transaccional para eventos de ventas y pagos.
+
+Quien completa una venta o un pago llama a publicar_evento() dentro de su
+propia transacción: el evento existe si y solo si el cambio se confirmó.
+Lo que deba reaccionar (resúmenes, puntos, totales de clientes, caché...)
+se registra como manejador y corre después, fuera del checkout:
+
+    # apps/<app>/handlers.py (se carga solo, al despachar)
+    from apps.core.outbox import manejador
+
+    @manejador('venta.completada')
+    def sumar_puntos(evento):
+        ...evento.payload['venta_id']...
+
+python manage.py despachar_outbox --continuo reclama lotes de pendientes
+con SELECT FOR UPDATE SKIP LOCKED (varios despachadores no se pisan) y
+confirma cada evento en su propia transacción. Si un manejador falla, sus
+cambios se revierten y el evento se reintenta con espera creciente hasta
+OUTBOX_MAX_ATTEMPTS.
+
+La entrega es "al menos una vez": un evento puede llegar de nuevo a un
+manejador (reintento tras fallar otro manejador del mismo evento, caída
+del despachador), así que los manejadores deben ser idempotentes. Tampoco
+se garantiza el orden entre eventos cuando hay reintentos.
+"""
+import json
+import logging
+import time
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+from django.utils.module_loading import autodiscover_modules
+
+from .models import EventoOutbox
+
+logger = logging.getLogger(__name__)
+
+# Espera máxima entre reintentos de un evento
+MAX_ESPERA = timedelta(hours=1)
+
+_manejadores = defaultdict(list)
+_descubiertos = False
+
+
+def manejador(tipo):
+    """Decorador: registra la función para los eventos de ese tipo."""
+    def registrar(funcion):
+        if funcion not in _manejadores[tipo]:
+            _manejadores[tipo].append(funcion)
+        return funcion
+    return registrar
+
+
+def manejadores(tipo):
+    global _descubiertos
+    if not _descubiertos:
+        # Importa apps/*/handlers.py, como el admin con admin.py
+        autodiscover_modules('handlers')
+        _descubiertos = True
+    return list(_manejadores.get(tipo, ()))
+
+
+def _serializable(payload):
+    # Decimal, fechas, UUID... como texto, igual que en las respuestas de la API
+    return json.loads(json.dumps(payload, cls=DjangoJSONEncoder))
+
+
+def publicar_evento(tipo, payload, using=None):
+    """
+    Escribe el evento en la transacción actual. Debe llamarse dentro del
+    mismo transaction.atomic() que el cambio que lo origina.
+    """
+    return EventoOutbox.objects.using(using).create(tipo=tipo, payload=_serializable(payload))
+
+
+def publicar_eventos(eventos, using=None):
+    """Varios eventos [(tipo, payload), ...] con un solo INSERT."""
+    return EventoOutbox.objects.using(using).bulk_create([
+        EventoOutbox(tipo=tipo, payload=_serializable(payload)) for tipo, payload in eventos
+    ])
+
+
+def _espera(intentos):
+    return min(timedelta(seconds=2 ** intentos), MAX_ESPERA)
+
+
+def _reclamar(limite):
+    """
+    Toma hasta 'limite' eventos pendientes y corre su disponible_desde hasta
+    el fin de la reserva: los demás despachadores los saltan mientras tanto.
+    La transacción dura solo el SELECT FOR UPDATE y el UPDATE. Devuelve
+    (ids, reserva).
+    """
+    reserva = timezone.now() + timedelta(seconds=getattr(settings, 'OUTBOX_LEASE_SECONDS', 300))
+    with transaction.atomic():
+        ids = list(
+            EventoOutbox.objects.select_for_update(skip_locked=True)
+            .filter(estado=EventoOutbox.PENDIENTE, disponible_desde__lte=timezone.now())
+            .order_by('disponible_desde', 'id')
+            .values_list('id', flat=True)[:limite]
+        )
+        EventoOutbox.objects.filter(id__in=ids).update(disponible_desde=reserva)
+    return ids, reserva
+
+
+def _despachar_evento(evento_id, reserva, max_intentos):
+    """
+    Corre los manejadores de un evento reclamado en su propia transacción.
+    Devuelve True si se procesó, False si falló y None si la reserva venció
+    y otro despachador lo tomó.
+    """
+    with transaction.atomic():
+        evento = (
+            EventoOutbox.objects.select_for_update()
+            .filter(id=evento_id, estado=EventoOutbox.PENDIENTE, disponible_desde=reserva)
+            .first()
+        )
+        if evento is None:
+            return None
+        try:
+            # Savepoint: si un manejador falla se revierten sus cambios, no el reintento
+            with transaction.atomic():
+                for funcion in manejadores(evento.tipo):
+                    funcion(evento)
+        except Exception as e:
+            evento.intentos += 1
+            evento.ultimo_error = f"{type(e).__name__}: {e}"[:2000]
+            if evento.intentos >= max_intentos:
+                evento.estado = EventoOutbox.FALLIDO
+                logger.error(f"❌ Evento {evento.id} ({evento.tipo}) descartado tras {evento.intentos} intentos: {e}")
+            else:
+                logger.warning(f"⚠️ Evento {evento.id} ({evento.tipo}) falló, se reintentará: {e}")
+            evento.disponible_desde = timezone.now() + _espera(evento.intentos)
+            evento.save(update_fields=['intentos', 'ultimo_error', 'estado', 'disponible_desde'])
+            return False
+
+        evento.estado = EventoOutbox.PROCESADO
+        evento.fecha_procesado = timezone.now()
+        evento.save(update_fields=['estado', 'fecha_procesado'])
+        return True
+
+
+def despachar_lote(limite=None):
+    """
+    Entrega un lote de eventos pendientes a sus manejadores. Devuelve
+    (procesados, fallidos).
+
+    Cada evento se confirma en su propia transacción, junto con lo que
+    escribieron sus manejadores: un manejador lento no retiene los bloqueos
+    del resto del lote. Si el despachador cae a mitad del lote, los eventos
+    que quedaron reclamados vuelven a entregarse al vencer la reserva
+    (OUTBOX_LEASE_SECONDS).
+    """
+    limite = limite or getattr(settings, 'OUTBOX_BATCH_SIZE', 100)
+    max_intentos = getattr(settings, 'OUTBOX_MAX_ATTEMPTS', 10)
+
+    ids, reserva = _reclamar(limite)
+    procesados = fallidos = 0
+    for evento_id in ids:
+        resultado = _despachar_evento(evento_id, reserva, max_intentos)
+        if resultado is True:
+            procesados += 1
+        elif resultado is False:
+            fallidos += 1
+    return procesados, fallidos
+
+
+def despachar(limite=None, continuo=False, intervalo=1.0, max_lotes=None):
+    """
+    Despacha lotes hasta vaciar la cola (o indefinidamente con continuo,
+    esperando 'intervalo' segundos cuando no hay nada). Devuelve
+    (procesados, fallidos) acumulados.
+    """
+    total_procesados = total_fallidos = lotes = 0
+    while max_lotes is None or lotes < max_lotes:
+        procesados, fallidos = despachar_lote(limite)
+        total_procesados += procesados
+        total_fallidos += fallidos
+        lotes += 1
+        # Proceso de larga duración: respeta CONN_MAX_AGE y descarta conexiones
+        # caídas también cuando la cola nunca se vacía
+        close_old_connections()
+        if not procesados and not fallidos:
+            if not continuo:
+                break
+            time.sleep(intervalo)
+    return total_procesados, total_fallidos
+
+
+def purgar_procesados(dias=None):
+    """Borra los eventos procesados hace más de 'dias' días."""
+    dias = dias if dias is not None else getattr(settings, 'OUTBOX_RETENTION_DAYS', 7)
+    limite = timezone.now() - timedelta(days=dias)
+    borrados, _ = EventoOutbox.objects.filter(
+        estado=EventoOutbox.PROCESADO, fecha_procesado__lt=limite
+    ).delete()
+    return borrados
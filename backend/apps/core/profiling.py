@@ -0,0 +1,138 @@
+"""
+Perfilado opcional de requests individuales con cProfile.
+
+Un request se perfila cuando:
+  - lo pide un usuario staff con el header 'X-Profile: <tasa>' o el
+    parámetro '?_profile=<tasa>' (tasa entre 0 y 1, por defecto 1), o
+  - cae dentro del muestreo global PROFILER_SAMPLE_RATE (0 = desactivado).
+
+Solo se perfila un request a la vez por proceso; si ya hay uno en curso el
+request se atiende normalmente. Los resultados se guardan en PROFILER_DIR
+como .prof (pstats, apto para snakeviz) y un resumen .txt; a los staff se
+les devuelve el nombre en el header X-Profile-Id.
+"""
+import cProfile
+import io
+import logging
+import os
+import pstats
+import random
+import re
+import threading
+import time
+
+from django.conf import settings
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.exceptions import AuthenticationFailed
+
+logger = logging.getLogger(__name__)
+
+_profiler_lock = threading.Lock()
+_SAFE_NAME_RE = re.compile(r'[^A-Za-z0-9_.-]+')
+
+
+def _parse_rate(value):
+    if value in (None, ''):
+        return None
+    try:
+        return min(max(float(value), 0.0), 1.0)
+    except ValueError:
+        return None
+
+
+def is_staff_request(request):
+    """Si el request es de un staff, por sesión o por token de DRF."""
+    user = getattr(request, 'user', None)
+    if user is not None and user.is_authenticated:
+        return user.is_staff
+    # Los clientes de la API se autentican por token dentro de DRF, después
+    # de los middlewares; fuera de una vista de DRF se resuelve aquí.
+    try:
+        result = TokenAuthentication().authenticate(request)
+    except AuthenticationFailed:
+        return False
+    return bool(result and result[0].is_staff)
+
+
+def requested_rate(request):
+    """Tasa de muestreo pedida explícitamente por un staff, o None."""
+    rate = _parse_rate(request.META.get('HTTP_X_PROFILE'))
+    if rate is None:
+        rate = _parse_rate(request.GET.get('_profile'))
+    if rate is None or not is_staff_request(request):
+        return None
+    return rate
+
+
+def should_profile(request):
+    rate = requested_rate(request)
+    if rate is None:
+        rate = getattr(settings, 'PROFILER_SAMPLE_RATE', 0.0)
+    return rate > 0 and random.random() < rate
+
+
+def _prune(directory, max_files):
+    """Mantiene solo los max_files perfiles más recientes."""
+    profiles = sorted(
+        (entry for entry in os.scandir(directory) if entry.name.endswith('.prof')),
+        key=lambda entry: entry.stat().st_mtime,
+    )
+    for entry in profiles[:-max_files]:
+        os.remove(entry.path)
+        summary = entry.path[:-len('.prof')] + '.txt'
+        if os.path.exists(summary):
+            os.remove(summary)
+
+
+def save_profile(profiler, view_name, duration):
+    directory = getattr(settings, 'PROFILER_DIR', os.path.join(settings.BASE_DIR, 'profiles'))
+    os.makedirs(directory, exist_ok=True)
+
+    profile_id = f"{time.strftime('%Y%m%d-%H%M%S')}_{_SAFE_NAME_RE.sub('_', view_name)}_{duration * 1000:.0f}ms"
+    base_path = os.path.join(directory, profile_id)
+    profiler.dump_stats(base_path + '.prof')
+
+    summary = io.StringIO()
+    stats = pstats.Stats(profiler, stream=summary)
+    stats.sort_stats('cumulative').print_stats(40)
+    with open(base_path + '.txt', 'w', encoding='utf-8') as fh:
+        fh.write(summary.getvalue())
+
+    _prune(directory, getattr(settings, 'PROFILER_MAX_FILES', 200))
+    return profile_id
+
+
+def profile_request(get_response, request, get_view_name):
+    """
+    Atiende el request bajo cProfile; get_view_name() se llama al final,
+    cuando la URL ya está resuelta. Devuelve None si ya hay otro perfilado
+    en curso en este proceso (el llamador debe atenderlo normalmente).
+
+    Perfila get_response completo, no solo la vista: incluye ATOMIC_REQUESTS,
+    los process_view de los middlewares y el renderizado de las respuestas de DRF.
+    El header X-Profile-Id solo se envía a usuarios staff.
+    """
+    if not _profiler_lock.acquire(blocking=False):
+        return None
+    try:
+        profiler = cProfile.Profile()
+        start = time.perf_counter()
+        profiler.enable()
+        try:
+            response = get_response(request)
+        finally:
+            profiler.disable()
+        duration = time.perf_counter() - start
+    finally:
+        _profiler_lock.release()
+
+    view_name = get_view_name()
+    try:
+        profile_id = save_profile(profiler, view_name, duration)
+    except OSError as e:
+        logger.error(f"❌ No se pudo guardar el perfil de {view_name}: {e}")
+        return response
+    # DRF ya autenticó al usuario en request.user
+    if is_staff_request(request):
+        response['X-Profile-Id'] = profile_id
+    return response
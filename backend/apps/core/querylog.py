@@ -0,0 +1,116 @@
+"""
+Registro de consultas lentas.
+
+Cada consulta SQL se normaliza en una "huella" (fingerprint) sin literales
+ni listas variables, y se acumulan conteo / tiempo total / tiempo máximo por
+huella en una estructura acotada (LRU). Las consultas que superan
+SLOW_QUERY_THRESHOLD_MS se registran en el log junto con la vista que las
+emitió.
+"""
+import logging
+import re
+import threading
+import time
+from collections import OrderedDict
+from functools import lru_cache
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+_STRING_RE = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_RE = re.compile(r"\b\d+(?:\.\d+)?\b")
+_PLACEHOLDER_RE = re.compile(r"%s|\?")
+_IN_LIST_RE = re.compile(r"\(\s*\?(?:\s*,\s*\?)*\s*\)")
+_VALUES_LIST_RE = re.compile(r"(\(\.\.\.\))(?:\s*,\s*\(\.\.\.\))+")
+_WHITESPACE_RE = re.compile(r"\s+")
+
+
+@lru_cache(maxsize=2048)
+def fingerprint(sql):
+    """
+    Normaliza una sentencia SQL: reemplaza literales y placeholders por '?',
+    colapsa listas IN (...) / VALUES de largo variable y espacios.
+    """
+    normalized = _STRING_RE.sub('?', sql)
+    normalized = _NUMBER_RE.sub('?', normalized)
+    normalized = _PLACEHOLDER_RE.sub('?', normalized)
+    normalized = _IN_LIST_RE.sub('(...)', normalized)
+    normalized = _VALUES_LIST_RE.sub(r'\1', normalized)
+    return _WHITESPACE_RE.sub(' ', normalized).strip()
+
+
+class QueryStats:
+    """
+    Estadísticas por huella con un máximo de entradas. Cuando se llena se
+    descarta la huella usada hace más tiempo.
+    """
+
+    def __init__(self, max_entries=500):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def record(self, sql, duration, view_name):
+        key = fingerprint(sql)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                entry = self._entries[key] = {
+                    'fingerprint': key,
+                    'count': 0,
+                    'total': 0.0,
+                    'max': 0.0,
+                    'last_view': view_name,
+                }
+                if len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+            else:
+                self._entries.move_to_end(key)
+            entry['count'] += 1
+            entry['total'] += duration
+            if duration > entry['max']:
+                entry['max'] = duration
+            entry['last_view'] = view_name
+
+    def top(self, n=20, order_by='total'):
+        """Las N huellas con mayor 'total', 'max', 'count' o 'avg'."""
+        with self._lock:
+            entries = [dict(entry) for entry in self._entries.values()]
+        for entry in entries:
+            entry['avg'] = entry['total'] / entry['count']
+        entries.sort(key=lambda entry: entry[order_by], reverse=True)
+        return entries[:n]
+
+    def reset(self):
+        with self._lock:
+            self._entries.clear()
+
+
+query_stats = QueryStats(max_entries=getattr(settings, 'SLOW_QUERY_MAX_FINGERPRINTS', 500))
+
+
+class SlowQueryRecorder:
+    """
+    Execute wrapper que alimenta query_stats y registra en el log las
+    consultas que superan el umbral. El nombre de la vista se obtiene con
+    get_view_name() de forma perezosa porque la URL todavía no está resuelta
+    cuando se instala el wrapper.
+    """
+
+    def __init__(self, get_view_name, threshold_ms):
+        self.get_view_name = get_view_name
+        self.threshold = threshold_ms / 1000.0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = time.perf_counter() - start
+            view_name = self.get_view_name()
+            query_stats.record(sql, duration, view_name)
+            if duration >= self.threshold:
+                logger.warning(
+                    f"🐢 Consulta lenta ({duration * 1000:.1f} ms) en {view_name}: {fingerprint(sql)}"
+                )
@@ -1,3 +1,313 @@
-from django.test import TestCase
+import os
+import tempfile
+from datetime import timedelta
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+from django.core.cache import cache
+from django.db import OperationalError, connections, transaction
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from apps.core import db_router, outbox
+from apps.core.db_router import AnalyticsReplicaRouter, use_replica
+from apps.core.models import ClaveIdempotencia, EventoOutbox
+from apps.products.models import Categoria, Producto
+from apps.sales.models import Venta
+from apps.users.models import User
+
+
+class AnalyticsReplicaRouterTests(TransactionTestCase):
+    databases = {'default', 'replica'}
+
+    def setUp(self):
+        self.router = AnalyticsReplicaRouter()
+        db_router._replica_state['checked_at'] = None
+
+    def test_lecturas_normales_van_al_primario(self):
+        self.assertIsNone(self.router.db_for_read(Venta))
+
+    def test_lecturas_analiticas_van_a_la_replica(self):
+        with use_replica():
+            self.assertEqual(self.router.db_for_read(Venta), 'replica')
+
+    def test_usuarios_siempre_en_el_primario(self):
+        with use_replica():
+            self.assertIsNone(self.router.db_for_read(User))
+
+    def test_escrituras_en_el_primario(self):
+        with use_replica():
+            self.assertEqual(self.router.db_for_write(Venta), 'default')
+
+    def test_transaccion_del_primario_lee_sus_escrituras(self):
+        with use_replica(), transaction.atomic():
+            self.assertTrue(connections['default'].in_atomic_block)
+            self.assertIsNone(self.router.db_for_read(Venta))
+
+    def test_replica_caida_vuelve_al_primario(self):
+        with mock.patch.object(connections['replica'], 'ensure_connection', side_effect=OperationalError):
+            with use_replica():
+                self.assertIsNone(self.router.db_for_read(Venta))
+
+
+class ErrorDePrueba(Exception):
+    pass
+
+
+@override_settings(OUTBOX_MAX_ATTEMPTS=3)
+class OutboxTests(TestCase):
+
+    def setUp(self):
+        self.llamadas = []
+        outbox.manejadores('prueba')  # autodiscover antes de registrar los de prueba
+        outbox.manejador('prueba.ok')(self.crear_categoria)
+        outbox.manejador('prueba.falla')(self.crear_y_fallar)
+
+    def tearDown(self):
+        outbox._manejadores.pop('prueba.ok', None)
+        outbox._manejadores.pop('prueba.falla', None)
+
+    def crear_categoria(self, evento):
+        self.llamadas.append(evento.id)
+        Categoria.objects.create(nombre=evento.payload['nombre'])
+
+    def crear_y_fallar(self, evento):
+        self.llamadas.append(evento.id)
+        Categoria.objects.create(nombre=evento.payload['nombre'])
+        raise ErrorDePrueba('falló')
+
+    def test_el_evento_se_confirma_con_su_transaccion(self):
+        with transaction.atomic():
+            Categoria.objects.create(nombre='Audio')
+            outbox.publicar_evento('prueba.ok', {'nombre': 'Video'})
+
+        self.assertEqual(EventoOutbox.objects.filter(estado=EventoOutbox.PENDIENTE).count(), 1)
+
+    def test_el_evento_se_revierte_con_su_transaccion(self):
+        with self.assertRaises(ErrorDePrueba), transaction.atomic():
+            Categoria.objects.create(nombre='Audio')
+            outbox.publicar_eventos([('prueba.ok', {'nombre': 'Video'}), ('prueba.ok', {'nombre': 'Hogar'})])
+            raise ErrorDePrueba('checkout fallido')
+
+        self.assertFalse(EventoOutbox.objects.exists())
+        self.assertFalse(Categoria.objects.exists())
+
+    def test_despacha_y_marca_procesado(self):
+        evento = outbox.publicar_evento('prueba.ok', {'nombre': 'Video'})
+
+        self.assertEqual(outbox.despachar(), (1, 0))
+
+        evento.refresh_from_db()
+        self.assertEqual(evento.estado, EventoOutbox.PROCESADO)
+        self.assertIsNotNone(evento.fecha_procesado)
+        self.assertTrue(Categoria.objects.filter(nombre='Video').exists())
+        # Procesado: no se entrega de nuevo
+        self.assertEqual(outbox.despachar(), (0, 0))
+        self.assertEqual(self.llamadas, [evento.id])
+
+    def test_reintenta_con_espera_y_descarta_tras_max_intentos(self):
+        evento = outbox.publicar_evento('prueba.falla', {'nombre': 'Video'})
+
+        antes = timezone.now()
+        self.assertEqual(outbox.despachar_lote(), (0, 1))
+        evento.refresh_from_db()
+        self.assertEqual((evento.estado, evento.intentos), (EventoOutbox.PENDIENTE, 1))
+        self.assertGreaterEqual(evento.disponible_desde, antes + timedelta(seconds=2))
+        self.assertIn('ErrorDePrueba', evento.ultimo_error)
+        # Todavía en espera: no se reintenta
+        self.assertEqual(outbox.despachar_lote(), (0, 0))
+
+        EventoOutbox.objects.filter(pk=evento.pk).update(disponible_desde=timezone.now())
+        outbox.despachar_lote()
+        evento.refresh_from_db()
+        self.assertEqual(evento.intentos, 2)
+        # La espera crece con los intentos
+        self.assertGreaterEqual(evento.disponible_desde, timezone.now() + timedelta(seconds=3))
+
+        EventoOutbox.objects.filter(pk=evento.pk).update(disponible_desde=timezone.now())
+        outbox.despachar_lote()
+        evento.refresh_from_db()
+        self.assertEqual((evento.estado, evento.intentos), (EventoOutbox.FALLIDO, 3))
+
+        EventoOutbox.objects.filter(pk=evento.pk).update(disponible_desde=timezone.now())
+        self.assertEqual(outbox.despachar_lote(), (0, 0))
+        self.assertEqual(len(self.llamadas), 3)
+
+    def test_un_manejador_que_falla_revierte_solo_su_evento(self):
+        fallido = outbox.publicar_evento('prueba.falla', {'nombre': 'Audio'})
+        correcto = outbox.publicar_evento('prueba.ok', {'nombre': 'Video'})
+
+        self.assertEqual(outbox.despachar_lote(), (1, 1))
+
+        fallido.refresh_from_db()
+        correcto.refresh_from_db()
+        self.assertEqual((fallido.estado, fallido.intentos), (EventoOutbox.PENDIENTE, 1))
+        self.assertEqual(correcto.estado, EventoOutbox.PROCESADO)
+        self.assertEqual(list(Categoria.objects.values_list('nombre', flat=True)), ['Video'])
+
+    def test_un_evento_reclamado_no_se_entrega_a_otro_despachador(self):
+        evento = outbox.publicar_evento('prueba.ok', {'nombre': 'Video'})
+
+        ids, reserva = outbox._reclamar(10)
+
+        self.assertEqual(ids, [evento.id])
+        self.assertEqual(outbox.despachar_lote(), (0, 0))
+        evento.refresh_from_db()
+        self.assertEqual((evento.estado, evento.disponible_desde), (EventoOutbox.PENDIENTE, reserva))
+
+    def test_la_reserva_vencida_vuelve_a_entregar_el_evento(self):
+        evento = outbox.publicar_evento('prueba.ok', {'nombre': 'Video'})
+        _, reserva_caida = outbox._reclamar(10)
+        # El despachador que lo reclamó cayó y la reserva venció
+        EventoOutbox.objects.filter(pk=evento.pk).update(disponible_desde=timezone.now())
+
+        self.assertEqual(outbox.despachar_lote(), (1, 0))
+        # El despachador caído ya no puede procesarlo con su reserva vieja
+        self.assertIsNone(outbox._despachar_evento(evento.id, reserva_caida, 3))
+        self.assertEqual(self.llamadas, [evento.id])
+
+
+class ProfilerTests(TestCase):
+
+    def setUp(self):
+        directorio = tempfile.TemporaryDirectory()
+        self.addCleanup(directorio.cleanup)
+        self.directorio = directorio.name
+        ajustes = override_settings(PROFILER_DIR=self.directorio)
+        ajustes.enable()
+        self.addCleanup(ajustes.disable)
+        self.client = APIClient()
+
+    def autenticar(self, username, is_staff):
+        user = User.objects.create_user(username, f'{username}@test.com', 'clave123', is_staff=is_staff)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {Token.objects.create(user=user).key}')
+
+    def perfiles(self):
+        return [nombre for nombre in os.listdir(self.directorio) if nombre.endswith('.prof')]
+
+    def test_staff_pide_el_perfil_y_recibe_el_id(self):
+        self.autenticar('admin', is_staff=True)
+
+        response = self.client.get('/api/products/categorias/', HTTP_X_PROFILE='1')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.perfiles(), [response['X-Profile-Id'] + '.prof'])
+        self.assertIn('categoria-list', response['X-Profile-Id'])
+
+    def test_un_cliente_no_puede_pedir_perfil(self):
+        self.autenticar('cliente', is_staff=False)
+
+        response = self.client.get('/api/products/categorias/', HTTP_X_PROFILE='1')
+
+        self.assertNotIn('X-Profile-Id', response)
+        self.assertEqual(self.perfiles(), [])
+
+    @override_settings(PROFILER_SAMPLE_RATE=1.0)
+    def test_el_muestreo_perfila_sin_enviar_el_id_a_clientes(self):
+        self.autenticar('cliente', is_staff=False)
+
+        response = self.client.get('/api/products/categorias/')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('X-Profile-Id', response)
+        self.assertEqual(len(self.perfiles()), 1)
+
+
+class MetricsTests(TestCase):
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def autenticar(self, username, is_staff):
+        user = User.objects.create_user(username, f'{username}@test.com', 'clave123', is_staff=is_staff)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {Token.objects.create(user=user).key}')
+
+    @override_settings(METRICS_TOKEN='')
+    def test_sin_token_configurado_solo_staff(self):
+        self.assertEqual(self.client.get('/api/core/metrics/').status_code, 403)
+        self.autenticar('cliente', is_staff=False)
+        self.assertEqual(self.client.get('/api/core/metrics/').status_code, 403)
+        self.autenticar('admin', is_staff=True)
+        self.assertEqual(self.client.get('/api/core/metrics/').status_code, 200)
+
+    @override_settings(METRICS_TOKEN='secreto')
+    def test_con_token_configurado_exige_el_token(self):
+        self.assertEqual(self.client.get('/api/core/metrics/').status_code, 401)
+        self.client.credentials(HTTP_AUTHORIZATION='Bearer otro')
+        self.assertEqual(self.client.get('/api/core/metrics/').status_code, 401)
+        self.client.credentials(HTTP_AUTHORIZATION='Bearer secreto')
+        self.assertEqual(self.client.get('/api/core/metrics/').status_code, 200)
+
+
+class IdempotenciaTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user('cliente', 'cliente@test.com', 'clave123')
+        categoria = Categoria.objects.create(nombre='Audio')
+        self.producto = Producto.objects.create(nombre='Parlante', precio_venta=Decimal('100.00'), categoria=categoria)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def comprar(self, clave, cantidad=1, producto_id=None):
+        return self.client.post('/api/sales/ventas/crear-desde-carrito/', {
+            'items': [{'producto_id': producto_id or self.producto.id, 'cantidad': cantidad}],
+            'payment_method': 'cash',
+        }, format='json', HTTP_IDEMPOTENCY_KEY=clave)
+
+    def test_reintento_devuelve_la_respuesta_guardada_en_la_bd(self):
+        primera = self.comprar('clave-1')
+        segunda = self.comprar('clave-1')
+
+        self.assertEqual((primera.status_code, segunda.status_code), (201, 201))
+        self.assertEqual(segunda['Idempotent-Replayed'], 'true')
+        self.assertEqual(segunda.data['id'], primera.data['id'])
+        self.assertEqual(Venta.objects.count(), 1)
+
+    def test_reintento_se_resuelve_desde_el_cache(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            primera = self.comprar('clave-1')
+        # Sin la fila solo puede venir del caché
+        ClaveIdempotencia.objects.all().delete()
+
+        segunda = self.comprar('clave-1')
+
+        self.assertEqual(segunda['Idempotent-Replayed'], 'true')
+        self.assertEqual(segunda.data['id'], primera.data['id'])
+        self.assertEqual(Venta.objects.count(), 1)
+
+    def test_misma_clave_con_otro_contenido_responde_422(self):
+        self.comprar('clave-1')
+
+        response = self.comprar('clave-1', cantidad=2)
+
+        self.assertEqual(response.status_code, 422)
+        self.assertEqual(Venta.objects.count(), 1)
+
+    def test_una_respuesta_con_error_libera_la_clave(self):
+        response = self.comprar('clave-1', producto_id=999999)
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(ClaveIdempotencia.objects.exists())
+
+        response = self.comprar('clave-1')
+
+        self.assertEqual(response.status_code, 201)
+        self.assertNotIn('Idempotent-Replayed', response)
+
+    def test_una_clave_vencida_se_vuelve_a_usar(self):
+        primera = self.comprar('clave-1')
+        ClaveIdempotencia.objects.update(expira=timezone.now() - timedelta(seconds=1))
+
+        segunda = self.comprar('clave-1', cantidad=2)
+
+        self.assertEqual(segunda.status_code, 201)
+        self.assertNotEqual(segunda.data['id'], primera.data['id'])
+        self.assertEqual(ClaveIdempotencia.objects.count(), 1)
+
+    def test_clave_demasiado_larga_responde_400(self):
+        response = self.comprar('x' * 256)
+
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Venta.objects.exists())
@@ -1,3 +1,68 @@
-from django.shortcuts import render
+from django.conf import settings
+from django.http import HttpResponse
+from django.utils.crypto import constant_time_compare
+from django.views.decorators.http import require_GET
+from rest_framework import permissions, status
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.response import Response
 
-# Create your views here.
+from .metrics import registry
+from .profiling import is_staff_request
+from .querylog import query_stats
+
+
+@require_GET
+def metrics(request):
+    """
+    Expone el registro de métricas del proceso en formato Prometheus.
+    Si METRICS_TOKEN está configurado se exige 'Authorization: Bearer <token>';
+    si no, solo pueden verlo usuarios staff.
+    """
+    token = getattr(settings, 'METRICS_TOKEN', '')
+    if token:
+        auth_header = request.META.get('HTTP_AUTHORIZATION', '')
+        if not constant_time_compare(auth_header, f'Bearer {token}'):
+            return HttpResponse(status=401)
+    elif not is_staff_request(request):
+        return HttpResponse(status=403)
+
+    return HttpResponse(
+        registry.render(),
+        content_type='text/plain; version=0.0.4; charset=utf-8',
+    )
+
+
+@api_view(['GET', 'DELETE'])
+@permission_classes([permissions.IsAdminUser])
+def slow_queries(request):
+    """
+    Top-N de huellas SQL del proceso (solo staff).
+    GET ?top=20&orden=total|max|count|avg  ·  DELETE reinicia las estadísticas.
+    """
+    if request.method == 'DELETE':
+        query_stats.reset()
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+    orden = request.query_params.get('orden', 'total')
+    if orden not in ('total', 'max', 'count', 'avg'):
+        return Response(
+            {'error': 'orden debe ser total, max, count o avg'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    try:
+        top = max(1, min(int(request.query_params.get('top', 20)), 200))
+    except ValueError:
+        return Response({'error': 'top debe ser un entero'}, status=status.HTTP_400_BAD_REQUEST)
+
+    data = [
+        {
+            'fingerprint': entry['fingerprint'],
+            'count': entry['count'],
+            'total_ms': round(entry['total'] * 1000, 2),
+            'max_ms': round(entry['max'] * 1000, 2),
+            'avg_ms': round(entry['avg'] * 1000, 2),
+            'last_view': entry['last_view'],
+        }
+        for entry in query_stats.top(top, order_by=orden)
+    ]
+    return Response(data)
@@ -4,4 +4,7 @@ class PaymentsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.payments'  # 👈 IMPORTANTE: no 'payments' solo
     verbose_name = 'Pagos'
-    label = 'payments'  # 👈 AÑADIDO PARA EVITAR CONFLICTOS DE NOMBRE
\ No newline at end of file
+    label = 'payments'  # 👈 AÑADIDO PARA EVITAR CONFLICTOS DE NOMBRE
+
+    def ready(self):
+        from . import signals  # noqa: F401
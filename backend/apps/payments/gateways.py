@@ -0,0 +1,124 @@
+"""
+Clientes de pasarela para la conciliación de pagos (reconciliation.py).
+
+Una pasarela recibe un lote de pagos pendientes y devuelve el estado de
+cada uno según el proveedor: 'pending', 'completed', 'failed' o
+'cancelled' (los mismos valores de Payment.status). Los pagos que no
+aparecen en la respuesta siguen pendientes.
+
+La pasarela que se usa se define en PAYMENTS_GATEWAY (ruta a la clase).
+No hay pasarela por defecto: sin configurarla no se concilia nada.
+
+- PasarelaPayPal: API REST de PayPal (órdenes v2), con PAYPAL_CLIENT_ID,
+  PAYPAL_CLIENT_SECRET y PAYPAL_API_URL.
+- PasarelaFalsa: local, sin red. Para desarrollo y pruebas; lo que no se
+  le indica queda pendiente.
+"""
+import logging
+from collections import namedtuple
+
+import requests
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+PENDIENTE = 'pending'
+COMPLETADO = 'completed'
+FALLIDO = 'failed'
+CANCELADO = 'cancelled'
+
+# Lo que recibe la pasarela de cada pago
+PagoPendiente = namedtuple('PagoPendiente', ['id', 'transaction_id', 'amount'])
+
+
+class ErrorPasarela(Exception):
+    """La pasarela no respondió o respondió algo inesperado; el lote se reintenta en la próxima corrida."""
+
+
+class Pasarela:
+
+    def consultar(self, pagos):
+        """{pago_id: estado} para una lista de PagoPendiente."""
+        raise NotImplementedError
+
+
+class PasarelaFalsa(Pasarela):
+    """
+    Resuelve todo en memoria: cada pago toma el estado de 'resultados'
+    (por transaction_id o por id) o, si no está, 'por_defecto'.
+    """
+
+    def __init__(self, resultados=None, por_defecto=PENDIENTE):
+        self.resultados = resultados or {}
+        self.por_defecto = por_defecto
+        self.consultas = 0
+
+    def consultar(self, pagos):
+        self.consultas += 1
+        return {
+            pago.id: self.resultados.get(pago.transaction_id, self.resultados.get(pago.id, self.por_defecto))
+            for pago in pagos
+        }
+
+
+class PasarelaPayPal(Pasarela):
+    """
+    Consulta cada orden (GET /v2/checkout/orders/<transaction_id>) con un
+    token OAuth y una sola sesión HTTP por lote. PayPal no tiene consulta
+    por lote de órdenes.
+    """
+    ESTADOS = {
+        'COMPLETED': COMPLETADO,
+        'VOIDED': CANCELADO,
+    }
+    TIMEOUT = 10
+
+    def __init__(self, client_id=None, client_secret=None, api_url=None):
+        self.client_id = client_id or getattr(settings, 'PAYPAL_CLIENT_ID', '')
+        self.client_secret = client_secret or getattr(settings, 'PAYPAL_CLIENT_SECRET', '')
+        self.api_url = (api_url or getattr(settings, 'PAYPAL_API_URL', 'https://api-m.sandbox.paypal.com')).rstrip('/')
+        if not self.client_id or not self.client_secret:
+            raise ImproperlyConfigured('PasarelaPayPal necesita PAYPAL_CLIENT_ID y PAYPAL_CLIENT_SECRET')
+
+    def _sesion(self):
+        sesion = requests.Session()
+        try:
+            respuesta = sesion.post(
+                f"{self.api_url}/v1/oauth2/token",
+                data={'grant_type': 'client_credentials'},
+                auth=(self.client_id, self.client_secret),
+                timeout=self.TIMEOUT,
+            )
+            respuesta.raise_for_status()
+        except requests.RequestException as e:
+            sesion.close()
+            raise ErrorPasarela(f"No se pudo autenticar con PayPal: {e}") from e
+        sesion.headers['Authorization'] = f"Bearer {respuesta.json()['access_token']}"
+        return sesion
+
+    def consultar(self, pagos):
+        estados = {}
+        with self._sesion() as sesion:
+            for pago in pagos:
+                if not pago.transaction_id:
+                    continue
+                try:
+                    respuesta = sesion.get(f"{self.api_url}/v2/checkout/orders/{pago.transaction_id}", timeout=self.TIMEOUT)
+                except requests.RequestException as e:
+                    raise ErrorPasarela(f"PayPal no respondió: {e}") from e
+                if respuesta.status_code == 404:
+                    logger.warning(f"⚠️ Orden PayPal {pago.transaction_id} del pago {pago.id} no existe")
+                    continue
+                if not respuesta.ok:
+                    raise ErrorPasarela(f"PayPal respondió {respuesta.status_code} para el pago {pago.id}")
+                estados[pago.id] = self.ESTADOS.get(respuesta.json().get('status'), PENDIENTE)
+        return estados
+
+
+def obtener_pasarela():
+    ruta = getattr(settings, 'PAYMENTS_GATEWAY', '')
+    if not ruta:
+        raise ImproperlyConfigured('No hay pasarela de pagos configurada (PAYMENTS_GATEWAY)')
+    return import_string(ruta)()
@@ -0,0 +1,37 @@
+import time
+
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.module_loading import import_string
+
+from apps.payments.gateways import ErrorPasarela, obtener_pasarela
+from apps.payments.reconciliation import LOTE, conciliar_pagos
+
+
+class Command(BaseCommand):
+    help = 'Concilia los pagos PayPal pendientes con la pasarela y actualiza sus ventas'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lote', type=int, default=LOTE, help='Pagos por consulta a la pasarela')
+        parser.add_argument('--pasarela', help='Ruta a la clase de pasarela (por defecto, PAYMENTS_GATEWAY)')
+
+    def handle(self, *args, **options):
+        try:
+            pasarela = import_string(options['pasarela'])() if options['pasarela'] else obtener_pasarela()
+        except ImproperlyConfigured as e:
+            raise CommandError(str(e))
+
+        inicio = time.perf_counter()
+        try:
+            resultado = conciliar_pagos(pasarela=pasarela, lote=options['lote'])
+        except ErrorPasarela as e:
+            raise CommandError(f"Conciliación interrumpida: {e}")
+        duracion = time.perf_counter() - inicio
+
+        self.stdout.write(
+            f"  completados: {resultado['completed']}, fallidos: {resultado['failed']}, "
+            f"cancelados: {resultado['cancelled']}, pendientes: {resultado['pending']}"
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ {resultado['revisados']} pagos pendientes revisados en {duracion:.1f}s"
+        ))
@@ -0,0 +1,149 @@
+"""
+Conciliación de los pagos PayPal pendientes contra la pasarela.
+
+    python manage.py conciliar_pagos [--lote 1000]
+
+Recorre los pagos pendientes por lotes en orden de id (keyset, sin
+OFFSET), consulta la pasarela (gateways.py) una vez por lote y aplica el
+resultado con UPDATE por estado, no pago por pago:
+
+- Payment.status pasa a 'completed', 'failed' o 'cancelled'.
+- Las ventas de esos pagos que siguen PROCESANDO pasan a COMPLETADO o
+  CANCELADO.
+- Las reservas de stock se confirman o se devuelven.
+- Como los UPDATE masivos no disparan señales, los eventos 'pago.*' y
+  'venta.completada' se publican en el outbox en la misma transacción.
+
+Los pagos que la pasarela todavía informa pendientes después de
+PAYMENTS_PENDING_EXPIRY_HOURS se cancelan. Los que no tienen
+transaction_id (el checkout no recibió la orden de PayPal) no se pueden
+consultar y tampoco se cancelan: quedan pendientes para revisarlos a mano.
+
+Cada lote es una transacción. Los pagos se bloquean con SKIP LOCKED y solo
+se tocan si siguen pendientes: dos conciliaciones a la vez, o un cambio
+manual del pago, no aplican el mismo resultado dos veces.
+"""
+from collections import Counter, defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from apps.core.outbox import publicar_eventos
+
+from .gateways import CANCELADO, COMPLETADO, FALLIDO, PENDIENTE, PagoPendiente, obtener_pasarela
+from .models import Payment
+from .signals import EVENTOS_ESTADO, payload_pago
+
+LOTE = 1000
+
+
+def _vencimiento():
+    return timezone.now() - timedelta(hours=getattr(settings, 'PAYMENTS_PENDING_EXPIRY_HOURS', 24))
+
+
+def _siguiente_lote(desde_id, lote):
+    return list(
+        Payment.objects.filter(status=PENDIENTE, method='paypal', id__gt=desde_id)
+        .order_by('id')
+        .values_list('id', 'transaction_id', 'amount', 'created_at')[:lote]
+    )
+
+
+def aplicar_estados(estados):
+    """
+    Aplica {pago_id: estado final} a los pagos que siguen pendientes, a sus
+    ventas y reservas. Devuelve {estado: cantidad de pagos}.
+    """
+    from apps.products.inventory import confirmar_reservas, liberar_reservas
+    from apps.sales.events import payload_venta
+    from apps.sales.models import Venta
+
+    ahora = timezone.now()
+    with transaction.atomic():
+        pagos = list(
+            Payment.objects.select_for_update(skip_locked=True)
+            .filter(id__in=list(estados), status=PENDIENTE)
+            .order_by('id')
+            .values_list('id', 'user_id', 'amount', 'method')
+        )
+        por_estado = defaultdict(list)
+        for pago_id, *_ in pagos:
+            por_estado[estados[pago_id]].append(pago_id)
+
+        # auto_now no aplica en update(): las fechas se ponen a mano
+        for estado, ids in por_estado.items():
+            Payment.objects.filter(id__in=ids).update(status=estado, updated_at=ahora)
+
+        completados = por_estado[COMPLETADO]
+        anulados = por_estado[FALLIDO] + por_estado[CANCELADO]
+        ventas_completadas = list(
+            Venta.objects.filter(pago_id__in=completados, estado='PROCESANDO').values_list('id', flat=True)
+        )
+        Venta.objects.filter(id__in=ventas_completadas).update(estado='COMPLETADO', fecha_actualizacion=ahora)
+        Venta.objects.filter(pago_id__in=anulados, estado='PROCESANDO').update(
+            estado='CANCELADO', fecha_actualizacion=ahora
+        )
+
+        if completados:
+            confirmar_reservas(completados)
+        if anulados:
+            liberar_reservas(anulados)
+
+        eventos = [
+            (
+                EVENTOS_ESTADO[estados[pago_id]],
+                payload_pago(
+                    Payment(id=pago_id, user_id=user_id, amount=amount, method=method, status=estados[pago_id]),
+                    PENDIENTE,
+                ),
+            )
+            for pago_id, user_id, amount, method in pagos
+        ]
+        eventos += [
+            ('venta.completada', payload_venta(venta))
+            for venta in Venta.objects.filter(id__in=ventas_completadas)
+        ]
+        if eventos:
+            publicar_eventos(eventos)
+
+    return {estado: len(ids) for estado, ids in por_estado.items() if ids}
+
+
+def conciliar_pagos(pasarela=None, lote=LOTE):
+    """
+    Concilia todos los pagos PayPal pendientes. Devuelve la cantidad por
+    resultado: {'revisados', 'completed', 'failed', 'cancelled', 'pending'}.
+    Si la pasarela falla (ErrorPasarela) se corta; los lotes anteriores ya
+    quedaron aplicados.
+    """
+    pasarela = pasarela or obtener_pasarela()
+    vencimiento = _vencimiento()
+    resumen = Counter()
+
+    ultimo_id = 0
+    while True:
+        filas = _siguiente_lote(ultimo_id, lote)
+        if not filas:
+            break
+        ultimo_id = filas[-1][0]
+        resumen['revisados'] += len(filas)
+
+        respuesta = pasarela.consultar([PagoPendiente(pk, transaction_id, amount) for pk, transaction_id, amount, _ in filas])
+        estados = {}
+        for pago_id, transaction_id, _, creado in filas:
+            estado = respuesta.get(pago_id, PENDIENTE)
+            if estado == PENDIENTE and transaction_id and creado < vencimiento:
+                estado = CANCELADO
+            if estado in EVENTOS_ESTADO:
+                estados[pago_id] = estado
+
+        aplicados = aplicar_estados(estados) if estados else {}
+        resumen.update(aplicados)
+        resumen[PENDIENTE] += len(filas) - sum(aplicados.values())
+
+        if len(filas) < lote:
+            break
+
+    return {clave: resumen[clave] for clave in ('revisados', COMPLETADO, FALLIDO, CANCELADO, PENDIENTE)}
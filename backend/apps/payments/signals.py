@@ -0,0 +1,45 @@
+from django.db.models.signals import post_save, pre_save
+from django.dispatch import receiver
+
+from apps.core.outbox import publicar_evento
+
+from .models import Payment
+
+# Estados finales que se publican en el outbox como 'pago.<evento>'
+EVENTOS_ESTADO = {
+    'completed': 'pago.completado',
+    'failed': 'pago.fallido',
+    'cancelled': 'pago.cancelado',
+}
+
+
+def payload_pago(pago, estado_anterior=None):
+    return {
+        'pago_id': pago.pk,
+        'usuario_id': pago.user_id,
+        'monto': pago.amount,
+        'metodo': pago.method,
+        'estado': pago.status,
+        'estado_anterior': estado_anterior,
+    }
+
+
+@receiver(pre_save, sender=Payment)
+def pago_por_guardar(sender, instance, raw=False, using='default', **kwargs):
+    """Recuerda el estado anterior para publicar solo los cambios de estado."""
+    if raw or instance.pk is None:
+        return
+    instance._status_anterior = Payment.objects.using(using).filter(pk=instance.pk).values_list('status', flat=True).first()
+
+
+@receiver(post_save, sender=Payment)
+def pago_publicado(sender, instance, created, raw=False, using='default', **kwargs):
+    """
+    Publica el cambio a un estado final en la misma transacción del guardado.
+    Las escrituras masivas (bulk_create/update) publican sus propios eventos.
+    """
+    if raw:
+        return
+    anterior = None if created else getattr(instance, '_status_anterior', None)
+    if instance.status != anterior and instance.status in EVENTOS_ESTADO:
+        publicar_evento(EVENTOS_ESTADO[instance.status], payload_pago(instance, anterior), using=using)
@@ -1,3 +1,112 @@
-from django.test import TestCase
+from datetime import timedelta
+from decimal import Decimal
 
-# Create your tests here.
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from apps.core.models import EventoOutbox
+from apps.products.models import Categoria, Inventario, Producto, ReservaStock
+from apps.sales.models import Venta
+from apps.users.models import User
+from .gateways import PasarelaFalsa
+from .models import Payment
+from .reconciliation import aplicar_estados, conciliar_pagos
+
+
+@override_settings(PAYMENTS_PENDING_EXPIRY_HOURS=24)
+class ConciliacionPagosTests(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user('cliente', 'cliente@test.com', 'clave123')
+        categoria = Categoria.objects.create(nombre='Audio')
+        self.producto = Producto.objects.create(nombre='Parlante', precio_venta=Decimal('100.00'), categoria=categoria)
+        Inventario.objects.create(producto=self.producto, stock=10)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def comprar(self, orden, cantidad=2):
+        response = self.client.post('/api/sales/ventas/crear-desde-carrito/', {
+            'items': [{'producto_id': self.producto.id, 'cantidad': cantidad}],
+            'payment_method': 'paypal',
+            'paypal_order_id': orden,
+        }, format='json')
+        self.assertEqual(response.status_code, 201)
+        return Venta.objects.select_related('pago').get(id=response.data['id'])
+
+    def stock(self):
+        return Inventario.objects.get(producto=self.producto).stock
+
+    def estado(self, venta):
+        venta.refresh_from_db()
+        venta.pago.refresh_from_db()
+        return venta.estado, venta.pago.status, list(
+            ReservaStock.objects.filter(pago=venta.pago).values_list('estado', flat=True)
+        )
+
+    def test_aplica_el_resultado_de_la_pasarela(self):
+        completada = self.comprar('ORDEN-1')
+        fallida = self.comprar('ORDEN-2')
+        pendiente = self.comprar('ORDEN-3')
+        self.assertEqual(self.stock(), 4)
+        pasarela = PasarelaFalsa({'ORDEN-1': 'completed', 'ORDEN-2': 'failed'})
+
+        resultado = conciliar_pagos(pasarela)
+
+        self.assertEqual(resultado, {'revisados': 3, 'completed': 1, 'failed': 1, 'cancelled': 0, 'pending': 1})
+        self.assertEqual(self.estado(completada), ('COMPLETADO', 'completed', [ReservaStock.CONFIRMADA]))
+        self.assertEqual(self.estado(fallida), ('CANCELADO', 'failed', [ReservaStock.LIBERADA]))
+        self.assertEqual(self.estado(pendiente), ('PROCESANDO', 'pending', [ReservaStock.ACTIVA]))
+        # Vuelve solo el stock del pago fallido
+        self.assertEqual(self.stock(), 6)
+
+    def test_cancela_los_pendientes_vencidos_con_orden(self):
+        vencida = self.comprar('ORDEN-1')
+        sin_orden = self.comprar('')
+        Payment.objects.filter(id__in=[vencida.pago_id, sin_orden.pago_id]).update(
+            created_at=timezone.now() - timedelta(hours=25)
+        )
+
+        resultado = conciliar_pagos(PasarelaFalsa())
+
+        self.assertEqual(resultado['cancelled'], 1)
+        self.assertEqual(self.estado(vencida), ('CANCELADO', 'cancelled', [ReservaStock.LIBERADA]))
+        # Sin id de orden no se puede consultar: no se cancela
+        self.assertEqual(self.estado(sin_orden)[:2], ('PROCESANDO', 'pending'))
+
+    def test_publica_los_eventos_en_el_outbox(self):
+        completada = self.comprar('ORDEN-1')
+        fallida = self.comprar('ORDEN-2')
+        EventoOutbox.objects.all().delete()
+
+        conciliar_pagos(PasarelaFalsa({'ORDEN-1': 'completed', 'ORDEN-2': 'failed'}))
+
+        eventos = {(e.tipo, e.payload.get('pago_id')) for e in EventoOutbox.objects.all()}
+        self.assertEqual(eventos, {
+            ('pago.completado', completada.pago_id),
+            ('pago.fallido', fallida.pago_id),
+            ('venta.completada', completada.pago_id),
+        })
+        venta = EventoOutbox.objects.get(tipo='venta.completada').payload
+        self.assertEqual((venta['venta_id'], venta['estado']), (completada.id, 'COMPLETADO'))
+
+    def test_una_segunda_corrida_no_vuelve_a_aplicar(self):
+        venta = self.comprar('ORDEN-1')
+        pasarela = PasarelaFalsa({'ORDEN-1': 'completed'})
+        conciliar_pagos(pasarela)
+        eventos = EventoOutbox.objects.count()
+
+        resultado = conciliar_pagos(pasarela)
+
+        self.assertEqual(resultado['revisados'], 0)
+        self.assertEqual(EventoOutbox.objects.count(), eventos)
+        self.assertEqual(self.estado(venta), ('COMPLETADO', 'completed', [ReservaStock.CONFIRMADA]))
+        self.assertEqual(self.stock(), 8)
+
+    def test_solo_aplica_a_pagos_que_siguen_pendientes(self):
+        venta = self.comprar('ORDEN-1')
+        # Cancelado a mano mientras corría la conciliación
+        Payment.objects.filter(id=venta.pago_id).update(status='cancelled')
+
+        self.assertEqual(aplicar_estados({venta.pago_id: 'completed'}), {})
+        self.assertEqual(self.estado(venta)[:2], ('PROCESANDO', 'cancelled'))
@@ -1,5 +1,7 @@
 from rest_framework import viewsets, status, permissions
 from rest_framework.response import Response
+from django.db import transaction
+from apps.core.idempotency import idempotente
 from .models import Payment
 from .serializers import PaymentSerializer
 import logging
@@ -11,6 +13,8 @@ class PaymentViewSet(viewsets.ModelViewSet):
     serializer_class = PaymentSerializer
     permission_classes = [permissions.IsAuthenticated]
 
+    @idempotente('pagos')
+    @transaction.atomic
     def create(self, request, *args, **kwargs):
         try:
             logger.info(f"📦 Payment request received from user: {request.user}")
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Categoria, Producto
+from .models import Categoria, HistorialPrecio, Inventario, Producto, ProductoRelacionado, RecomendacionCliente, ReservaStock
 
 @admin.register(Categoria)
 class CategoriaAdmin(admin.ModelAdmin):
@@ -27,4 +27,41 @@ class ProductoAdmin(admin.ModelAdmin):
             'fields': ('fecha_creacion', 'fecha_actualizacion'),
             'classes': ('collapse',)
         }),
-    )
\ No newline at end of file
+    )
+
+@admin.register(HistorialPrecio)
+class HistorialPrecioAdmin(admin.ModelAdmin):
+    list_display = ['producto', 'precio_anterior', 'precio_nuevo', 'fecha', 'usuario', 'motivo']
+    list_filter = ['fecha']
+    search_fields = ['producto__nombre', 'motivo']
+    raw_id_fields = ['producto', 'usuario']
+    list_per_page = 20
+
+@admin.register(Inventario)
+class InventarioAdmin(admin.ModelAdmin):
+    list_display = ['producto', 'stock', 'fecha_actualizacion']
+    search_fields = ['producto__nombre']
+    raw_id_fields = ['producto']
+    list_per_page = 20
+
+@admin.register(ReservaStock)
+class ReservaStockAdmin(admin.ModelAdmin):
+    list_display = ['pago', 'producto', 'cantidad', 'estado', 'expira']
+    list_filter = ['estado']
+    raw_id_fields = ['producto', 'pago']
+    list_per_page = 20
+
+@admin.register(ProductoRelacionado)
+class ProductoRelacionadoAdmin(admin.ModelAdmin):
+    list_display = ['producto', 'posicion', 'relacionado', 'veces', 'puntaje']
+    search_fields = ['producto__nombre']
+    raw_id_fields = ['producto', 'relacionado']
+    list_per_page = 20
+
+@admin.register(RecomendacionCliente)
+class RecomendacionClienteAdmin(admin.ModelAdmin):
+    list_display = ['usuario', 'desactualizada', 'fecha_calculo']
+    list_filter = ['desactualizada']
+    search_fields = ['usuario__username']
+    raw_id_fields = ['usuario']
+    list_per_page = 20
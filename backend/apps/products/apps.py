@@ -4,4 +4,7 @@ class ProductsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.products'
     verbose_name = 'Productos'
-    label = 'products'
\ No newline at end of file
+    label = 'products'
+
+    def ready(self):
+        from . import signals  # noqa: F401
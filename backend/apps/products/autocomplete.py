@@ -0,0 +1,128 @@
+"""
+Índice en memoria para autocompletar nombres de productos y categorías.
+
+Se guarda un arreglo ordenado de claves normalizadas (sin acentos, en
+minúsculas). Cada nombre aporta una clave por palabra ('smart tv samsung',
+'tv samsung', 'samsung'), así 'sams' encuentra 'Smart TV Samsung'. La
+consulta es un bisect + recorrido de los k primeros, sin tocar la BD.
+
+El índice se construye de forma perezosa en cada proceso y se actualiza
+incrementalmente con las señales de guardado/eliminación (signals.py).
+Los cambios hechos por otros procesos se detectan con la versión del
+catálogo (cache.py): si no coincide, el índice se reconstruye.
+"""
+import threading
+from bisect import bisect_left, insort
+
+from .cache import version_catalogo
+from .search import normalizar
+
+PRODUCTO = 'producto'
+CATEGORIA = 'categoria'
+
+
+def _claves(nombre):
+    palabras = normalizar(nombre).split()
+    return [' '.join(palabras[i:]) for i in range(len(palabras))]
+
+
+class PrefixIndex:
+
+    def __init__(self):
+        self._entradas = []  # (clave, tipo, id) ordenadas
+        self._items = {}     # (tipo, id) -> (nombre, claves)
+        self._construido = False
+        self._version = None
+        self._lock = threading.RLock()
+
+    def _cargar(self):
+        from .models import Categoria, Producto
+
+        items = {}
+        for pk, nombre in Producto.objects.filter(activo=True).values_list('id', 'nombre'):
+            items[(PRODUCTO, pk)] = nombre
+        for pk, nombre in Categoria.objects.values_list('id', 'nombre'):
+            items[(CATEGORIA, pk)] = nombre
+        return items
+
+    def construir(self):
+        """Reconstruye el índice completo (2 consultas)."""
+        # La versión se lee antes de cargar: un cambio concurrente fuerza otra reconstrucción
+        version = version_catalogo()
+        items = self._cargar()
+        entradas = []
+        indexados = {}
+        for (tipo, pk), nombre in items.items():
+            claves = _claves(nombre)
+            indexados[(tipo, pk)] = (nombre, claves)
+            entradas.extend((clave, tipo, pk) for clave in claves)
+        entradas.sort()
+        with self._lock:
+            self._entradas = entradas
+            self._items = indexados
+            self._construido = True
+            self._version = version
+
+    def _quitar(self, tipo, pk):
+        anterior = self._items.pop((tipo, pk), None)
+        if anterior is None:
+            return
+        for clave in anterior[1]:
+            i = bisect_left(self._entradas, (clave, tipo, pk))
+            if i < len(self._entradas) and self._entradas[i] == (clave, tipo, pk):
+                del self._entradas[i]
+
+    def actualizar(self, tipo, pk, nombre):
+        with self._lock:
+            if not self._construido:
+                return  # Se construirá con datos frescos en la próxima consulta
+            self._quitar(tipo, pk)
+            claves = _claves(nombre)
+            self._items[(tipo, pk)] = (nombre, claves)
+            for clave in claves:
+                insort(self._entradas, (clave, tipo, pk))
+
+    def quitar(self, tipo, pk):
+        with self._lock:
+            if self._construido:
+                self._quitar(tipo, pk)
+
+    def version_aplicada(self, version):
+        """
+        Marca el índice al día con 'version' si solo le faltaba ese cambio,
+        que ya se aplicó aquí de forma incremental.
+        """
+        with self._lock:
+            if self._construido and self._version == version - 1:
+                self._version = version
+
+    def invalidar(self):
+        with self._lock:
+            self._construido = False
+            self._entradas = []
+            self._items = {}
+
+    def buscar(self, prefijo, limite=8):
+        """Hasta 'limite' coincidencias únicas: [{'id', 'nombre', 'tipo'}]"""
+        prefijo = normalizar(prefijo)
+        if not prefijo:
+            return []
+        if not self._construido or self._version != version_catalogo():
+            self.construir()
+
+        resultados = []
+        vistos = set()
+        with self._lock:
+            i = bisect_left(self._entradas, (prefijo,))
+            while i < len(self._entradas) and len(resultados) < limite:
+                clave, tipo, pk = self._entradas[i]
+                if not clave.startswith(prefijo):
+                    break
+                if (tipo, pk) not in vistos:
+                    vistos.add((tipo, pk))
+                    resultados.append({'id': pk, 'nombre': self._items[(tipo, pk)][0], 'tipo': tipo})
+                i += 1
+        return resultados
+
+
+indice = PrefixIndex()
@@ -0,0 +1,96 @@
+"""
+Caché del catálogo (productos y categorías) con invalidación por versión.
+
+Las respuestas serializadas se guardan en el caché 'catalogo' con una clave
+que incluye la versión actual del catálogo. Al guardar o eliminar un
+Producto/Categoria la versión se incrementa (signals.py), con lo que todas
+las entradas anteriores quedan huérfanas y expiran solas.
+
+El ETag de cada respuesta se deriva de la versión y la URL, así que un
+cliente puede revalidar con If-None-Match sin tocar la BD ni el caché.
+
+La versión tiene que estar en un backend compartido (file, el valor por
+defecto, o redis): con locmem cada proceso tiene la suya y lo que guardan
+los comandos, el outbox u otro worker no invalida su caché.
+"""
+import hashlib
+import time
+
+from django.core.cache import caches
+from django.utils.cache import patch_cache_control
+from django.utils.http import quote_etag
+from rest_framework import status
+from rest_framework.response import Response
+
+CACHE_ALIAS = 'catalogo'
+VERSION_KEY = 'version'
+
+
+def _cache():
+    return caches[CACHE_ALIAS]
+
+
+def version_catalogo():
+    cache = _cache()
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        # Si la clave se perdió, arrancar desde un valor nuevo evita reutilizar
+        # entradas guardadas con una versión anterior
+        cache.add(VERSION_KEY, int(time.time() * 1000), timeout=None)
+        version = cache.get(VERSION_KEY)
+    return version
+
+
+def incrementar_version():
+    """Invalida todo el catálogo cacheado. Devuelve la nueva versión."""
+    cache = _cache()
+    try:
+        return cache.incr(VERSION_KEY)
+    except ValueError:
+        version_catalogo()
+        return cache.incr(VERSION_KEY)
+
+
+def _clave(request, version):
+    query = '&'.join(sorted(request.GET.urlencode().split('&')))
+    url = f"{request.scheme}://{request.get_host()}{request.path}?{query}"
+    return f"{version}:{hashlib.md5(url.encode()).hexdigest()}"
+
+
+def _etag_coincide(request, etag):
+    if_none_match = request.META.get('HTTP_IF_NONE_MATCH', '')
+    return etag in [tag.strip() for tag in if_none_match.split(',')] or if_none_match.strip() == '*'
+
+
+def respuesta_cacheada(request, generar):
+    """
+    Devuelve la respuesta de generar() desde el caché del catálogo, o 304
+    si el cliente ya tiene la versión actual. Solo se cachean las
+    respuestas 200.
+    """
+    clave = _clave(request, version_catalogo())
+    etag = quote_etag(clave)
+
+    if _etag_coincide(request, etag):
+        response = Response(status=status.HTTP_304_NOT_MODIFIED)
+    else:
+        data = _cache().get(clave)
+        if data is not None:
+            response = Response(data)
+        else:
+            response = generar()
+            if response.status_code != status.HTTP_200_OK:
+                return response
+            _cache().set(clave, response.data)
+
+    response['ETag'] = etag
+    # El cliente puede guardar la respuesta pero debe revalidarla siempre
+    patch_cache_control(response, no_cache=True)
+    return response
+
+
+class CatalogCacheMixin:
+    """Sirve 'list' desde el caché versionado del catálogo."""
+
+    def list(self, request, *args, **kwargs):
+        return respuesta_cacheada(request, lambda: super(CatalogCacheMixin, self).list(request, *args, **kwargs))
@@ -0,0 +1,70 @@
+"""
+Facetas del catálogo: conteos por categoría, rango de precio y destacado
+para la búsqueda actual.
+
+Se resuelven con una sola consulta agrupada por (categoría, rango de
+precio, destacado); los tres conteos se arman en Python a partir de esas
+filas, que son pocas (categorías x rangos x 2).
+"""
+from decimal import Decimal
+
+from django.db.models import Case, Count, IntegerField, Value, When
+
+# Límites de los rangos de precio: [0, 50), [50, 100), ..., [2500, ∞)
+RANGOS_PRECIO = [Decimal(x) for x in ('0', '50', '100', '250', '500', '1000', '2500')]
+
+
+def _rango_precio(limites):
+    # Se evalúa de mayor a menor: el primer límite superado define el rango
+    return Case(
+        *[
+            When(precio_venta__gte=limite, then=Value(i))
+            for i, limite in reversed(list(enumerate(limites)))
+        ],
+        default=Value(0),
+        output_field=IntegerField(),
+    )
+
+
+def calcular_facetas(queryset, limites=RANGOS_PRECIO):
+    """
+    Devuelve {'total', 'categorias', 'precios', 'destacado'} para el queryset
+    ya filtrado (búsqueda, categoría, destacado...).
+    """
+    filas = (
+        queryset.order_by()
+        .annotate(rango=_rango_precio(limites))
+        .values('categoria_id', 'categoria__nombre', 'rango', 'destacado')
+        .annotate(total=Count('id'))
+    )
+
+    categorias = {}
+    rangos = [0] * len(limites)
+    destacado = {'true': 0, 'false': 0}
+    total = 0
+    for fila in filas:
+        n = fila['total']
+        total += n
+        categoria = categorias.setdefault(
+            fila['categoria_id'],
+            {'id': fila['categoria_id'], 'nombre': fila['categoria__nombre'], 'total': 0},
+        )
+        categoria['total'] += n
+        rangos[fila['rango']] += n
+        destacado['true' if fila['destacado'] else 'false'] += n
+
+    precios = [
+        {
+            'desde': str(limite),
+            'hasta': str(limites[i + 1]) if i + 1 < len(limites) else None,
+            'total': rangos[i],
+        }
+        for i, limite in enumerate(limites)
+    ]
+
+    return {
+        'total': total,
+        'categorias': sorted(categorias.values(), key=lambda c: (-c['total'], c['nombre'])),
+        'precios': precios,
+        'destacado': destacado,
+    }
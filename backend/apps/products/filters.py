@@ -0,0 +1,28 @@
+from rest_framework import filters
+
+from .search import buscar_productos
+
+
+class ProductoSearchFilter(filters.BaseFilterBackend):
+    """
+    Búsqueda de texto completo con ranking de relevancia (ver search.py).
+    Debe ir después de OrderingFilter: si el cliente no pide un 'ordering'
+    explícito, los resultados se ordenan por relevancia.
+    """
+    search_param = 'search'
+
+    def filter_queryset(self, request, queryset, view):
+        query = request.query_params.get(self.search_param, '').strip()
+        if not query:
+            return queryset
+        ordenar = not request.query_params.get('ordering')
+        return buscar_productos(queryset, query, ordenar_por_relevancia=ordenar)
+
+    def get_schema_operation_parameters(self, view):
+        return [{
+            'name': self.search_param,
+            'required': False,
+            'in': 'query',
+            'description': 'Búsqueda por nombre y descripción (sin acentos, por prefijo)',
+            'schema': {'type': 'string'},
+        }]
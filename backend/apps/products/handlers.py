@@ -0,0 +1,10 @@
+"""Manejadores del outbox (apps.core.outbox) de la app de productos."""
+from apps.core.outbox import manejador
+
+from .personalized import registrar_compra
+
+
+@manejador('venta.completada')
+def invalidar_recomendaciones(evento):
+    if evento.payload.get('usuario_id'):
+        registrar_compra(evento.payload['venta_id'], evento.payload['usuario_id'])
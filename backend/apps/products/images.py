@@ -0,0 +1,177 @@
+"""
+Derivadas de las imágenes de producto (miniaturas WebP y JPEG).
+
+Al subir una imagen se generan versiones redimensionadas en varios anchos
+en un hilo de fondo, después del commit, para no demorar la respuesta. Las
+rutas se guardan en Producto.imagenes_derivadas:
+
+    {"origen": "productos/tv.jpg",
+     "webp": {"160": "productos/derivadas/7/tv-160.webp", ...},
+     "jpeg": {"160": "productos/derivadas/7/tv-160.jpg", ...}}
+
+'origen' permite detectar derivadas viejas cuando la imagen cambia. Las
+imágenes existentes se procesan con: python manage.py generar_miniaturas
+"""
+import io
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import close_old_connections, transaction
+from django.db.models import Q
+from django.utils import timezone
+from PIL import Image, ImageOps
+
+logger = logging.getLogger(__name__)
+
+ANCHOS = (160, 320, 640, 1024)
+FORMATOS = {
+    'webp': ('WEBP', 'webp', {'quality': 80, 'method': 4}),
+    'jpeg': ('JPEG', 'jpg', {'quality': 82, 'optimize': True, 'progressive': True}),
+}
+DIRECTORIO = 'productos/derivadas'
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=getattr(settings, 'IMAGE_WORKERS', 2),
+                thread_name_prefix='imagenes',
+            )
+        return _executor
+
+
+def derivadas_vigentes(producto):
+    """Las derivadas guardadas, solo si corresponden a la imagen actual."""
+    derivadas = producto.imagenes_derivadas or {}
+    if not producto.imagen or derivadas.get('origen') != producto.imagen.name:
+        return None
+    return derivadas
+
+
+def necesita_derivadas(producto):
+    derivadas = producto.imagenes_derivadas or {}
+    origen = producto.imagen.name if producto.imagen else None
+    return derivadas.get('origen') != origen
+
+
+def _sin_transparencia(imagen):
+    if imagen.mode in ('RGBA', 'LA', 'P'):
+        imagen = imagen.convert('RGBA')
+        fondo = Image.new('RGB', imagen.size, (255, 255, 255))
+        fondo.paste(imagen, mask=imagen.getchannel('A'))
+        return fondo
+    return imagen.convert('RGB')
+
+
+def _borrar(rutas):
+    for ruta in rutas:
+        try:
+            default_storage.delete(ruta)
+        except OSError:
+            pass
+
+
+def _rutas(derivadas):
+    return [ruta for formato in FORMATOS for ruta in (derivadas or {}).get(formato, {}).values()]
+
+
+def generar_derivadas(producto):
+    """
+    Genera las derivadas de la imagen del producto y devuelve el dict para
+    imagenes_derivadas. No amplía: los anchos mayores al original se omiten
+    (siempre queda al menos uno, con el ancho original).
+    """
+    if not producto.imagen:
+        return {}
+
+    with producto.imagen.open('rb') as archivo:
+        original = ImageOps.exif_transpose(Image.open(archivo))
+        original.load()
+
+    ancho_original, alto_original = original.size
+    anchos = [ancho for ancho in ANCHOS if ancho < ancho_original] or [ancho_original]
+    base = os.path.splitext(os.path.basename(producto.imagen.name))[0]
+
+    derivadas = {'origen': producto.imagen.name}
+    for formato in FORMATOS:
+        derivadas[formato] = {}
+
+    rgb = _sin_transparencia(original)
+    for ancho in anchos:
+        alto = max(1, round(alto_original * ancho / ancho_original))
+        for formato, (pil_format, extension, opciones) in FORMATOS.items():
+            fuente = original if formato == 'webp' and original.mode == 'RGBA' else rgb
+            redimensionada = fuente.resize((ancho, alto), Image.LANCZOS)
+            buffer = io.BytesIO()
+            redimensionada.save(buffer, pil_format, **opciones)
+            contenido = ContentFile(buffer.getvalue())
+            ruta = f"{DIRECTORIO}/{producto.pk}/{base}-{ancho}.{extension}"
+            # Se reemplaza el archivo anterior con el mismo nombre
+            default_storage.delete(ruta)
+            derivadas[formato][str(ancho)] = default_storage.save(ruta, contenido)
+    return derivadas
+
+
+def procesar_producto(producto_id):
+    """
+    Genera y guarda las derivadas de un producto. Usa update() para no
+    disparar las señales de guardado y no pisar una imagen subida mientras
+    tanto.
+    """
+    from .models import Producto
+    from .signals import catalogo_modificado
+
+    producto = Producto.objects.filter(pk=producto_id).first()
+    if producto is None or not necesita_derivadas(producto):
+        return False
+
+    anteriores = _rutas(producto.imagenes_derivadas)
+    derivadas = generar_derivadas(producto)
+    if producto.imagen:
+        misma_imagen = Q(imagen=producto.imagen.name)
+    else:
+        misma_imagen = Q(imagen='') | Q(imagen__isnull=True)
+    actualizados = Producto.objects.filter(misma_imagen, pk=producto.pk).update(
+        imagenes_derivadas=derivadas,
+        fecha_actualizacion=timezone.now(),
+    )
+    if not actualizados:
+        # La imagen cambió mientras se procesaba: la nueva tiene su propia tarea
+        _borrar(_rutas(derivadas))
+        return False
+
+    _borrar(set(anteriores) - set(_rutas(derivadas)))
+    catalogo_modificado()
+    return True
+
+
+def _procesar_en_fondo(producto_id):
+    close_old_connections()
+    try:
+        procesar_producto(producto_id)
+    except Exception as e:
+        logger.error(f"❌ Error generando miniaturas del producto {producto_id}: {e}", exc_info=True)
+    finally:
+        close_old_connections()
+
+
+def programar_derivadas(producto_id, using='default'):
+    """Encola la generación de derivadas para cuando la transacción se confirme."""
+    if getattr(settings, 'IMAGE_DERIVATIVES_SYNC', False):
+        transaction.on_commit(lambda: _procesar_en_fondo(producto_id), using=using)
+    else:
+        transaction.on_commit(lambda: _get_executor().submit(_procesar_en_fondo, producto_id), using=using)
+
+
+def borrar_derivadas(producto):
+    _borrar(_rutas(producto.imagenes_derivadas))
@@ -0,0 +1,331 @@
+"""
+Importación masiva de productos desde CSV o JSONL.
+
+El archivo se lee en streaming y se procesa por bloques de CHUNK_SIZE
+filas: cada bloque se valida en memoria, se resuelven las categorías con
+un único mapa nombre -> id y los productos existentes con una consulta
+por bloque, y se escribe con bulk_update (existentes) y bulk_create
+(nuevos) dentro de una transacción por bloque.
+
+La clave de cada fila es 'id' si viene, si no 'nombre'. En productos
+existentes solo se actualizan las columnas presentes en la fila, así un
+archivo 'nombre,precio_venta' sirve para cambiar precios.
+
+Los cambios de precio quedan en HistorialPrecio. Las escrituras masivas
+no disparan señales: al final se actualizan el índice de búsqueda, los
+resúmenes de categoría y la versión del catálogo.
+"""
+import csv
+import io
+import json
+from decimal import Decimal, InvalidOperation
+
+from django.db import connection, transaction
+from django.utils import timezone
+
+from . import autocomplete
+from .models import Categoria, Producto
+from .pricing import registrar_cambios
+from .search import indexar_productos, normalizar
+from .summaries import recalcular_resumenes
+
+CHUNK_SIZE = 1000
+MAX_ERRORES = 1000
+
+CAMPOS = ('nombre', 'descripcion', 'precio_venta', 'categoria', 'destacado', 'activo')
+OBLIGATORIOS_NUEVO = ('nombre', 'precio_venta', 'categoria')
+# Columnas NOT NULL sin default: el upsert las necesita en cada fila
+_COMPLETOS = {'nombre', 'precio_venta', 'categoria_id'}
+BULK_UPDATE_BATCH = 200
+
+_VERDADEROS = {'1', 'true', 'si', 'sí', 'yes', 'x'}
+_FALSOS = {'0', 'false', 'no', ''}
+
+
+class ErrorImportacion(ValueError):
+    pass
+
+
+def detectar_formato(nombre_archivo):
+    nombre = (nombre_archivo or '').lower()
+    if nombre.endswith('.jsonl') or nombre.endswith('.ndjson'):
+        return 'jsonl'
+    if nombre.endswith('.csv'):
+        return 'csv'
+    raise ErrorImportacion("Formato no soportado: use un archivo .csv o .jsonl")
+
+
+def leer_filas(archivo, formato):
+    """
+    Genera (numero_de_fila, dict) desde un archivo binario o de texto sin
+    cargarlo completo en memoria.
+    """
+    if isinstance(archivo, io.TextIOBase):
+        texto = archivo
+    else:
+        texto = io.TextIOWrapper(archivo, encoding='utf-8-sig', newline='')
+
+    if formato == 'csv':
+        for numero, fila in enumerate(csv.DictReader(texto), start=2):
+            yield numero, {k.strip(): v for k, v in fila.items() if k}
+    elif formato == 'jsonl':
+        for numero, linea in enumerate(texto, start=1):
+            linea = linea.strip()
+            if not linea:
+                continue
+            try:
+                fila = json.loads(linea)
+            except ValueError:
+                yield numero, None
+                continue
+            yield numero, fila if isinstance(fila, dict) else None
+    else:
+        raise ErrorImportacion(f"Formato desconocido: {formato}")
+
+
+def _booleano(valor):
+    if isinstance(valor, bool):
+        return valor
+    texto = str(valor).strip().lower()
+    if texto in _VERDADEROS:
+        return True
+    if texto in _FALSOS:
+        return False
+    raise ValueError(f"valor booleano inválido: {valor!r}")
+
+
+class _Categorias:
+    """Mapa nombre normalizado -> id, cargado una sola vez."""
+
+    def __init__(self, crear, dry_run=False):
+        self.crear = crear
+        self.dry_run = dry_run
+        self.ids = {normalizar(nombre): pk for pk, nombre in Categoria.objects.values_list('id', 'nombre')}
+        self.creadas = 0
+
+    def resolver(self, nombre):
+        clave = normalizar(str(nombre))
+        if clave in self.ids:
+            return self.ids[clave]
+        if not self.crear:
+            raise ValueError(f"categoría '{nombre}' no existe")
+        self.creadas += 1
+        if self.dry_run:
+            # Sin escribir: un id ficticio alcanza para validar el resto
+            self.ids[clave] = -self.creadas
+        else:
+            self.ids[clave] = Categoria.objects.create(nombre=str(nombre).strip()).pk
+        return self.ids[clave]
+
+
+def _validar(fila, categorias):
+    """Devuelve (valores, errores) con solo las columnas presentes."""
+    valores = {}
+    errores = {}
+
+    for campo in CAMPOS:
+        if campo not in fila or fila[campo] is None:
+            continue
+        valor = fila[campo]
+        try:
+            if campo == 'nombre':
+                valor = str(valor).strip()
+                if not valor:
+                    raise ValueError("no puede estar vacío")
+                if len(valor) > 200:
+                    raise ValueError("máximo 200 caracteres")
+            elif campo == 'descripcion':
+                valor = str(valor)
+            elif campo == 'precio_venta':
+                try:
+                    valor = Decimal(str(valor).strip()).quantize(Decimal('0.01'))
+                except InvalidOperation:
+                    raise ValueError("no es un número")
+                if valor <= 0:
+                    raise ValueError("El precio de venta debe ser mayor a 0")
+                if valor >= Decimal('100000000'):
+                    raise ValueError("máximo 10 dígitos")
+            elif campo == 'categoria':
+                continue  # Se resuelve al final, para no crear categorías de filas inválidas
+            else:
+                valor = _booleano(valor)
+        except ValueError as e:
+            errores[campo] = str(e)
+            continue
+        valores['categoria_id' if campo == 'categoria' else campo] = valor
+
+    if fila.get('id') not in (None, ''):
+        try:
+            valores['id'] = int(fila['id'])
+        except (TypeError, ValueError):
+            errores['id'] = "no es un entero"
+    elif 'nombre' not in valores and 'nombre' not in errores:
+        errores['nombre'] = "se requiere 'id' o 'nombre' para identificar el producto"
+
+    if fila.get('categoria') is not None and not errores:
+        try:
+            valores['categoria_id'] = categorias.resolver(fila['categoria'])
+        except ValueError as e:
+            errores['categoria'] = str(e)
+
+    return valores, errores
+
+
+class Importador:
+
+    def __init__(self, crear_categorias=False, dry_run=False, chunk_size=CHUNK_SIZE, usuario=None):
+        self.usuario = usuario
+        self.categorias = _Categorias(crear_categorias, dry_run)
+        self.dry_run = dry_run
+        self.chunk_size = chunk_size
+        self.resultado = {'procesadas': 0, 'creados': 0, 'actualizados': 0, 'errores': [], 'total_errores': 0}
+        self._ids_modificados = set()
+        self._categorias_afectadas = set()
+
+    def _error(self, numero, errores):
+        self.resultado['total_errores'] += 1
+        if len(self.resultado['errores']) < MAX_ERRORES:
+            self.resultado['errores'].append({'fila': numero, 'errores': errores})
+
+    def _existentes(self, bloque):
+        """
+        Una consulta por clave y bloque: clave -> {'id', 'nombre', 'precio_venta', 'categoria_id'}
+        (las columnas NOT NULL, que el upsert necesita aunque la fila no las traiga).
+        """
+        columnas = ['id'] + sorted(_COMPLETOS)
+        ids = {v['id'] for _, v in bloque if 'id' in v}
+        nombres = {v['nombre'] for _, v in bloque if 'id' not in v}
+        por_id, por_nombre = {}, {}
+        if ids:
+            for fila in Producto.objects.filter(id__in=ids).values(*columnas):
+                por_id[fila['id']] = fila
+        if nombres:
+            for fila in Producto.objects.filter(nombre__in=nombres).values(*columnas):
+                # None marca un nombre repetido en el catálogo: no se puede decidir cuál actualizar
+                por_nombre[fila['nombre']] = None if fila['nombre'] in por_nombre else fila
+        return por_id, por_nombre
+
+    def _procesar_bloque(self, bloque):
+        por_id, por_nombre = self._existentes(bloque)
+        ahora = timezone.now()
+        nuevos = {}          # nombre -> Producto (el último gana)
+        actualizar = {}      # id -> (Producto, campos)
+        precios_anteriores = {}
+
+        for numero, valores in bloque:
+            if 'id' in valores:
+                existente = por_id.get(valores['id'])
+                if existente is None:
+                    self._error(numero, {'id': f"producto {valores['id']} no existe"})
+                    continue
+            else:
+                if por_nombre.get(valores['nombre'], False) is None:
+                    self._error(numero, {'nombre': "hay varios productos con este nombre; use 'id'"})
+                    continue
+                existente = por_nombre.get(valores['nombre'])
+
+            campos = {k: v for k, v in valores.items() if k != 'id'}
+            if existente is None:
+                faltantes = [c for c in OBLIGATORIOS_NUEVO if ('categoria_id' if c == 'categoria' else c) not in campos]
+                if faltantes:
+                    self._error(numero, {c: "obligatorio para productos nuevos" for c in faltantes})
+                    continue
+                nuevos[campos['nombre']] = Producto(**campos)
+                continue
+
+            pk = existente['id']
+            if 'precio_venta' in campos:
+                precios_anteriores.setdefault(pk, existente['precio_venta'])
+            producto, campos_previos = actualizar.get(pk, (Producto(**existente), set()))
+            for campo, valor in campos.items():
+                setattr(producto, campo, valor)
+            actualizar[pk] = (producto, campos_previos | set(campos))
+            self._categorias_afectadas.add(existente['categoria_id'])
+
+        if self.dry_run:
+            self.resultado['creados'] += len(nuevos)
+            self.resultado['actualizados'] += len(actualizar)
+            return
+
+        # Las escrituras masivas exigen los mismos campos en todos los objetos: se agrupan
+        grupos = {}
+        for producto, campos in actualizar.values():
+            producto.fecha_actualizacion = ahora  # bulk_update no aplica auto_now
+            grupos.setdefault(frozenset(campos), []).append(producto)
+
+        upsert = connection.features.supports_update_conflicts_with_target
+        with transaction.atomic():
+            for campos, productos in grupos.items():
+                campos = sorted(campos) + ['fecha_actualizacion']
+                if upsert:
+                    # INSERT ... ON CONFLICT (id) DO UPDATE de solo esas columnas: mucho
+                    # más liviano que el CASE por fila que arma bulk_update
+                    Producto.objects.bulk_create(
+                        productos, update_conflicts=True, unique_fields=['id'], update_fields=campos,
+                    )
+                else:
+                    Producto.objects.bulk_update(productos, campos, batch_size=BULK_UPDATE_BATCH)
+            creados = Producto.objects.bulk_create(list(nuevos.values()))
+            registrar_cambios(
+                precios_anteriores,
+                {pk: actualizar[pk][0].precio_venta for pk in precios_anteriores},
+                usuario=self.usuario,
+                motivo='Importación masiva',
+                fecha=ahora,
+            )
+
+        self.resultado['creados'] += len(creados)
+        self.resultado['actualizados'] += len(actualizar)
+        self._ids_modificados.update(actualizar)
+        self._ids_modificados.update(p.pk for p in creados)
+        self._categorias_afectadas.update(p.categoria_id for p in creados)
+        self._categorias_afectadas.update(
+            p.categoria_id for p, campos in actualizar.values() if 'categoria_id' in campos
+        )
+
+    def importar(self, filas):
+        bloque = []
+        for numero, fila in filas:
+            self.resultado['procesadas'] += 1
+            if fila is None:
+                self._error(numero, {'fila': "no es un objeto JSON válido"})
+                continue
+            valores, errores = _validar(fila, self.categorias)
+            if errores:
+                self._error(numero, errores)
+                continue
+            bloque.append((numero, valores))
+            if len(bloque) >= self.chunk_size:
+                self._procesar_bloque(bloque)
+                bloque = []
+        if bloque:
+            self._procesar_bloque(bloque)
+
+        if not self.dry_run:
+            self._actualizar_derivados()
+        self.resultado['categorias_creadas'] = self.categorias.creadas
+        return self.resultado
+
+    def _actualizar_derivados(self):
+        """Lo que las señales harían fila por fila, una vez para todo el lote."""
+        from .signals import catalogo_modificado
+
+        ids = sorted(self._ids_modificados)
+        for i in range(0, len(ids), self.chunk_size):
+            indexar_productos(Producto.objects.filter(id__in=ids[i:i + self.chunk_size]).only('id', 'nombre', 'descripcion'))
+        recalcular_resumenes(self._categorias_afectadas)
+        if ids or self.categorias.creadas:
+            # El índice local no vio estos cambios: se reconstruye en la próxima consulta
+            autocomplete.indice.invalidar()
+            catalogo_modificado()
+
+
+def importar_productos(archivo, formato, crear_categorias=False, dry_run=False, chunk_size=CHUNK_SIZE, usuario=None):
+    """
+    Importa productos desde un archivo CSV/JSONL. Devuelve
+    {'procesadas', 'creados', 'actualizados', 'errores', 'total_errores', 'categorias_creadas'}.
+    """
+    importador = Importador(
+        crear_categorias=crear_categorias, dry_run=dry_run, chunk_size=chunk_size, usuario=usuario
+    )
+    return importador.importar(leer_filas(archivo, formato))
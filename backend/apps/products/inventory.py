@@ -0,0 +1,193 @@
+"""
+Stock de productos y reservas para pagos pendientes.
+
+Solo los productos con fila en Inventario tienen stock controlado; el resto
+se vende sin límite, como hasta ahora.
+
+El descuento es un único UPDATE condicional para todas las líneas del
+carrito:
+
+    UPDATE inventario SET stock = stock - CASE producto_id WHEN .. END
+    WHERE producto_id IN (..) AND stock >= CASE producto_id WHEN .. END
+
+No hay lectura previa ni SELECT FOR UPDATE: el bloqueo de fila dura solo
+desde ese UPDATE hasta el commit, por eso el checkout lo ejecuta al final
+de su transacción. Si alguna línea no alcanza, se revierte todo el
+descuento y se informa qué productos faltan.
+
+Los pagos PayPal quedan pendientes: su stock se descuenta igual pero como
+ReservaStock con vencimiento. Al completarse el pago la reserva se
+confirma; si falla, se cancela o vence, el stock vuelve
+(python manage.py liberar_reservas).
+
+Un pago puede completarse después de que su reserva venció. En ese caso el
+stock se vuelve a descontar con el mismo UPDATE condicional; si ya no
+alcanza, la reserva queda FALTANTE y la venta se marca con
+requiere_revision en lugar de dejar el stock negativo.
+"""
+import logging
+
+from collections import Counter
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, F, IntegerField, Value, When
+from django.utils import timezone
+
+from .models import Inventario, ReservaStock
+
+logger = logging.getLogger(__name__)
+
+
+class StockInsuficiente(Exception):
+
+    def __init__(self, faltantes):
+        # [{'producto_id', 'solicitado', 'disponible'}]
+        self.faltantes = faltantes
+        super().__init__("Stock insuficiente para: " + ', '.join(str(f['producto_id']) for f in faltantes))
+
+
+def _por_producto(cantidades):
+    """Valor por producto como expresión SQL: CASE producto_id WHEN id THEN cantidad ... END"""
+    return Case(
+        *[When(producto_id=pk, then=Value(cantidad)) for pk, cantidad in cantidades.items()],
+        output_field=IntegerField(),
+    )
+
+
+def _agrupar(lineas):
+    """[(producto_id, cantidad), ...] o {producto_id: cantidad} -> Counter"""
+    total = Counter()
+    for pk, cantidad in (lineas.items() if isinstance(lineas, dict) else lineas):
+        total[pk] += cantidad
+    return total
+
+
+def descontar_stock(lineas):
+    """
+    Descuenta el stock de todas las líneas con un solo UPDATE. Ignora los
+    productos sin inventario. Lanza StockInsuficiente sin descontar nada
+    si alguna línea no alcanza.
+    """
+    cantidades = _agrupar(lineas)
+    if not cantidades:
+        return {}
+
+    por_producto = _por_producto(cantidades)
+    try:
+        with transaction.atomic():
+            actualizados = Inventario.objects.filter(
+                producto_id__in=list(cantidades), stock__gte=por_producto
+            ).update(stock=F('stock') - por_producto, fecha_actualizacion=timezone.now())
+
+            if actualizados < len(cantidades):
+                # Puede que solo falten productos sin inventario, que no se controlan
+                controlados = Inventario.objects.filter(producto_id__in=list(cantidades)).count()
+                if actualizados < controlados:
+                    raise StockInsuficiente([])
+    except StockInsuficiente:
+        # El descuento parcial ya se revirtió: se informa con el stock real
+        disponibles = dict(
+            Inventario.objects.filter(producto_id__in=list(cantidades)).values_list('producto_id', 'stock')
+        )
+        raise StockInsuficiente([
+            {'producto_id': pk, 'solicitado': cantidad, 'disponible': disponibles[pk]}
+            for pk, cantidad in cantidades.items()
+            if pk in disponibles and disponibles[pk] < cantidad
+        ])
+
+    return cantidades
+
+
+def reservar_stock(pago, lineas, minutos=None):
+    """
+    Descuenta el stock y lo deja reservado para un pago pendiente hasta que
+    se confirme, se libere o venza.
+    """
+    cantidades = descontar_stock(lineas)
+    if not cantidades:
+        return []
+
+    controlados = set(
+        Inventario.objects.filter(producto_id__in=list(cantidades)).values_list('producto_id', flat=True)
+    )
+    minutos = minutos or getattr(settings, 'STOCK_RESERVATION_MINUTES', 30)
+    expira = timezone.now() + timedelta(minutes=minutos)
+    return ReservaStock.objects.bulk_create([
+        ReservaStock(producto_id=pk, pago=pago, cantidad=cantidad, expira=expira)
+        for pk, cantidad in cantidades.items()
+        if pk in controlados
+    ])
+
+
+def confirmar_reservas(pago_ids):
+    """
+    El pago se completó: el stock reservado queda vendido. Las reservas que
+    ya se liberaron vuelven a descontar su stock, producto por producto; las
+    que no alcanzan quedan FALTANTE y su venta se marca para revisar.
+    Devuelve cuántas reservas se confirmaron.
+    """
+    from apps.sales.models import Venta
+
+    with transaction.atomic():
+        confirmadas = ReservaStock.objects.filter(pago_id__in=pago_ids, estado=ReservaStock.ACTIVA).update(
+            estado=ReservaStock.CONFIRMADA
+        )
+        liberadas = list(
+            ReservaStock.objects.select_for_update()
+            .filter(pago_id__in=pago_ids, estado=ReservaStock.LIBERADA)
+            .order_by('id')
+            .values_list('id', 'pago_id', 'producto_id', 'cantidad')
+        )
+        if not liberadas:
+            return confirmadas
+
+        retomadas, faltantes, sin_stock = [], [], set()
+        for reserva_id, pago_id, producto_id, cantidad in liberadas:
+            try:
+                descontar_stock([(producto_id, cantidad)])
+                retomadas.append(reserva_id)
+            except StockInsuficiente:
+                faltantes.append(reserva_id)
+                sin_stock.add(pago_id)
+
+        ReservaStock.objects.filter(id__in=retomadas).update(estado=ReservaStock.CONFIRMADA)
+        if faltantes:
+            ReservaStock.objects.filter(id__in=faltantes).update(estado=ReservaStock.FALTANTE)
+            Venta.objects.filter(pago_id__in=sin_stock).update(requiere_revision=True, fecha_actualizacion=timezone.now())
+            logger.warning(f"⚠️ Pagos completados sin stock tras vencer la reserva: {sorted(sin_stock)}")
+    return confirmadas + len(retomadas)
+
+
+def liberar_reservas(pago_ids=None, vencidas=False, limite=1000):
+    """
+    Devuelve al stock las reservas activas de los pagos dados (o las
+    vencidas) con un UPDATE por lote. Las reservas que otro proceso está
+    liberando se saltan (skip_locked). Devuelve cuántas se liberaron.
+    """
+    filtro = ReservaStock.objects.filter(estado=ReservaStock.ACTIVA)
+    if pago_ids is not None:
+        filtro = filtro.filter(pago_id__in=pago_ids)
+    if vencidas:
+        filtro = filtro.filter(expira__lte=timezone.now())
+
+    liberadas = 0
+    while True:
+        with transaction.atomic():
+            reservas = list(
+                filtro.select_for_update(skip_locked=True).order_by('id').values_list('id', 'producto_id', 'cantidad')[:limite]
+            )
+            if not reservas:
+                break
+
+            cantidades = _agrupar((pk, cantidad) for _, pk, cantidad in reservas)
+            Inventario.objects.filter(producto_id__in=list(cantidades)).update(
+                stock=F('stock') + _por_producto(cantidades), fecha_actualizacion=timezone.now()
+            )
+            ReservaStock.objects.filter(id__in=[r[0] for r in reservas]).update(estado=ReservaStock.LIBERADA)
+            liberadas += len(reservas)
+
+        if len(reservas) < limite:
+            break
+    return liberadas
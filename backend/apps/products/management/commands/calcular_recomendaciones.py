@@ -0,0 +1,19 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from apps.products.personalized import calcular_recomendaciones
+
+
+class Command(BaseCommand):
+    help = 'Precalcula las recomendaciones personalizadas de los clientes (item-kNN sobre sus compras)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--pendientes', action='store_true', help='Solo clientes con compras nuevas o sin recomendaciones')
+        parser.add_argument('--workers', type=int, help='Procesos (por defecto RECOMMENDATIONS_WORKERS)')
+
+    def handle(self, *args, **options):
+        inicio = time.perf_counter()
+        procesados = calcular_recomendaciones(solo_pendientes=options['pendientes'], workers=options['workers'])
+        duracion = time.perf_counter() - inicio
+        self.stdout.write(self.style.SUCCESS(f"✅ Recomendaciones de {procesados} clientes en {duracion:.1f}s"))
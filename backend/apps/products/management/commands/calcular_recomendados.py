@@ -0,0 +1,21 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from apps.products.recommendations import calcular_recomendados
+
+
+class Command(BaseCommand):
+    help = 'Actualiza los productos "comprados juntos" con las ventas completadas nuevas'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--completo', action='store_true', help='Reconstruye la matriz desde todas las ventas')
+
+    def handle(self, *args, **options):
+        inicio = time.perf_counter()
+        resultado = calcular_recomendados(completo=options['completo'])
+        duracion = time.perf_counter() - inicio
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ {resultado['ventas']} ventas nuevas en {duracion:.1f}s: "
+            f"{resultado['productos']} productos actualizados, {resultado['filas']} relaciones"
+        ))
@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand
+
+from apps.products.images import necesita_derivadas, procesar_producto
+from apps.products.models import Producto
+
+
+class Command(BaseCommand):
+    help = 'Genera las miniaturas WebP/JPEG de los productos con imagen que aún no las tienen'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--todos', action='store_true',
+            help='Regenera también las miniaturas que ya están al día'
+        )
+
+    def handle(self, *args, **options):
+        productos = Producto.objects.exclude(imagen='').exclude(imagen__isnull=True).only(
+            'id', 'imagen', 'imagenes_derivadas'
+        ).order_by('id')
+
+        generados = errores = 0
+        for producto in productos.iterator(chunk_size=200):
+            if not options['todos'] and not necesita_derivadas(producto):
+                continue
+            if options['todos']:
+                # Fuerza la regeneración aunque 'origen' coincida
+                Producto.objects.filter(pk=producto.pk).update(imagenes_derivadas={})
+            try:
+                if procesar_producto(producto.pk):
+                    generados += 1
+            except Exception as e:
+                errores += 1
+                self.stderr.write(f"❌ Producto {producto.pk} ({producto.imagen.name}): {e}")
+
+        self.stdout.write(self.style.SUCCESS(f"✅ Miniaturas generadas para {generados} productos ({errores} errores)"))
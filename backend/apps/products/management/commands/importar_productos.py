@@ -0,0 +1,43 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.products.importer import CHUNK_SIZE, ErrorImportacion, detectar_formato, importar_productos
+
+
+class Command(BaseCommand):
+    help = 'Importa o actualiza productos en bloque desde un archivo CSV o JSONL'
+
+    def add_arguments(self, parser):
+        parser.add_argument('ruta', help='Archivo .csv o .jsonl')
+        parser.add_argument('--formato', choices=['csv', 'jsonl'], help='Por defecto según la extensión')
+        parser.add_argument('--crear-categorias', action='store_true', help='Crea las categorías que no existan')
+        parser.add_argument('--dry-run', action='store_true', help='Solo valida, no escribe')
+        parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE)
+        parser.add_argument('--max-errores', type=int, default=20, help='Errores a mostrar')
+
+    def handle(self, *args, **options):
+        inicio = time.perf_counter()
+        try:
+            formato = options['formato'] or detectar_formato(options['ruta'])
+            with open(options['ruta'], 'rb') as archivo:
+                resultado = importar_productos(
+                    archivo,
+                    formato,
+                    crear_categorias=options['crear_categorias'],
+                    dry_run=options['dry_run'],
+                    chunk_size=options['chunk_size'],
+                )
+        except (OSError, ErrorImportacion, UnicodeDecodeError) as e:
+            raise CommandError(str(e))
+
+        for error in resultado['errores'][:options['max_errores']]:
+            self.stderr.write(f"  fila {error['fila']}: {error['errores']}")
+
+        duracion = time.perf_counter() - inicio
+        prefijo = '🔎 (dry run) ' if options['dry_run'] else '✅ '
+        self.stdout.write(self.style.SUCCESS(
+            f"{prefijo}{resultado['procesadas']} filas en {duracion:.1f}s: "
+            f"{resultado['creados']} creados, {resultado['actualizados']} actualizados, "
+            f"{resultado['total_errores']} con errores, {resultado['categorias_creadas']} categorías nuevas"
+        ))
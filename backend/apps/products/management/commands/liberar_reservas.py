@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from apps.products.inventory import liberar_reservas
+
+
+class Command(BaseCommand):
+    help = 'Devuelve al stock las reservas de pagos pendientes que ya vencieron'
+
+    def handle(self, *args, **options):
+        liberadas = liberar_reservas(vencidas=True)
+        self.stdout.write(self.style.SUCCESS(f"✅ {liberadas} reservas vencidas liberadas"))
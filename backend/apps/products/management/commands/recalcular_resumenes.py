@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from apps.products.summaries import recalcular_resumenes
+
+
+class Command(BaseCommand):
+    help = 'Recalcula el resumen (cantidad y rango de precios) de todas las categorías'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', default='default')
+
+    def handle(self, *args, **options):
+        total = recalcular_resumenes(using=options['database'])
+        self.stdout.write(self.style.SUCCESS(f"✅ {total} resúmenes de categoría recalculados"))
@@ -0,0 +1,54 @@
+# Generated by Django 5.2.7 on 2026-10-19 15:34
+
+import django.contrib.postgres.search
+import django.db.models.deletion
+from django.db import migrations, models
+
+from apps.products import search
+
+
+def crear_indice(apps, schema_editor):
+    search.crear_indice(schema_editor.connection)
+
+
+def eliminar_indice(apps, schema_editor):
+    search.eliminar_indice(schema_editor.connection)
+
+
+def poblar_indice(apps, schema_editor):
+    Producto = apps.get_model('products', 'Producto')
+    ProductoBusqueda = apps.get_model('products', 'ProductoBusqueda')
+    alias = schema_editor.connection.alias
+
+    ProductoBusqueda.objects.using(alias).bulk_create(
+        [
+            ProductoBusqueda(producto_id=pk, documento=search.documento_de(nombre, descripcion))
+            for pk, nombre, descripcion in Producto.objects.using(alias).values_list('id', 'nombre', 'descripcion')
+        ],
+        batch_size=1000,
+    )
+    search.sincronizar_motor(schema_editor.connection)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductoBusqueda',
+            fields=[
+                ('producto', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='busqueda', serialize=False, to='products.producto')),
+                ('documento', models.TextField()),
+                ('vector', django.contrib.postgres.search.SearchVectorField(blank=True, null=True)),
+            ],
+            options={
+                'verbose_name': 'Índice de búsqueda',
+                'verbose_name_plural': 'Índice de búsqueda',
+            },
+        ),
+        migrations.RunPython(crear_indice, eliminar_indice),
+        migrations.RunPython(poblar_indice, migrations.RunPython.noop),
+    ]
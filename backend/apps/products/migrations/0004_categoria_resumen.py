@@ -0,0 +1,66 @@
+# Generated by Django 5.2.7 on 2026-10-19 15:41
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, Max, Min
+from django.utils import timezone
+
+
+def poblar_resumenes(apps, schema_editor):
+    Categoria = apps.get_model('products', 'Categoria')
+    CategoriaResumen = apps.get_model('products', 'CategoriaResumen')
+    Producto = apps.get_model('products', 'Producto')
+    alias = schema_editor.connection.alias
+
+    totales = {
+        fila['categoria_id']: fila
+        for fila in Producto.objects.using(alias).filter(activo=True).order_by().values('categoria_id')
+        .annotate(total=Count('id'), minimo=Min('precio_venta'), maximo=Max('precio_venta'))
+    }
+    ahora = timezone.now()
+    CategoriaResumen.objects.using(alias).bulk_create(
+        [
+            CategoriaResumen(
+                categoria_id=pk,
+                total_productos=totales.get(pk, {}).get('total', 0),
+                precio_min=totales.get(pk, {}).get('minimo'),
+                precio_max=totales.get(pk, {}).get('maximo'),
+                fecha_actualizacion=ahora,
+            )
+            for pk in Categoria.objects.using(alias).values_list('id', flat=True)
+        ],
+        batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0003_categoria_fecha_actualizacion_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CategoriaResumen',
+            fields=[
+                ('categoria', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='resumen', serialize=False, to='products.categoria')),
+                ('total_productos', models.PositiveIntegerField(default=0)),
+                ('precio_min', models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True)),
+                ('precio_max', models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True)),
+                ('fecha_actualizacion', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Resumen de categoría',
+                'verbose_name_plural': 'Resúmenes de categorías',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='producto',
+            index=models.Index(fields=['activo', 'destacado', '-fecha_creacion', '-id'], name='products_pr_activo_69f1da_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='producto',
+            index=models.Index(fields=['categoria', 'activo', '-fecha_creacion', '-id'], name='products_pr_categor_fb87db_idx'),
+        ),
+        migrations.RunPython(poblar_resumenes, migrations.RunPython.noop),
+    ]
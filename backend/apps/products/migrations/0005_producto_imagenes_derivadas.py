@@ -0,0 +1,18 @@
+# Generated by Django 5.2.7 on 2026-10-19 15:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0004_categoria_resumen'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='producto',
+            name='imagenes_derivadas',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 5.2.7 on 2026-10-19 15:51
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payments', '0001_initial'),
+        ('products', '0006_historial_precio'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Inventario',
+            fields=[
+                ('producto', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='inventario', serialize=False, to='products.producto')),
+                ('stock', models.PositiveIntegerField(default=0)),
+                ('fecha_actualizacion', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Inventario',
+                'verbose_name_plural': 'Inventario',
+            },
+        ),
+        migrations.CreateModel(
+            name='ReservaStock',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('cantidad', models.PositiveIntegerField()),
+                ('estado', models.CharField(choices=[('activa', 'Activa'), ('confirmada', 'Confirmada'), ('liberada', 'Liberada')], default='activa', max_length=20)),
+                ('expira', models.DateTimeField()),
+                ('fecha_creacion', models.DateTimeField(auto_now_add=True)),
+                ('pago', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='reservas_stock', to='payments.payment')),
+                ('producto', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='reservas', to='products.producto')),
+            ],
+            options={
+                'verbose_name': 'Reserva de stock',
+                'verbose_name_plural': 'Reservas de stock',
+                'indexes': [models.Index(fields=['estado', 'expira'], name='products_re_estado_cea226_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.7 on 2026-10-19 16:03
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0008_producto_relacionado'),
+        ('users', '0002_segmento_cliente'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RecomendacionCliente',
+            fields=[
+                ('usuario', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='recomendaciones', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('productos', models.JSONField(default=list)),
+                ('desactualizada', models.BooleanField(default=False)),
+                ('fecha_calculo', models.DateTimeField()),
+            ],
+            options={
+                'verbose_name': 'Recomendación de cliente',
+                'verbose_name_plural': 'Recomendaciones de clientes',
+            },
+        ),
+    ]
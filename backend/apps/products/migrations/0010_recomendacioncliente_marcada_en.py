@@ -0,0 +1,18 @@
+# Generated by Django 5.2.7 on 2026-10-19 16:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0009_recomendacion_cliente'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recomendacioncliente',
+            name='marcada_en',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
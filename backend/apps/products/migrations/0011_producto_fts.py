@@ -0,0 +1,25 @@
+# Generated by Django 5.2.7 on 2026-10-19 16:19
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0010_recomendacioncliente_marcada_en'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductoFTS',
+            fields=[
+                ('producto', models.OneToOneField(db_column='rowid', db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, primary_key=True, related_name='fts', serialize=False, to='products.producto')),
+                ('documento', models.TextField()),
+            ],
+            options={
+                'db_table': 'products_producto_fts',
+                'managed': False,
+            },
+        ),
+    ]
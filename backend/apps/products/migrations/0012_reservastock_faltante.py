@@ -0,0 +1,18 @@
+# Generated by Django 5.2.7 on 2026-10-19 16:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0011_producto_fts'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='reservastock',
+            name='estado',
+            field=models.CharField(choices=[('activa', 'Activa'), ('confirmada', 'Confirmada'), ('liberada', 'Liberada'), ('faltante', 'Faltante')], default='activa', max_length=20),
+        ),
+    ]
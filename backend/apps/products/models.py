@@ -1,14 +1,22 @@
 from django.db import models
+from django.conf import settings
+from django.utils import timezone
 from django.core.validators import MinValueValidator
+from django.contrib.postgres.search import SearchVectorField
 
 class Categoria(models.Model):
     nombre = models.CharField(max_length=100, unique=True)
     caracteristicas = models.TextField(blank=True, null=True)
+    # Para la sincronización incremental de la app móvil
+    fecha_actualizacion = models.DateTimeField(auto_now=True)
     
     class Meta:
         verbose_name = 'Categoría'
         verbose_name_plural = 'Categorías'
         ordering = ['nombre']
+        indexes = [
+            models.Index(fields=['fecha_actualizacion', 'id']),
+        ]
     
     def __str__(self):
         return self.nombre
@@ -37,6 +45,8 @@ class Producto(models.Model):
         blank=True, 
         null=True
     )
+    # Miniaturas WebP/JPEG generadas a partir de 'imagen' (ver images.py)
+    imagenes_derivadas = models.JSONField(default=dict, blank=True)
     
     # Campos básicos para estado
     activo = models.BooleanField(default=True)
@@ -54,7 +64,248 @@ class Producto(models.Model):
             models.Index(fields=['nombre']),
             models.Index(fields=['categoria']),
             models.Index(fields=['precio_venta']),
+            # Keyset de la sincronización incremental (apps.sales.sync)
+            models.Index(fields=['fecha_actualizacion', 'id']),
+            # Orden estable de 'destacados' y 'por_categoria'
+            models.Index(fields=['activo', 'destacado', '-fecha_creacion', '-id']),
+            models.Index(fields=['categoria', 'activo', '-fecha_creacion', '-id']),
         ]
     
     def __str__(self):
-        return f"{self.nombre} - ${self.precio_venta}"
\ No newline at end of file
+        return f"{self.nombre} - ${self.precio_venta}"
+
+class ProductoBusqueda(models.Model):
+    """
+    Documento de búsqueda de un producto: nombre y descripción en
+    minúsculas y sin acentos. Se actualiza al guardar el producto
+    (ver signals.py y search.py).
+    """
+    producto = models.OneToOneField(
+        Producto,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='busqueda'
+    )
+    documento = models.TextField()
+    # tsvector con índice GIN; solo se llena en PostgreSQL
+    vector = SearchVectorField(null=True, blank=True)
+
+    class Meta:
+        verbose_name = 'Índice de búsqueda'
+        verbose_name_plural = 'Índice de búsqueda'
+
+    def __str__(self):
+        return f"Búsqueda de producto #{self.producto_id}"
+
+
+class ProductoFTS(models.Model):
+    """
+    Tabla virtual FTS5 de la búsqueda en SQLite (ver search.py). No la
+    maneja Django: la crea la migración de ProductoBusqueda y solo existe
+    en SQLite. El modelo permite unirla a las consultas de Producto.
+    """
+    producto = models.OneToOneField(
+        Producto,
+        on_delete=models.DO_NOTHING,
+        primary_key=True,
+        db_column='rowid',
+        db_constraint=False,
+        related_name='fts'
+    )
+    documento = models.TextField()
+
+    class Meta:
+        managed = False
+        db_table = 'products_producto_fts'
+
+
+@ProductoFTS._meta.get_field('documento').register_lookup
+class Match(models.Lookup):
+    """documento__match='"sams"* AND "tv"*' -> documento MATCH ... (FTS5)"""
+    lookup_name = 'match'
+
+    def as_sql(self, compiler, connection):
+        lhs, lhs_params = self.process_lhs(compiler, connection)
+        rhs, rhs_params = self.process_rhs(compiler, connection)
+        return f"{lhs} MATCH {rhs}", [*lhs_params, *rhs_params]
+
+class CategoriaResumen(models.Model):
+    """
+    Totales precalculados de los productos activos de una categoría, para
+    no recorrer el catálogo en cada página de categoría. Se recalcula al
+    guardar o eliminar productos (ver signals.py y summaries.py).
+    """
+    categoria = models.OneToOneField(
+        Categoria,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='resumen'
+    )
+    total_productos = models.PositiveIntegerField(default=0)
+    precio_min = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
+    precio_max = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
+    fecha_actualizacion = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = 'Resumen de categoría'
+        verbose_name_plural = 'Resúmenes de categorías'
+
+    def __str__(self):
+        return f"{self.categoria_id}: {self.total_productos} productos"
+
+class HistorialPrecio(models.Model):
+    """
+    Cambio de precio de un producto. Permite cruzar DetalleVenta.precio_unitario
+    con el precio vigente en cada fecha (ver pricing.py).
+    """
+    producto = models.ForeignKey(
+        Producto,
+        on_delete=models.CASCADE,
+        related_name='historial_precios'
+    )
+    precio_anterior = models.DecimalField(max_digits=10, decimal_places=2)
+    precio_nuevo = models.DecimalField(max_digits=10, decimal_places=2)
+    fecha = models.DateTimeField(default=timezone.now)
+    usuario = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='+'
+    )
+    motivo = models.CharField(max_length=200, blank=True)
+
+    class Meta:
+        verbose_name = 'Historial de precio'
+        verbose_name_plural = 'Historial de precios'
+        ordering = ['-fecha']
+        indexes = [
+            models.Index(fields=['producto', 'fecha']),
+            models.Index(fields=['fecha']),
+        ]
+
+    def __str__(self):
+        return f"{self.producto_id}: {self.precio_anterior} -> {self.precio_nuevo}"
+
+class Inventario(models.Model):
+    """
+    Stock de un producto. Los productos sin fila de inventario no tienen
+    control de stock (ver inventory.py).
+    """
+    producto = models.OneToOneField(
+        Producto,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='inventario'
+    )
+    stock = models.PositiveIntegerField(default=0)
+    fecha_actualizacion = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = 'Inventario'
+        verbose_name_plural = 'Inventario'
+
+    def __str__(self):
+        return f"{self.producto_id}: {self.stock}"
+
+class ReservaStock(models.Model):
+    """Stock apartado para un pago pendiente (PayPal) hasta que se confirme o venza."""
+    ACTIVA = 'activa'
+    CONFIRMADA = 'confirmada'
+    LIBERADA = 'liberada'
+    # El pago se completó después de liberar la reserva y ya no había stock
+    FALTANTE = 'faltante'
+    ESTADO_CHOICES = [
+        (ACTIVA, 'Activa'),
+        (CONFIRMADA, 'Confirmada'),
+        (LIBERADA, 'Liberada'),
+        (FALTANTE, 'Faltante'),
+    ]
+
+    producto = models.ForeignKey(
+        Producto,
+        on_delete=models.CASCADE,
+        related_name='reservas'
+    )
+    pago = models.ForeignKey(
+        'payments.Payment',
+        on_delete=models.CASCADE,
+        related_name='reservas_stock'
+    )
+    cantidad = models.PositiveIntegerField()
+    estado = models.CharField(max_length=20, choices=ESTADO_CHOICES, default=ACTIVA)
+    expira = models.DateTimeField()
+    fecha_creacion = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = 'Reserva de stock'
+        verbose_name_plural = 'Reservas de stock'
+        indexes = [
+            models.Index(fields=['estado', 'expira']),
+        ]
+
+    def __str__(self):
+        return f"Pago {self.pago_id}: {self.cantidad} x {self.producto_id} ({self.estado})"
+
+
+class ProductoRelacionado(models.Model):
+    """
+    "Comprados juntos": los productos que más aparecen en las mismas ventas
+    que 'producto', ya ordenados (ver recommendations.py).
+    """
+    producto = models.ForeignKey(
+        Producto,
+        on_delete=models.CASCADE,
+        related_name='relacionados'
+    )
+    relacionado = models.ForeignKey(
+        Producto,
+        on_delete=models.CASCADE,
+        related_name='+'
+    )
+    # Ventas con ambos productos y fracción de las ventas de 'producto' que incluyen al relacionado
+    veces = models.PositiveIntegerField()
+    puntaje = models.FloatField()
+    posicion = models.PositiveSmallIntegerField()
+
+    class Meta:
+        verbose_name = 'Producto relacionado'
+        verbose_name_plural = 'Productos relacionados'
+        ordering = ['producto', 'posicion']
+        constraints = [
+            models.UniqueConstraint(fields=['producto', 'relacionado'], name='products_relacionado_unico'),
+        ]
+        indexes = [
+            models.Index(fields=['producto', 'posicion']),
+        ]
+
+    def __str__(self):
+        return f"{self.producto_id} -> {self.relacionado_id} ({self.veces})"
+
+
+class RecomendacionCliente(models.Model):
+    """
+    Productos recomendados para un cliente, precalculados por lotes (ver
+    personalized.py). Una fila por cliente: el endpoint la lee sin cálculo.
+    """
+    usuario = models.OneToOneField(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='recomendaciones'
+    )
+    # [[producto_id, puntaje], ...] de mayor a menor
+    productos = models.JSONField(default=list)
+    # Compró algo después del cálculo: se recalcula en la próxima corrida con --pendientes
+    desactualizada = models.BooleanField(default=False)
+    # Cuándo se marcó desactualizada: una corrida que empezó antes no la pisa
+    marcada_en = models.DateTimeField(null=True, blank=True)
+    fecha_calculo = models.DateTimeField()
+
+    class Meta:
+        verbose_name = 'Recomendación de cliente'
+        verbose_name_plural = 'Recomendaciones de clientes'
+
+    def __str__(self):
+        return f"{self.usuario_id}: {len(self.productos)} productos"
+
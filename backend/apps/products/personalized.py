@@ -0,0 +1,267 @@
+"""
+Recomendaciones personalizadas por cliente (item-kNN sobre compras).
+
+El cálculo corre por lotes (python manage.py calcular_recomendaciones),
+nunca en una petición:
+
+1. Una consulta agrupada arma la matriz dispersa clientes x productos R
+   con peso 1 + log(ventas en que compró el producto).
+2. La similitud coseno entre productos S = Rn^T Rn (columnas normalizadas)
+   se poda a los VECINOS más similares de cada producto.
+3. El puntaje de un cliente es su fila de R por S, sin los productos que
+   ya compró. Los clientes se reparten en bloques entre varios procesos
+   (RECOMMENDATIONS_WORKERS); cada proceso recibe S una sola vez.
+4. Los TOP_N de cada cliente se guardan en RecomendacionCliente.
+
+El endpoint lee la lista del caché (o de esa fila) y solo consulta los
+productos. Con una compra nueva (evento 'venta.completada' del outbox,
+handlers.py) se quitan de la lista los productos comprados, se invalida
+el caché y la fila queda desactualizada para la próxima corrida.
+
+El caché solo se usa si es compartido (file o redis): el despachador del
+outbox y el comando corren en otros procesos, y con locmem su invalidación
+no llegaría a los workers web. Con locmem se lee siempre la fila.
+
+Las funciones que corren en los procesos hijos no usan el ORM: los
+modelos se importan dentro de las funciones del proceso principal.
+"""
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import connections, transaction
+from django.utils import timezone
+from scipy import sparse
+
+TOP_N = 30
+VECINOS = 50
+USUARIOS_POR_BLOQUE = 2000
+CACHE_TIMEOUT = 60 * 60 * 24
+
+# Matriz de similitud del proceso hijo (ver _iniciar_proceso)
+_similitud = None
+
+
+def cache_key(usuario_id):
+    return f"recomendaciones:{usuario_id}"
+
+
+def _cache_compartido():
+    """El caché por defecto, o None si es local al proceso."""
+    cache = caches['default']
+    return None if isinstance(cache, LocMemCache) else cache
+
+
+def matriz_compras():
+    """(R csr, ids de usuario por fila). Los productos se indexan por id."""
+    from django.db.models import Count
+    from apps.sales.models import DetalleVenta
+
+    filas = np.array(
+        list(
+            DetalleVenta.objects.filter(
+                venta__estado='COMPLETADO', venta__usuario__isnull=False, producto__isnull=False
+            )
+            .order_by()
+            .values('venta__usuario_id', 'producto_id')
+            .annotate(ventas=Count('venta', distinct=True))
+            .values_list('venta__usuario_id', 'producto_id', 'ventas')
+        ),
+        dtype=np.int64,
+    ).reshape(-1, 3)
+    if not len(filas):
+        return sparse.csr_matrix((0, 0), dtype=np.float32), np.array([], dtype=np.int64)
+
+    usuario_ids, fila_usuario = np.unique(filas[:, 0], return_inverse=True)
+    compras = sparse.csr_matrix(
+        (1 + np.log(filas[:, 2]).astype(np.float32), (fila_usuario, filas[:, 1])),
+        shape=(len(usuario_ids), int(filas[:, 1].max()) + 1),
+    )
+    return compras, usuario_ids
+
+
+def similitud_productos(compras, vecinos=VECINOS):
+    """Coseno producto x producto, con solo los 'vecinos' más similares por fila."""
+    normas = np.sqrt(np.asarray(compras.multiply(compras).sum(axis=0)).ravel())
+    normas[normas == 0] = 1
+    normalizada = compras @ sparse.diags(1 / normas).astype(np.float32)
+    similitud = (normalizada.T @ normalizada).tocsr()
+    similitud.setdiag(0)
+    similitud.eliminate_zeros()
+
+    filas, columnas, valores = [], [], []
+    for i in range(similitud.shape[0]):
+        inicio, fin = similitud.indptr[i], similitud.indptr[i + 1]
+        if inicio == fin:
+            continue
+        cols, vals = similitud.indices[inicio:fin], similitud.data[inicio:fin]
+        if len(vals) > vecinos:
+            elegidos = np.argpartition(-vals, vecinos - 1)[:vecinos]
+            cols, vals = cols[elegidos], vals[elegidos]
+        filas.append(np.full(len(cols), i))
+        columnas.append(cols)
+        valores.append(vals)
+    if not filas:
+        return sparse.csr_matrix(similitud.shape, dtype=np.float32)
+    return sparse.csr_matrix(
+        (np.concatenate(valores), (np.concatenate(filas), np.concatenate(columnas))),
+        shape=similitud.shape, dtype=np.float32,
+    )
+
+
+def _iniciar_proceso(similitud):
+    global _similitud
+    _similitud = similitud
+
+
+def puntuar_bloque(compras, usuario_ids, similitud=None, top_n=TOP_N):
+    """
+    [(usuario_id, [[producto_id, puntaje], ...]), ...] para un bloque de
+    filas de R. Corre en los procesos hijos: sin ORM.
+    """
+    similitud = similitud if similitud is not None else _similitud
+    puntajes = (compras @ similitud).tocsr()
+
+    resultado = []
+    for fila, usuario_id in enumerate(usuario_ids):
+        inicio, fin = puntajes.indptr[fila], puntajes.indptr[fila + 1]
+        cols, vals = puntajes.indices[inicio:fin], puntajes.data[inicio:fin]
+        # Fuera lo que ya compró
+        compradas = compras.indices[compras.indptr[fila]:compras.indptr[fila + 1]]
+        nuevas = ~np.isin(cols, compradas) & (vals > 0)
+        cols, vals = cols[nuevas], vals[nuevas]
+        if len(vals) > top_n:
+            elegidos = np.argpartition(-vals, top_n - 1)[:top_n]
+            cols, vals = cols[elegidos], vals[elegidos]
+        orden = np.lexsort((cols, -vals))
+        resultado.append((int(usuario_id), [[int(cols[i]), round(float(vals[i]), 4)] for i in orden]))
+    return resultado
+
+
+def _guardar(resultados, fecha):
+    """
+    Guarda los resultados de la corrida que empezó en 'fecha'. Las filas
+    marcadas desactualizadas después de 'fecha' no se tocan: la compra no
+    está en la matriz de esta corrida y la fila debe seguir pendiente.
+    """
+    from .models import RecomendacionCliente
+
+    with transaction.atomic():
+        # Bloqueadas: registrar_compra no puede marcarlas entre esta lectura y el upsert
+        recientes = set(
+            RecomendacionCliente.objects.select_for_update()
+            .filter(usuario_id__in=[usuario_id for usuario_id, _ in resultados], marcada_en__gte=fecha)
+            .values_list('usuario_id', flat=True)
+        )
+        resultados = [(usuario_id, productos) for usuario_id, productos in resultados if usuario_id not in recientes]
+        RecomendacionCliente.objects.bulk_create(
+            [
+                RecomendacionCliente(usuario_id=usuario_id, productos=productos, desactualizada=False, fecha_calculo=fecha)
+                for usuario_id, productos in resultados
+            ],
+            update_conflicts=True,
+            unique_fields=['usuario'],
+            update_fields=['productos', 'desactualizada', 'fecha_calculo'],
+            batch_size=1000,
+        )
+        # Filas que registrar_compra creó mientras tanto (no estaban para bloquearlas)
+        RecomendacionCliente.objects.filter(
+            usuario_id__in=[usuario_id for usuario_id, _ in resultados], marcada_en__gte=fecha
+        ).update(desactualizada=True)
+    cache = _cache_compartido()
+    if cache is not None:
+        cache.delete_many([cache_key(usuario_id) for usuario_id, _ in resultados])
+
+
+def calcular_recomendaciones(solo_pendientes=False, workers=None):
+    """
+    Recalcula las recomendaciones de todos los clientes con compras (o solo
+    las desactualizadas). Devuelve la cantidad de clientes procesados.
+    """
+    from .models import RecomendacionCliente
+
+    inicio = timezone.now()
+    compras, usuario_ids = matriz_compras()
+    if not len(usuario_ids):
+        return 0
+
+    filas = np.arange(len(usuario_ids))
+    if solo_pendientes:
+        pendientes = set(
+            RecomendacionCliente.objects.filter(desactualizada=True).values_list('usuario_id', flat=True)
+        )
+        sin_fila = set(usuario_ids.tolist()) - set(
+            RecomendacionCliente.objects.values_list('usuario_id', flat=True)
+        )
+        filas = filas[np.isin(usuario_ids, list(pendientes | sin_fila))]
+        if not len(filas):
+            return 0
+
+    similitud = similitud_productos(compras)
+    bloques = [filas[i:i + USUARIOS_POR_BLOQUE] for i in range(0, len(filas), USUARIOS_POR_BLOQUE)]
+    workers = workers or getattr(settings, 'RECOMMENDATIONS_WORKERS', os.cpu_count() or 1)
+    workers = max(1, min(workers, len(bloques)))
+
+    procesados = 0
+    if workers == 1:
+        for bloque in bloques:
+            resultados = puntuar_bloque(compras[bloque], usuario_ids[bloque], similitud)
+            _guardar(resultados, inicio)
+            procesados += len(resultados)
+        return procesados
+
+    # Los procesos hijos no usan la BD: no deben heredar conexiones abiertas
+    connections.close_all()
+    with ProcessPoolExecutor(max_workers=workers, initializer=_iniciar_proceso, initargs=(similitud,)) as executor:
+        futuros = [executor.submit(puntuar_bloque, compras[bloque], usuario_ids[bloque]) for bloque in bloques]
+        for futuro in futuros:
+            resultados = futuro.result()
+            _guardar(resultados, inicio)
+            procesados += len(resultados)
+    return procesados
+
+
+def recomendaciones_de(usuario_id):
+    """[[producto_id, puntaje], ...] del cliente, desde el caché o su fila."""
+    from .models import RecomendacionCliente
+
+    cache = _cache_compartido()
+    productos = cache.get(cache_key(usuario_id)) if cache is not None else None
+    if productos is None:
+        productos = (
+            RecomendacionCliente.objects.filter(usuario_id=usuario_id).values_list('productos', flat=True).first()
+            or []
+        )
+        if cache is not None:
+            cache.set(cache_key(usuario_id), productos, CACHE_TIMEOUT)
+    return productos
+
+
+def registrar_compra(venta_id, usuario_id):
+    """
+    Tras una compra: quita los productos comprados de las recomendaciones
+    del cliente, la marca desactualizada e invalida su caché. Si el cliente
+    todavía no tenía fila se crea vacía y pendiente. Idempotente.
+    """
+    from apps.sales.models import DetalleVenta
+    from .models import RecomendacionCliente
+
+    comprados = set(DetalleVenta.objects.filter(venta_id=venta_id).values_list('producto_id', flat=True))
+    ahora = timezone.now()
+    with transaction.atomic():
+        recomendacion, creada = RecomendacionCliente.objects.select_for_update().get_or_create(
+            usuario_id=usuario_id,
+            defaults={'desactualizada': True, 'marcada_en': ahora, 'fecha_calculo': ahora},
+        )
+        if not creada:
+            recomendacion.productos = [p for p in recomendacion.productos if p[0] not in comprados]
+            recomendacion.desactualizada = True
+            recomendacion.marcada_en = ahora
+            recomendacion.save(update_fields=['productos', 'desactualizada', 'marcada_en'])
+    # Después del commit: un lector no puede volver a llenar el caché con la fila vieja
+    cache = _cache_compartido()
+    if cache is not None:
+        transaction.on_commit(lambda: cache.delete(cache_key(usuario_id)))
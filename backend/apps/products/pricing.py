@@ -0,0 +1,127 @@
+"""
+Cambios de precio masivos con historial.
+
+actualizar_precios() aplica un porcentaje o un monto fijo a los productos
+de una categoría y/o una lista de ids con sentencias sobre el conjunto,
+sin traer filas a Python, dentro de una transacción:
+
+    1. INSERT INTO historial SELECT id, precio_venta, ROUND(precio_venta * factor, 2)
+       ... FOR UPDATE (bloquea las filas que se van a cambiar)
+    2. UPDATE precio_venta = ROUND(precio_venta * factor, 2) con el mismo filtro
+"""
+from decimal import Decimal
+
+from django.db import connection, transaction
+from django.db.models import CharField, DateTimeField, DecimalField, F, IntegerField, Value
+from django.db.models.functions import Round
+from django.utils import timezone
+
+from .models import HistorialPrecio, Producto
+from .summaries import recalcular_resumenes
+
+PRECIO_MINIMO = Decimal('0.01')
+PRECIO_MAXIMO = Decimal('99999999.99')
+
+
+class ErrorPrecios(ValueError):
+    pass
+
+
+def _expresion(porcentaje, monto):
+    if porcentaje is not None:
+        factor = Decimal(1) + Decimal(porcentaje) / Decimal(100)
+        if factor <= 0:
+            raise ErrorPrecios("El porcentaje debe ser mayor a -100")
+        nuevo = F('precio_venta') * Value(factor, output_field=DecimalField())
+    else:
+        nuevo = F('precio_venta') + Value(Decimal(monto), output_field=DecimalField())
+    return Round(nuevo, 2, output_field=DecimalField(max_digits=10, decimal_places=2))
+
+
+def registrar_cambios(anteriores, nuevos, usuario=None, motivo='', fecha=None):
+    """Crea el historial para los productos cuyo precio cambió. anteriores/nuevos: {id: precio}"""
+    fecha = fecha or timezone.now()
+    historial = [
+        HistorialPrecio(
+            producto_id=pk,
+            precio_anterior=anterior,
+            precio_nuevo=nuevos[pk],
+            fecha=fecha,
+            usuario=usuario,
+            motivo=motivo[:200],
+        )
+        for pk, anterior in anteriores.items()
+        if pk in nuevos and nuevos[pk] != anterior
+    ]
+    HistorialPrecio.objects.bulk_create(historial, batch_size=1000)
+    return len(historial)
+
+
+def actualizar_precios(porcentaje=None, monto=None, categoria_id=None, ids=None, usuario=None, motivo=''):
+    """
+    Cambia el precio de los productos filtrados. Exactamente uno de
+    'porcentaje' (10 = +10 %) o 'monto' (-5 = 5 menos). Los productos cuyo
+    precio quedaría fuera de rango no se tocan y se informan como omitidos.
+
+    Devuelve {'actualizados', 'omitidos', 'historial'}.
+    """
+    if (porcentaje is None) == (monto is None):
+        raise ErrorPrecios("Indique 'porcentaje' o 'monto' (solo uno)")
+    if categoria_id is None and not ids:
+        raise ErrorPrecios("Indique 'categoria_id' y/o 'ids'")
+
+    queryset = Producto.objects.all()
+    if categoria_id is not None:
+        queryset = queryset.filter(categoria_id=categoria_id)
+    if ids:
+        queryset = queryset.filter(id__in=ids)
+
+    redondeado = _expresion(porcentaje, monto)
+    en_rango = queryset.alias(nuevo_precio=redondeado).filter(
+        nuevo_precio__gte=PRECIO_MINIMO, nuevo_precio__lte=PRECIO_MAXIMO
+    )
+    ahora = timezone.now()
+
+    with transaction.atomic():
+        total = queryset.count()
+        categorias = set(en_rango.order_by().values_list('categoria_id', flat=True).distinct())
+        historial = _insertar_historial(en_rango, redondeado, usuario, motivo, ahora)
+        actualizados = en_rango.update(precio_venta=redondeado, fecha_actualizacion=ahora)
+
+        # Las escrituras masivas no disparan señales
+        recalcular_resumenes(categorias)
+
+        from .signals import catalogo_modificado
+        catalogo_modificado()
+
+    return {'actualizados': actualizados, 'omitidos': total - actualizados, 'historial': historial}
+
+
+def _insertar_historial(en_rango, redondeado, usuario, motivo, fecha):
+    """
+    INSERT ... SELECT del historial de los productos cuyo precio cambia,
+    leyendo el precio anterior y el nuevo en la misma sentencia.
+    """
+    cambios = (
+        en_rango.select_for_update()
+        .exclude(nuevo_precio=F('precio_venta'))
+        .order_by()
+        .annotate(
+            h_producto=F('id'),
+            h_anterior=F('precio_venta'),
+            h_nuevo=redondeado,
+            h_fecha=Value(fecha, output_field=DateTimeField()),
+            h_usuario=Value(usuario.pk if usuario else None, output_field=IntegerField()),
+            h_motivo=Value(motivo[:200], output_field=CharField()),
+        )
+        .values_list('h_producto', 'h_anterior', 'h_nuevo', 'h_fecha', 'h_usuario', 'h_motivo')
+    )
+    select, params = cambios.query.sql_with_params()
+    tabla = connection.ops.quote_name(HistorialPrecio._meta.db_table)
+    columnas = ', '.join(
+        connection.ops.quote_name(HistorialPrecio._meta.get_field(campo).column)
+        for campo in ('producto', 'precio_anterior', 'precio_nuevo', 'fecha', 'usuario', 'motivo')
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(f"INSERT INTO {tabla} ({columnas}) {select}", params)
+        return cursor.rowcount
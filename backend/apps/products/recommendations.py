@@ -0,0 +1,247 @@
+"""
+Recomendaciones "comprados juntos" a partir de las ventas completadas.
+
+Se mantiene una matriz dispersa producto x producto (scipy.sparse) con la
+cantidad de ventas en las que aparecen juntos; la diagonal es la cantidad
+de ventas de cada producto. Se guarda en RECOMMENDATIONS_MATRIX_PATH
+(.npz) junto con una marca (fecha_actualizacion, id) de la última venta
+leída y los ids de las ventas ya sumadas, en el mismo archivo.
+
+Cada corrida solo lee las ventas completadas después de la marca, suma su
+matriz (B^T B, con B = ventas x productos) y recalcula los TOP_K vecinos de
+los productos que aparecen en ellas: el resto de las filas no cambia. El
+resultado queda en ProductoRelacionado, que el endpoint lee por índice.
+
+La marca solo evita releer todo: una venta completada que se vuelve a
+guardar (admin, cambio de estado) reaparece después de la marca, pero si
+su id ya está entre las sumadas se salta y no se cuenta dos veces.
+
+El puntaje es la fracción de las ventas del producto que incluyen al
+relacionado (P(relacionado | producto)), así que depende solo de su fila.
+Si la matriz se pierde o queda inconsistente se reconstruye con --completo.
+
+    python manage.py calcular_recomendados [--completo]
+
+No correr dos procesos a la vez: sumarían las mismas ventas.
+"""
+import os
+import tempfile
+from datetime import datetime, timedelta
+
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Max, Q
+from django.utils import timezone
+from scipy import sparse
+
+from .models import Producto, ProductoRelacionado
+
+TOP_K = 20
+LOTE_VENTAS = 50000
+# Igual que en la sincronización: no leer ventas de transacciones que aún pueden confirmarse
+RETRASO = timedelta(seconds=5)
+
+
+def _ruta():
+    return getattr(
+        settings, 'RECOMMENDATIONS_MATRIX_PATH',
+        os.path.join(settings.BASE_DIR, 'cache', 'coocurrencias.npz'),
+    )
+
+
+def cargar_matriz():
+    """
+    Devuelve (matriz csr, marca, ids de ventas sumadas ordenados) o
+    (None, None, None) si todavía no se calculó.
+    """
+    ruta = _ruta()
+    if not os.path.exists(ruta):
+        return None, None, None
+    with np.load(ruta, allow_pickle=False) as datos:
+        if 'contadas' not in datos:
+            # Archivo sin los ids de ventas sumadas: se reconstruye
+            return None, None, None
+        matriz = sparse.csr_matrix(
+            (datos['data'], datos['indices'], datos['indptr']), shape=tuple(datos['shape'])
+        )
+        marca = None
+        if int(datos['marca_id']) >= 0:
+            marca = (datetime.fromisoformat(str(datos['marca_fecha'])), int(datos['marca_id']))
+        contadas = datos['contadas']
+    return matriz, marca, contadas
+
+
+def guardar_matriz(matriz, marca, contadas):
+    """Escribe matriz, marca y ventas sumadas juntas; el reemplazo del archivo es atómico."""
+    ruta = _ruta()
+    directorio = os.path.dirname(ruta)
+    os.makedirs(directorio, exist_ok=True)
+    fecha, pk = marca if marca else (None, -1)
+    with tempfile.NamedTemporaryFile(dir=directorio, suffix='.npz', delete=False) as archivo:
+        np.savez_compressed(
+            archivo,
+            data=matriz.data, indices=matriz.indices, indptr=matriz.indptr,
+            shape=np.array(matriz.shape),
+            marca_fecha=np.array(fecha.isoformat() if fecha else ''),
+            marca_id=np.array(pk),
+            contadas=np.asarray(contadas, dtype=np.int64),
+        )
+    os.replace(archivo.name, ruta)
+
+
+def _despues_de(marca, prefijo=''):
+    if marca is None:
+        return Q()
+    fecha, pk = marca
+    return Q(**{f'{prefijo}fecha_actualizacion__gt': fecha}) | Q(
+        **{f'{prefijo}fecha_actualizacion': fecha, f'{prefijo}id__gt': pk}
+    )
+
+
+def _hasta(ultima, prefijo=''):
+    fecha, pk = ultima
+    return Q(**{f'{prefijo}fecha_actualizacion__lt': fecha}) | Q(
+        **{f'{prefijo}fecha_actualizacion': fecha, f'{prefijo}id__lte': pk}
+    )
+
+
+def _siguiente_lote(marca, hasta, contadas):
+    """
+    Pares (venta_id, producto_id) del siguiente lote de ventas completadas
+    después de la marca, sin las ya sumadas, y la marca nueva (o None si no
+    hay ventas).
+    """
+    from apps.sales.models import DetalleVenta, Venta
+
+    ventas = (
+        Venta.objects.filter(_despues_de(marca), estado='COMPLETADO', fecha_actualizacion__lte=hasta)
+        .order_by('fecha_actualizacion', 'id')
+        .values_list('fecha_actualizacion', 'id')[:LOTE_VENTAS]
+    )
+    ventas = list(ventas)
+    if not ventas:
+        return None, None
+    ultima = ventas[-1]
+
+    # Los detalles del mismo rango, con un join en lugar de una lista de ids
+    pares = np.array(
+        list(
+            DetalleVenta.objects.filter(
+                _despues_de(marca, 'venta__'), _hasta(ultima, 'venta__'),
+                venta__estado='COMPLETADO', producto_id__isnull=False,
+            ).values_list('venta_id', 'producto_id')
+        ),
+        dtype=np.int64,
+    ).reshape(-1, 2)
+    # Ventas ya sumadas que se volvieron a guardar después de la marca
+    pares = pares[~np.isin(pares[:, 0], contadas)]
+    return pares, ultima
+
+
+def coocurrencias(pares, n_productos):
+    """Matriz n x n con la cantidad de ventas en que aparece cada par (B^T B)."""
+    if not len(pares):
+        return sparse.csr_matrix((n_productos, n_productos), dtype=np.int32)
+    _, filas = np.unique(pares[:, 0], return_inverse=True)
+    ventas = sparse.csr_matrix(
+        (np.ones(len(pares), dtype=np.int32), (filas, pares[:, 1])),
+        shape=(filas.max() + 1, n_productos),
+    )
+    # El mismo producto en dos líneas de una venta cuenta una sola vez
+    ventas.sum_duplicates()
+    ventas.data[:] = 1
+    return (ventas.T @ ventas).tocsr()
+
+
+def vecinos(matriz, producto_id, k=TOP_K):
+    """[(relacionado_id, veces, puntaje), ...] ordenados de mayor a menor."""
+    inicio, fin = matriz.indptr[producto_id], matriz.indptr[producto_id + 1]
+    columnas = matriz.indices[inicio:fin]
+    valores = matriz.data[inicio:fin]
+    propias = valores[columnas == producto_id]
+    total = int(propias[0]) if len(propias) else 0
+    if not total:
+        return []
+
+    otros = columnas != producto_id
+    columnas, valores = columnas[otros], valores[otros]
+    if len(valores) > k:
+        elegidos = np.argpartition(-valores, k - 1)[:k]
+        columnas, valores = columnas[elegidos], valores[elegidos]
+    # Más veces primero; a igualdad, el id menor (orden estable entre corridas)
+    orden = np.lexsort((columnas, -valores))
+    return [(int(columnas[i]), int(valores[i]), float(valores[i]) / total) for i in orden]
+
+
+def _escribir(matriz, producto_ids, completo=False):
+    """
+    Reemplaza los vecinos de 'producto_ids' (todos con completo) en una sola
+    transacción: el endpoint nunca ve la tabla a medio escribir.
+    """
+    existentes = set(Producto.objects.values_list('id', flat=True))
+    filas = []
+    for producto_id in producto_ids:
+        if producto_id not in existentes:
+            continue
+        relacionados = [v for v in vecinos(matriz, producto_id) if v[0] in existentes]
+        filas.extend(
+            ProductoRelacionado(
+                producto_id=producto_id, relacionado_id=relacionado_id,
+                veces=veces, puntaje=puntaje, posicion=posicion,
+            )
+            for posicion, (relacionado_id, veces, puntaje) in enumerate(relacionados)
+        )
+
+    with transaction.atomic():
+        if completo:
+            ProductoRelacionado.objects.all().delete()
+        else:
+            producto_ids = list(producto_ids)
+            for inicio in range(0, len(producto_ids), 500):
+                ProductoRelacionado.objects.filter(producto_id__in=producto_ids[inicio:inicio + 500]).delete()
+        ProductoRelacionado.objects.bulk_create(filas, batch_size=1000)
+    return len(filas)
+
+
+def calcular_recomendados(completo=False):
+    """
+    Procesa las ventas nuevas (todas con completo) y actualiza los vecinos
+    de los productos afectados. Devuelve {'ventas', 'productos', 'filas'}.
+    """
+    n_productos = (Producto.objects.aggregate(maximo=Max('id'))['maximo'] or 0) + 1
+    matriz, marca, contadas = (None, None, None) if completo else cargar_matriz()
+    if matriz is None:
+        matriz, marca, completo = sparse.csr_matrix((n_productos, n_productos), dtype=np.int32), None, True
+        contadas = np.array([], dtype=np.int64)
+    elif matriz.shape[0] < n_productos:
+        matriz.resize((n_productos, n_productos))
+
+    hasta = timezone.now() - RETRASO
+    leida = marca
+    afectados = set()
+    ventas = 0
+    while True:
+        pares, ultima = _siguiente_lote(marca, hasta, contadas)
+        if ultima is None:
+            break
+        # Productos creados durante la corrida
+        n = max(matriz.shape[0], int(pares[:, 1].max()) + 1 if len(pares) else 0)
+        if n > matriz.shape[0]:
+            matriz.resize((n, n))
+        matriz = matriz + coocurrencias(pares, n)
+        afectados.update(np.unique(pares[:, 1]).tolist())
+        nuevas = np.unique(pares[:, 0])
+        contadas = np.union1d(contadas, nuevas)
+        ventas += len(nuevas)
+        marca = ultima
+
+    if not completo and not afectados:
+        if marca != leida:
+            # Solo ventas ya sumadas: se guarda la marca para no releerlas
+            guardar_matriz(matriz, marca, contadas)
+        return {'ventas': 0, 'productos': 0, 'filas': 0}
+
+    guardar_matriz(matriz, marca, contadas)
+    filas = _escribir(matriz, sorted(afectados), completo)
+    return {'ventas': ventas, 'productos': len(afectados), 'filas': filas}
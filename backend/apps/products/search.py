@@ -0,0 +1,180 @@
+"""
+Búsqueda de texto completo del catálogo.
+
+Cada producto tiene un documento normalizado (minúsculas, sin acentos) en
+ProductoBusqueda, que se mantiene al guardar el producto (ver signals.py).
+El índice depende del motor:
+  - PostgreSQL: columna tsvector ('spanish') con índice GIN, SearchRank.
+  - SQLite: tabla virtual FTS5 products_producto_fts (modelo ProductoFTS),
+    unida a la consulta de productos, ranking bm25.
+  - Otros / sin FTS5: filtro LIKE sobre el documento normalizado.
+Los términos se buscan por prefijo para soportar búsqueda al tipear.
+"""
+import re
+import unicodedata
+
+from django.db import connections
+from django.db.models import F, FloatField, Value
+from django.db.models.expressions import RawSQL
+
+SEARCH_CONFIG = 'spanish'
+FTS_TABLE = 'products_producto_fts'
+BUSQUEDA_TABLE = 'products_productobusqueda'
+MAX_TERMINOS = 8
+
+_TERMINO_RE = re.compile(r'\w+')
+
+
+def normalizar(texto):
+    """Minúsculas, sin acentos ni espacios repetidos: 'Cámara  4K' -> 'camara 4k'"""
+    texto = unicodedata.normalize('NFKD', texto or '')
+    texto = ''.join(c for c in texto if not unicodedata.combining(c))
+    return ' '.join(texto.lower().split())
+
+
+def documento_de(nombre, descripcion):
+    return normalizar(f"{nombre} {descripcion or ''}")
+
+
+def terminos(query):
+    return _TERMINO_RE.findall(normalizar(query))[:MAX_TERMINOS]
+
+
+# --- Mantenimiento del índice ---
+
+def fts_disponible(connection):
+    if connection.vendor != 'sqlite':
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = %s", [FTS_TABLE])
+        return cursor.fetchone() is not None
+
+
+def crear_indice(connection):
+    """Crea la estructura de índice propia del motor (usado en migraciones)."""
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.execute(
+                f"CREATE INDEX IF NOT EXISTS products_busqueda_vector_gin "
+                f"ON {BUSQUEDA_TABLE} USING GIN (vector)"
+            )
+        elif connection.vendor == 'sqlite':
+            try:
+                cursor.execute(
+                    f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} "
+                    f"USING fts5(documento, tokenize='unicode61 remove_diacritics 2')"
+                )
+            except Exception:
+                # SQLite compilado sin FTS5: se usará el filtro LIKE
+                pass
+
+
+def eliminar_indice(connection):
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.execute("DROP INDEX IF EXISTS products_busqueda_vector_gin")
+        elif connection.vendor == 'sqlite':
+            cursor.execute(f"DROP TABLE IF EXISTS {FTS_TABLE}")
+
+
+def sincronizar_motor(connection, ids=None):
+    """
+    Copia los documentos de ProductoBusqueda al índice del motor. Con
+    ids=None se reconstruye todo.
+    """
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            sql = f"UPDATE {BUSQUEDA_TABLE} SET vector = to_tsvector(%s::regconfig, documento)"
+            if ids is None:
+                cursor.execute(sql, [SEARCH_CONFIG])
+            else:
+                cursor.execute(sql + " WHERE producto_id = ANY(%s)", [SEARCH_CONFIG, list(ids)])
+    elif fts_disponible(connection):
+        with connection.cursor() as cursor:
+            if ids is None:
+                cursor.execute(f"DELETE FROM {FTS_TABLE}")
+                cursor.execute(
+                    f"INSERT INTO {FTS_TABLE}(rowid, documento) SELECT producto_id, documento FROM {BUSQUEDA_TABLE}"
+                )
+                return
+            ids = list(ids)
+            for i in range(0, len(ids), 500):
+                chunk = ids[i:i + 500]
+                placeholders = ', '.join(['%s'] * len(chunk))
+                cursor.execute(f"DELETE FROM {FTS_TABLE} WHERE rowid IN ({placeholders})", chunk)
+                cursor.execute(
+                    f"INSERT INTO {FTS_TABLE}(rowid, documento) SELECT producto_id, documento "
+                    f"FROM {BUSQUEDA_TABLE} WHERE producto_id IN ({placeholders})",
+                    chunk
+                )
+
+
+def indexar_productos(productos, using='default'):
+    """Actualiza el documento y el índice de los productos dados."""
+    from .models import ProductoBusqueda
+
+    productos = list(productos)
+    if not productos:
+        return
+    ProductoBusqueda.objects.using(using).bulk_create(
+        [ProductoBusqueda(producto_id=p.pk, documento=documento_de(p.nombre, p.descripcion)) for p in productos],
+        update_conflicts=True,
+        unique_fields=['producto'],
+        update_fields=['documento'],
+    )
+    sincronizar_motor(connections[using], [p.pk for p in productos])
+
+
+def desindexar_productos(ids, using='default'):
+    """Quita productos eliminados del índice FTS5 (la fila de ProductoBusqueda cae en cascada)."""
+    ids = list(ids)
+    connection = connections[using]
+    if ids and fts_disponible(connection):
+        placeholders = ', '.join(['%s'] * len(ids))
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {FTS_TABLE} WHERE rowid IN ({placeholders})", ids)
+
+
+# --- Consulta ---
+
+def buscar_productos(queryset, query, ordenar_por_relevancia=True):
+    """
+    Filtra el queryset por la búsqueda y lo anota con 'relevancia'.
+    Si ordenar_por_relevancia es True, los más relevantes van primero.
+    """
+    palabras = terminos(query)
+    if not palabras:
+        return queryset
+
+    connection = connections[queryset.db]
+
+    if connection.vendor == 'postgresql':
+        from django.contrib.postgres.search import SearchQuery, SearchRank
+
+        # Los términos son solo \w+, no pueden romper la sintaxis de tsquery
+        tsquery = SearchQuery(
+            ' & '.join(f"{palabra}:*" for palabra in palabras),
+            search_type='raw',
+            config=SEARCH_CONFIG,
+        )
+        queryset = queryset.filter(busqueda__vector=tsquery).annotate(
+            relevancia=SearchRank(F('busqueda__vector'), tsquery)
+        )
+
+    elif fts_disponible(connection):
+        match = ' AND '.join(f'"{palabra}"*' for palabra in palabras)
+        # JOIN con la tabla FTS5: el MATCH se combina con el resto de los filtros
+        # en la misma consulta, sin tope de resultados. bm25 es menor cuanto más
+        # relevante: se invierte el signo
+        queryset = queryset.filter(fts__documento__match=match).annotate(
+            relevancia=RawSQL(f"-bm25({FTS_TABLE})", [], output_field=FloatField())
+        )
+
+    else:
+        for palabra in palabras:
+            queryset = queryset.filter(busqueda__documento__contains=palabra)
+        queryset = queryset.annotate(relevancia=Value(0.0, output_field=FloatField()))
+
+    if ordenar_por_relevancia:
+        queryset = queryset.order_by('-relevancia', '-fecha_creacion', '-id')
+    return queryset
@@ -1,23 +1,61 @@
 from rest_framework import serializers
-from .models import Categoria, Producto
+from django.core.files.storage import default_storage
+
+from .images import FORMATOS, derivadas_vigentes
+from .models import Categoria, HistorialPrecio, Producto
 
 class CategoriaSerializer(serializers.ModelSerializer):
+    # Precalculados en CategoriaResumen
+    total_productos = serializers.SerializerMethodField()
+    precio_min = serializers.SerializerMethodField()
+    precio_max = serializers.SerializerMethodField()
+
     class Meta:
         model = Categoria
-        fields = ['id', 'nombre', 'caracteristicas']
+        fields = ['id', 'nombre', 'caracteristicas', 'total_productos', 'precio_min', 'precio_max']
+
+    def _resumen(self, obj):
+        return getattr(obj, 'resumen', None)
+
+    def get_total_productos(self, obj):
+        resumen = self._resumen(obj)
+        return resumen.total_productos if resumen else 0
+
+    def get_precio_min(self, obj):
+        resumen = self._resumen(obj)
+        return str(resumen.precio_min) if resumen and resumen.precio_min is not None else None
+
+    def get_precio_max(self, obj):
+        resumen = self._resumen(obj)
+        return str(resumen.precio_max) if resumen and resumen.precio_max is not None else None
 
 class ProductoSerializer(serializers.ModelSerializer):
     categoria_nombre = serializers.CharField(source='categoria.nombre', read_only=True)
+    # Miniaturas por formato y ancho: {'webp': {'160': url, ...}, 'jpeg': {...}}
+    imagenes = serializers.SerializerMethodField()
     
     class Meta:
         model = Producto
         fields = [
             'id', 'nombre', 'descripcion', 'precio_venta',
-            'categoria', 'categoria_nombre', 'imagen',
+            'categoria', 'categoria_nombre', 'imagen', 'imagenes',
             'activo', 'destacado', 'fecha_creacion'
         ]
         read_only_fields = ['id', 'fecha_creacion', 'fecha_actualizacion']
 
+    def get_imagenes(self, obj):
+        derivadas = derivadas_vigentes(obj)
+        if not derivadas:
+            return None
+        request = self.context.get('request')
+        urls = {}
+        for formato in FORMATOS:
+            urls[formato] = {}
+            for ancho, ruta in derivadas.get(formato, {}).items():
+                url = default_storage.url(ruta)
+                urls[formato][ancho] = request.build_absolute_uri(url) if request else url
+        return urls
+
 class ProductoCreateSerializer(serializers.ModelSerializer):
     class Meta:
         model = Producto
@@ -37,4 +75,28 @@ class ProductoUpdateSerializer(serializers.ModelSerializer):
         fields = [
             'nombre', 'descripcion', 'precio_venta',
             'categoria', 'imagen', 'destacado', 'activo'
-        ]
\ No newline at end of file
+        ]
+
+class ActualizacionPreciosSerializer(serializers.Serializer):
+    """Cambio de precios masivo: porcentaje (10 = +10 %) o monto fijo, por categoría y/o ids."""
+    porcentaje = serializers.DecimalField(max_digits=7, decimal_places=2, required=False)
+    monto = serializers.DecimalField(max_digits=10, decimal_places=2, required=False)
+    categoria_id = serializers.IntegerField(required=False)
+    ids = serializers.ListField(child=serializers.IntegerField(), required=False, allow_empty=False)
+    motivo = serializers.CharField(max_length=200, required=False, allow_blank=True, default='')
+
+    def validate(self, data):
+        if ('porcentaje' in data) == ('monto' in data):
+            raise serializers.ValidationError("Indique 'porcentaje' o 'monto' (solo uno)")
+        if 'categoria_id' not in data and not data.get('ids'):
+            raise serializers.ValidationError("Indique 'categoria_id' y/o 'ids'")
+        if data.get('porcentaje') is not None and data['porcentaje'] <= -100:
+            raise serializers.ValidationError("El porcentaje debe ser mayor a -100")
+        return data
+
+class HistorialPrecioSerializer(serializers.ModelSerializer):
+    usuario = serializers.CharField(source='usuario.username', read_only=True, default=None)
+
+    class Meta:
+        model = HistorialPrecio
+        fields = ['id', 'producto', 'precio_anterior', 'precio_nuevo', 'fecha', 'usuario', 'motivo']
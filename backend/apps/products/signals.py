@@ -0,0 +1,104 @@
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete, pre_save
+from django.dispatch import receiver
+
+from apps.payments.models import Payment
+
+from . import autocomplete, images
+from .inventory import confirmar_reservas, liberar_reservas
+from .cache import incrementar_version
+from .models import Categoria, HistorialPrecio, Producto
+from .search import indexar_productos, desindexar_productos
+from .summaries import recalcular_resumenes
+
+
+def _nueva_version():
+    version = incrementar_version()
+    # Este proceso ya aplicó el cambio de forma incremental
+    autocomplete.indice.version_aplicada(version)
+
+
+def _al_confirmar(funcion, *args, using='default'):
+    """
+    Cambios del índice de autocompletado en memoria: si la transacción se
+    revierte no deben quedar sugerencias de filas que no existen.
+    """
+    transaction.on_commit(lambda: funcion(*args), using=using)
+
+
+def catalogo_modificado(using='default'):
+    """
+    Invalida el catálogo cacheado cuando la transacción se confirma (antes
+    otro request podría volver a cachear los datos viejos con la versión nueva).
+    """
+    transaction.on_commit(_nueva_version, using=using)
+
+
+@receiver(pre_save, sender=Producto)
+def producto_por_guardar(sender, instance, raw=False, using='default', **kwargs):
+    """Recuerda la categoría y el precio anteriores (resumen e historial de precios)."""
+    if raw or instance.pk is None:
+        return
+    anterior = Producto.objects.using(using).filter(pk=instance.pk).values_list('categoria_id', 'precio_venta').first()
+    instance._categoria_anterior_id, instance._precio_anterior = anterior or (None, None)
+
+
+@receiver(post_save, sender=Producto)
+def producto_guardado(sender, instance, raw=False, using='default', **kwargs):
+    """Mantiene los índices de búsqueda sincronizados (incluye el soft delete)."""
+    if raw:
+        return
+    indexar_productos([instance], using=using)
+    precio_anterior = getattr(instance, '_precio_anterior', None)
+    if precio_anterior is not None and precio_anterior != Decimal(str(instance.precio_venta)).quantize(Decimal('0.01')):
+        HistorialPrecio.objects.using(using).create(
+            producto=instance, precio_anterior=precio_anterior, precio_nuevo=instance.precio_venta
+        )
+    recalcular_resumenes(
+        [instance.categoria_id, getattr(instance, '_categoria_anterior_id', None)], using=using
+    )
+    if images.necesita_derivadas(instance):
+        images.programar_derivadas(instance.pk, using=using)
+    if instance.activo:
+        _al_confirmar(autocomplete.indice.actualizar, autocomplete.PRODUCTO, instance.pk, instance.nombre, using=using)
+    else:
+        _al_confirmar(autocomplete.indice.quitar, autocomplete.PRODUCTO, instance.pk, using=using)
+    catalogo_modificado(using)
+
+
+@receiver(post_delete, sender=Producto)
+def producto_eliminado(sender, instance, using='default', **kwargs):
+    desindexar_productos([instance.pk], using=using)
+    recalcular_resumenes([instance.categoria_id], using=using)
+    images.borrar_derivadas(instance)
+    _al_confirmar(autocomplete.indice.quitar, autocomplete.PRODUCTO, instance.pk, using=using)
+    catalogo_modificado(using)
+
+
+@receiver(post_save, sender=Categoria)
+def categoria_guardada(sender, instance, raw=False, using='default', **kwargs):
+    if raw:
+        return
+    _al_confirmar(autocomplete.indice.actualizar, autocomplete.CATEGORIA, instance.pk, instance.nombre, using=using)
+    if kwargs.get('created'):
+        recalcular_resumenes([instance.pk], using=using)
+    catalogo_modificado(using)
+
+
+@receiver(post_delete, sender=Categoria)
+def categoria_eliminada(sender, instance, using='default', **kwargs):
+    _al_confirmar(autocomplete.indice.quitar, autocomplete.CATEGORIA, instance.pk, using=using)
+    catalogo_modificado(using)
+
+
+@receiver(post_save, sender=Payment)
+def pago_guardado(sender, instance, raw=False, **kwargs):
+    """Confirma o devuelve el stock reservado según el estado del pago."""
+    if raw:
+        return
+    if instance.status == 'completed':
+        confirmar_reservas([instance.pk])
+    elif instance.status in ('failed', 'cancelled'):
+        liberar_reservas([instance.pk])
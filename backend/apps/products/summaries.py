@@ -0,0 +1,74 @@
+"""
+Resumen por categoría (cantidad de productos activos y rango de precios).
+
+Se guarda en CategoriaResumen y se recalcula con una sola consulta
+agrupada para las categorías afectadas por cada cambio.
+
+CategoriaSerializer envía el resumen con la categoría, así que las
+categorías cuyo resumen cambió se marcan con fecha_actualizacion en la
+misma transacción: es el cursor de la sincronización (apps.sales.sync).
+"""
+from django.db import transaction
+from django.db.models import Count, Max, Min
+from django.utils import timezone
+
+
+def recalcular_resumenes(categoria_ids=None, using='default'):
+    """
+    Recalcula los resúmenes de las categorías dadas (todas si es None).
+    Devuelve la cantidad de resúmenes escritos.
+    """
+    from .models import Categoria, CategoriaResumen, Producto
+
+    if categoria_ids is None:
+        categoria_ids = list(Categoria.objects.using(using).values_list('id', flat=True))
+    else:
+        categoria_ids = [pk for pk in set(categoria_ids) if pk is not None]
+        # Las categorías eliminadas ya no tienen resumen que actualizar
+        categoria_ids = list(Categoria.objects.using(using).filter(id__in=categoria_ids).values_list('id', flat=True))
+    if not categoria_ids:
+        return 0
+
+    totales = {
+        fila['categoria_id']: fila
+        for fila in Producto.objects.using(using)
+        .filter(activo=True, categoria_id__in=categoria_ids)
+        .order_by()
+        .values('categoria_id')
+        .annotate(total=Count('id'), minimo=Min('precio_venta'), maximo=Max('precio_venta'))
+    }
+
+    anteriores = {
+        pk: (total, minimo, maximo)
+        for pk, total, minimo, maximo in CategoriaResumen.objects.using(using)
+        .filter(categoria_id__in=categoria_ids)
+        .values_list('categoria_id', 'total_productos', 'precio_min', 'precio_max')
+    }
+
+    ahora = timezone.now()
+    resumenes = []
+    cambiadas = []
+    for pk in categoria_ids:
+        fila = totales.get(pk, {})
+        resumenes.append(CategoriaResumen(
+            categoria_id=pk,
+            total_productos=fila.get('total', 0),
+            precio_min=fila.get('minimo'),
+            precio_max=fila.get('maximo'),
+            # bulk_create no aplica auto_now
+            fecha_actualizacion=ahora,
+        ))
+        if anteriores.get(pk) != (fila.get('total', 0), fila.get('minimo'), fila.get('maximo')):
+            cambiadas.append(pk)
+
+    with transaction.atomic(using=using):
+        CategoriaResumen.objects.using(using).bulk_create(
+            resumenes,
+            update_conflicts=True,
+            unique_fields=['categoria'],
+            update_fields=['total_productos', 'precio_min', 'precio_max', 'fecha_actualizacion'],
+            batch_size=500,
+        )
+        # update() no dispara post_save de Categoria (que volvería a recalcular)
+        Categoria.objects.using(using).filter(id__in=cambiadas).update(fecha_actualizacion=ahora)
+    return len(resumenes)
@@ -1,3 +1,430 @@
-from django.test import TestCase
+import io
+import tempfile
+from datetime import timedelta
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+from django.core.cache import caches
+from django.db import transaction
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from apps.core.models import EventoOutbox
+from apps.payments.models import Payment
+from apps.sales.models import DetalleVenta, Venta
+from apps.users.models import User
+from . import autocomplete
+from .importer import importar_productos
+from .inventory import StockInsuficiente, descontar_stock, liberar_reservas, reservar_stock
+from .models import (
+    Categoria, HistorialPrecio, Inventario, Producto, ProductoRelacionado, RecomendacionCliente, ReservaStock,
+)
+from .personalized import calcular_recomendaciones, recomendaciones_de, registrar_compra
+from .pricing import actualizar_precios
+from .recommendations import calcular_recomendados, cargar_matriz
+
+
+class InventarioTests(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user('cliente', 'cliente@test.com', 'clave123')
+        categoria = Categoria.objects.create(nombre='Audio')
+        self.parlante = Producto.objects.create(nombre='Parlante', precio_venta=Decimal('100.00'), categoria=categoria)
+        self.audifonos = Producto.objects.create(nombre='Audífonos', precio_venta=Decimal('50.00'), categoria=categoria)
+        # Sin fila de inventario: se vende sin límite
+        self.cable = Producto.objects.create(nombre='Cable', precio_venta=Decimal('5.00'), categoria=categoria)
+        Inventario.objects.create(producto=self.parlante, stock=5)
+        Inventario.objects.create(producto=self.audifonos, stock=1)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def stock(self, producto):
+        return Inventario.objects.get(producto=producto).stock
+
+    def pago_pendiente(self):
+        return Payment.objects.create(user=self.user, amount=Decimal('100.00'), method='paypal', status='pending')
+
+    def test_descuenta_todas_las_lineas(self):
+        descontar_stock([(self.parlante.id, 2), (self.audifonos.id, 1), (self.parlante.id, 1), (self.cable.id, 9)])
+
+        self.assertEqual((self.stock(self.parlante), self.stock(self.audifonos)), (2, 0))
+
+    def test_sin_stock_no_descuenta_nada_ni_queda_negativo(self):
+        with self.assertRaises(StockInsuficiente) as error:
+            descontar_stock([(self.parlante.id, 2), (self.audifonos.id, 2)])
+
+        self.assertEqual(error.exception.faltantes, [
+            {'producto_id': self.audifonos.id, 'solicitado': 2, 'disponible': 1}
+        ])
+        self.assertEqual((self.stock(self.parlante), self.stock(self.audifonos)), (5, 1))
+
+    def test_el_stock_nunca_queda_negativo(self):
+        descontar_stock([(self.parlante.id, 5)])
+        with self.assertRaises(StockInsuficiente):
+            descontar_stock([(self.parlante.id, 1)])
+
+        self.assertEqual(self.stock(self.parlante), 0)
+        self.assertFalse(Inventario.objects.filter(stock__lt=0).exists())
+
+    def test_checkout_sin_stock_responde_409_sin_escribir_nada(self):
+        response = self.client.post('/api/sales/ventas/crear-desde-carrito/', {
+            'items': [{'producto_id': self.parlante.id, 'cantidad': 1}, {'producto_id': self.audifonos.id, 'cantidad': 3}],
+            'payment_method': 'cash',
+        }, format='json')
+
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.data['faltantes'][0]['producto_id'], self.audifonos.id)
+        self.assertEqual((self.stock(self.parlante), self.stock(self.audifonos)), (5, 1))
+        self.assertFalse(Venta.objects.exists())
+        self.assertFalse(DetalleVenta.objects.exists())
+        self.assertFalse(Payment.objects.exists())
+        self.assertFalse(EventoOutbox.objects.exists())
+
+    def test_checkout_paypal_reserva_el_stock(self):
+        response = self.client.post('/api/sales/ventas/crear-desde-carrito/', {
+            'items': [{'producto_id': self.parlante.id, 'cantidad': 2}, {'producto_id': self.cable.id, 'cantidad': 1}],
+            'payment_method': 'paypal',
+        }, format='json')
+
+        self.assertEqual(response.status_code, 201)
+        reserva = ReservaStock.objects.get()
+        self.assertEqual((reserva.producto_id, reserva.cantidad, reserva.estado), (self.parlante.id, 2, ReservaStock.ACTIVA))
+        self.assertEqual(self.stock(self.parlante), 3)
+
+    def test_pago_completado_confirma_la_reserva(self):
+        pago = self.pago_pendiente()
+        reservar_stock(pago, [(self.parlante.id, 2)])
+
+        pago.status = 'completed'
+        pago.save()
+
+        self.assertEqual(ReservaStock.objects.get().estado, ReservaStock.CONFIRMADA)
+        self.assertEqual(self.stock(self.parlante), 3)
+
+    def test_pago_fallido_o_cancelado_devuelve_el_stock(self):
+        for estado in ('failed', 'cancelled'):
+            pago = self.pago_pendiente()
+            reservar_stock(pago, [(self.parlante.id, 2)])
+            self.assertEqual(self.stock(self.parlante), 3)
+
+            pago.status = estado
+            pago.save()
+
+            self.assertEqual(ReservaStock.objects.get(pago=pago).estado, ReservaStock.LIBERADA)
+            self.assertEqual(self.stock(self.parlante), 5)
+
+    def test_una_reserva_se_libera_una_sola_vez(self):
+        pago = self.pago_pendiente()
+        reservar_stock(pago, [(self.parlante.id, 2)])
+
+        self.assertEqual(liberar_reservas([pago.id]), 1)
+        self.assertEqual(liberar_reservas([pago.id]), 0)
+        pago.status = 'cancelled'
+        pago.save()
+
+        self.assertEqual(self.stock(self.parlante), 5)
+
+    def test_pago_completado_tras_vencer_la_reserva_vuelve_a_descontar(self):
+        pago = self.pago_pendiente()
+        reservar_stock(pago, [(self.parlante.id, 2)])
+        ReservaStock.objects.update(expira=timezone.now())
+        liberar_reservas(vencidas=True)
+        self.assertEqual(self.stock(self.parlante), 5)
+
+        pago.status = 'completed'
+        pago.save()
+
+        self.assertEqual(ReservaStock.objects.get().estado, ReservaStock.CONFIRMADA)
+        self.assertEqual(self.stock(self.parlante), 3)
+
+    def test_pago_completado_tras_vencer_sin_stock_marca_la_venta(self):
+        response = self.client.post('/api/sales/ventas/crear-desde-carrito/', {
+            'items': [{'producto_id': self.parlante.id, 'cantidad': 2}, {'producto_id': self.audifonos.id, 'cantidad': 1}],
+            'payment_method': 'paypal',
+        }, format='json')
+        venta = Venta.objects.get(id=response.data['id'])
+        ReservaStock.objects.update(expira=timezone.now())
+        liberar_reservas(vencidas=True)
+        # Otro cliente se llevó los audífonos mientras tanto
+        descontar_stock([(self.audifonos.id, 1)])
+
+        venta.pago.status = 'completed'
+        venta.pago.save()
+
+        estados = dict(ReservaStock.objects.values_list('producto_id', 'estado'))
+        self.assertEqual(estados, {self.parlante.id: ReservaStock.CONFIRMADA, self.audifonos.id: ReservaStock.FALTANTE})
+        self.assertEqual((self.stock(self.parlante), self.stock(self.audifonos)), (3, 0))
+        venta.refresh_from_db()
+        self.assertTrue(venta.requiere_revision)
+
+    def test_reserva_sin_stock_no_reserva_nada(self):
+        pago = self.pago_pendiente()
+        with self.assertRaises(StockInsuficiente):
+            reservar_stock(pago, [(self.parlante.id, 1), (self.audifonos.id, 2)])
+
+        self.assertFalse(ReservaStock.objects.exists())
+        self.assertEqual((self.stock(self.parlante), self.stock(self.audifonos)), (5, 1))
+
+
+class ResumenCategoriaTests(TestCase):
+
+    def setUp(self):
+        self.categoria = Categoria.objects.create(nombre='Audio')
+        Categoria.objects.filter(id=self.categoria.id).update(fecha_actualizacion=timezone.now() - timedelta(days=1))
+
+    def fecha(self):
+        return Categoria.objects.get(id=self.categoria.id).fecha_actualizacion
+
+    def test_un_cambio_de_productos_marca_la_categoria_para_sincronizar(self):
+        antes = self.fecha()
+
+        Producto.objects.create(nombre='Parlante', precio_venta=Decimal('100.00'), categoria=self.categoria)
+
+        self.assertGreater(self.fecha(), antes)
+        resumen = Categoria.objects.get(id=self.categoria.id).resumen
+        self.assertEqual((resumen.total_productos, resumen.precio_min), (1, Decimal('100.00')))
+
+    def test_sin_cambios_en_el_resumen_no_la_marca(self):
+        producto = Producto.objects.create(nombre='Parlante', precio_venta=Decimal('100.00'), categoria=self.categoria)
+        Categoria.objects.filter(id=self.categoria.id).update(fecha_actualizacion=timezone.now() - timedelta(days=1))
+        antes = self.fecha()
+
+        producto.nombre = 'Parlante portátil'
+        producto.save()
+
+        self.assertEqual(self.fecha(), antes)
+
+
+class HistorialPreciosTests(TestCase):
+
+    def setUp(self):
+        categoria = Categoria.objects.create(nombre='Audio')
+        self.producto = Producto.objects.create(nombre='Parlante', precio_venta=Decimal('100.00'), categoria=categoria)
+        self.client = APIClient()
+
+    def test_lista_los_cambios_del_producto(self):
+        actualizar_precios(porcentaje=Decimal('10'), ids=[self.producto.id])
+
+        response = self.client.get(f'/api/products/productos/{self.producto.id}/historial-precios/')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['count'], 1)
+
+    def test_producto_invalido_o_inexistente_responde_404(self):
+        for pk in ('abc', 999999):
+            self.assertEqual(self.client.get(f'/api/products/productos/{pk}/historial-precios/').status_code, 404)
+
+
+class ImportacionTests(TestCase):
+
+    def setUp(self):
+        self.audio = Categoria.objects.create(nombre='Audio')
+        self.parlante = Producto.objects.create(
+            nombre='Parlante', descripcion='Bluetooth', precio_venta=Decimal('100.00'),
+            categoria=self.audio, destacado=True,
+        )
+
+    def importar(self, contenido, formato='csv', **opciones):
+        return importar_productos(io.BytesIO(contenido.encode()), formato, **opciones)
+
+    def test_informa_los_errores_por_fila_e_importa_el_resto(self):
+        resultado = self.importar(
+            "id,nombre,precio_venta,categoria\n"
+            ",Cable,5,Audio\n"
+            ",Micrófono,-3,Audio\n"
+            ",Lámpara,20,Hogar\n"
+            "999999,Fantasma,10,Audio\n"
+            ",Soporte,,Audio\n"
+        )
+
+        self.assertEqual((resultado['procesadas'], resultado['creados'], resultado['total_errores']), (5, 1, 4))
+        errores = {error['fila']: error['errores'] for error in resultado['errores']}
+        self.assertEqual(sorted(errores), [3, 4, 5, 6])
+        self.assertIn('precio_venta', errores[3])
+        self.assertIn('categoria', errores[4])
+        self.assertIn('id', errores[5])
+        self.assertIn('precio_venta', errores[6])
+        self.assertEqual(set(Producto.objects.values_list('nombre', flat=True)), {'Parlante', 'Cable'})
+
+    def test_crear_categorias(self):
+        resultado = self.importar(
+            '{"nombre": "Lámpara", "precio_venta": "20", "categoria": "Hogar"}\n'
+            'no es json\n',
+            formato='jsonl', crear_categorias=True,
+        )
+
+        self.assertEqual((resultado['creados'], resultado['categorias_creadas']), (1, 1))
+        self.assertEqual(resultado['errores'], [{'fila': 2, 'errores': {'fila': 'no es un objeto JSON válido'}}])
+        self.assertEqual(Producto.objects.get(nombre='Lámpara').categoria.nombre, 'Hogar')
+
+    def test_dry_run_no_escribe_nada(self):
+        resultado = self.importar(
+            "nombre,precio_venta,categoria\nParlante,120,Audio\nLámpara,20,Hogar\n",
+            crear_categorias=True, dry_run=True,
+        )
+
+        self.assertEqual((resultado['creados'], resultado['actualizados'], resultado['categorias_creadas']), (1, 1, 1))
+        self.assertEqual(Producto.objects.count(), 1)
+        self.assertFalse(Categoria.objects.filter(nombre='Hogar').exists())
+        self.parlante.refresh_from_db()
+        self.assertEqual(self.parlante.precio_venta, Decimal('100.00'))
+
+    def test_actualiza_solo_las_columnas_del_archivo(self):
+        otro = Producto.objects.create(nombre='Cable', descripcion='1 m', precio_venta=Decimal('5.00'), categoria=self.audio)
+
+        resultado = self.importar(f"id,precio_venta\n{self.parlante.id},120\n{otro.id},5\n")
+
+        self.assertEqual((resultado['actualizados'], resultado['total_errores']), (2, 0))
+        self.parlante.refresh_from_db()
+        self.assertEqual(
+            (self.parlante.nombre, self.parlante.descripcion, self.parlante.precio_venta,
+             self.parlante.categoria_id, self.parlante.destacado, self.parlante.activo),
+            ('Parlante', 'Bluetooth', Decimal('120.00'), self.audio.id, True, True),
+        )
+        otro.refresh_from_db()
+        self.assertEqual((otro.nombre, otro.descripcion, otro.precio_venta), ('Cable', '1 m', Decimal('5.00')))
+        # Solo el precio que cambió queda en el historial
+        self.assertEqual(list(HistorialPrecio.objects.values_list('producto_id', flat=True)), [self.parlante.id])
+
+
+class AutocompletadoTests(TestCase):
+
+    def setUp(self):
+        caches['catalogo'].clear()
+        self.categoria = Categoria.objects.create(nombre='Audio')
+        autocomplete.indice.construir()
+        self.addCleanup(autocomplete.indice.invalidar)
+
+    def nombres(self, prefijo):
+        return [r['nombre'] for r in autocomplete.indice.buscar(prefijo)]
+
+    def test_un_producto_confirmado_aparece_en_las_sugerencias(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            Producto.objects.create(nombre='Zumbador', precio_venta=Decimal('5.00'), categoria=self.categoria)
+
+        self.assertEqual(self.nombres('zum'), ['Zumbador'])
+
+    def test_un_guardado_revertido_no_deja_sugerencias(self):
+        with self.assertRaises(RuntimeError):
+            with transaction.atomic():
+                Producto.objects.create(nombre='Zumbador', precio_venta=Decimal('5.00'), categoria=self.categoria)
+                raise RuntimeError
+
+        self.assertEqual(self.nombres('zum'), [])
+
+
+class RecomendadosTests(TestCase):
+
+    def setUp(self):
+        directorio = tempfile.TemporaryDirectory()
+        self.addCleanup(directorio.cleanup)
+        ajustes = override_settings(RECOMMENDATIONS_MATRIX_PATH=f"{directorio.name}/coocurrencias.npz")
+        ajustes.enable()
+        self.addCleanup(ajustes.disable)
+        categoria = Categoria.objects.create(nombre='Audio')
+        self.parlante = Producto.objects.create(nombre='Parlante', precio_venta=Decimal('100.00'), categoria=categoria)
+        self.cable = Producto.objects.create(nombre='Cable', precio_venta=Decimal('5.00'), categoria=categoria)
+
+    def vender(self, *productos, hace=timedelta(hours=1)):
+        venta = Venta.objects.create(estado='COMPLETADO')
+        for producto in productos:
+            DetalleVenta.objects.create(
+                venta=venta, producto=producto, nombre_producto=producto.nombre,
+                cantidad=1, precio_unitario=producto.precio_venta,
+            )
+        Venta.objects.filter(id=venta.id).update(fecha_actualizacion=timezone.now() - hace)
+        return venta
+
+    def veces(self):
+        matriz = cargar_matriz()[0]
+        return int(matriz[self.parlante.id, self.cable.id]), int(matriz[self.parlante.id, self.parlante.id])
+
+    def test_suma_solo_las_ventas_nuevas(self):
+        self.vender(self.parlante, self.cable)
+        self.assertEqual(calcular_recomendados()['ventas'], 1)
+
+        self.vender(self.parlante, self.cable, hace=timedelta(minutes=30))
+        self.vender(self.parlante, hace=timedelta(minutes=30))
+        self.assertEqual(calcular_recomendados()['ventas'], 2)
+
+        self.assertEqual(self.veces(), (2, 3))
+        relacionado = ProductoRelacionado.objects.get(producto=self.parlante)
+        self.assertEqual((relacionado.relacionado_id, relacionado.veces), (self.cable.id, 2))
+
+    def test_una_venta_guardada_de_nuevo_no_se_cuenta_dos_veces(self):
+        venta = self.vender(self.parlante, self.cable)
+        calcular_recomendados()
+
+        # Edición posterior (admin): fecha_actualizacion queda después de la marca
+        Venta.objects.filter(id=venta.id).update(fecha_actualizacion=timezone.now() - timedelta(minutes=1))
+
+        self.assertEqual(calcular_recomendados(), {'ventas': 0, 'productos': 0, 'filas': 0})
+        self.assertEqual(self.veces(), (1, 1))
+        self.assertEqual(calcular_recomendados(completo=True)['ventas'], 1)
+        self.assertEqual(self.veces(), (1, 1))
+
+    def test_la_reconstruccion_que_falla_no_vacia_la_tabla(self):
+        self.vender(self.parlante, self.cable)
+        calcular_recomendados()
+
+        with mock.patch.object(ProductoRelacionado.objects, 'bulk_create', side_effect=RuntimeError):
+            with self.assertRaises(RuntimeError):
+                calcular_recomendados(completo=True)
+
+        self.assertEqual(ProductoRelacionado.objects.count(), 2)
+
+    def test_endpoint_responde_404_para_productos_invalidos_o_inactivos(self):
+        inactivo = Producto.objects.create(
+            nombre='Viejo', precio_venta=Decimal('1.00'), categoria=self.parlante.categoria, activo=False
+        )
+        client = APIClient()
+
+        self.assertEqual(client.get(f'/api/products/productos/{self.parlante.id}/recomendados/').status_code, 200)
+        for pk in ('abc', 999999, inactivo.id):
+            self.assertEqual(client.get(f'/api/products/productos/{pk}/recomendados/').status_code, 404)
+
+
+class RecomendacionesPersonalizadasTests(TestCase):
+
+    def setUp(self):
+        categoria = Categoria.objects.create(nombre='Audio')
+        self.a, self.b, self.c = [
+            Producto.objects.create(nombre=nombre, precio_venta=Decimal('10.00'), categoria=categoria)
+            for nombre in ('A', 'B', 'C')
+        ]
+        self.u1, self.u2, self.u3 = [
+            User.objects.create_user(nombre, f'{nombre}@test.com', 'clave123') for nombre in ('u1', 'u2', 'u3')
+        ]
+        self.comprar(self.u1, self.a, self.b)
+        self.comprar(self.u2, self.a, self.b, self.c)
+        self.comprar(self.u3, self.a)
+
+    def comprar(self, usuario, *productos):
+        venta = Venta.objects.create(usuario=usuario, estado='COMPLETADO')
+        for producto in productos:
+            DetalleVenta.objects.create(
+                venta=venta, producto=producto, nombre_producto=producto.nombre,
+                cantidad=1, precio_unitario=producto.precio_venta,
+            )
+        return venta
+
+    def test_recomienda_por_similitud_coseno_sin_lo_ya_comprado(self):
+        self.assertEqual(calcular_recomendaciones(workers=1), 3)
+
+        # cos(A,B) = 2/(√3·√2), cos(A,C) = 1/√3, cos(B,C) = 1/√2
+        self.assertEqual(recomendaciones_de(self.u3.id), [[self.b.id, 0.8165], [self.c.id, 0.5774]])
+        self.assertEqual(recomendaciones_de(self.u1.id), [[self.c.id, 1.2845]])
+        self.assertEqual(recomendaciones_de(self.u2.id), [])
+        self.assertFalse(RecomendacionCliente.objects.filter(desactualizada=True).exists())
+
+    def test_una_compra_nueva_quita_el_producto_y_queda_pendiente(self):
+        calcular_recomendaciones(workers=1)
+
+        venta = self.comprar(self.u3, self.b)
+        registrar_compra(venta.id, self.u3.id)
+
+        self.assertEqual(recomendaciones_de(self.u3.id), [[self.c.id, 0.5774]])
+        self.assertEqual(calcular_recomendaciones(solo_pendientes=True, workers=1), 1)
+        # Ahora A y B las compraron los tres: cos(A,C) + cos(B,C) = 2/√3
+        self.assertEqual(recomendaciones_de(self.u3.id), [[self.c.id, 1.1547]])
@@ -1,16 +1,26 @@
-from rest_framework import viewsets, filters, status
+from rest_framework import viewsets, filters, status, permissions
 from rest_framework.decorators import action
 from rest_framework.response import Response
+from rest_framework.parsers import MultiPartParser
 from django_filters.rest_framework import DjangoFilterBackend
-from django.db.models import Q
-from .models import Categoria, Producto
+from apps.core.mixins import ConditionalGetMixin
+from .models import Categoria, HistorialPrecio, Inventario, Producto, ProductoRelacionado
+from .filters import ProductoSearchFilter
+from . import autocomplete
+from .cache import CatalogCacheMixin, respuesta_cacheada
+from .facets import calcular_facetas
+from .importer import ErrorImportacion, detectar_formato, importar_productos
+from .pricing import actualizar_precios
+from .personalized import TOP_N, recomendaciones_de
+from .recommendations import TOP_K
 from .serializers import (
     CategoriaSerializer, ProductoSerializer,
-    ProductoCreateSerializer, ProductoUpdateSerializer
+    ProductoCreateSerializer, ProductoUpdateSerializer,
+    ActualizacionPreciosSerializer, HistorialPrecioSerializer
 )
 
-class CategoriaViewSet(viewsets.ModelViewSet):
-    queryset = Categoria.objects.all()
+class CategoriaViewSet(CatalogCacheMixin, viewsets.ModelViewSet):
+    queryset = Categoria.objects.select_related('resumen')
     serializer_class = CategoriaSerializer
     filter_backends = [filters.SearchFilter, filters.OrderingFilter]
     search_fields = ['nombre']
@@ -19,14 +29,16 @@ class CategoriaViewSet(viewsets.ModelViewSet):
     # Sin restricciones de permisos
     permission_classes = []
 
-class ProductoViewSet(viewsets.ModelViewSet):
+class ProductoViewSet(ConditionalGetMixin, CatalogCacheMixin, viewsets.ModelViewSet):
     queryset = Producto.objects.filter(activo=True)
     serializer_class = ProductoSerializer
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
+    # ProductoSearchFilter va al final: ordena por relevancia si no hay 'ordering'
+    filter_backends = [DjangoFilterBackend, filters.OrderingFilter, ProductoSearchFilter]
     filterset_fields = ['categoria', 'destacado']
-    search_fields = ['nombre', 'descripcion']
     ordering_fields = ['precio_venta', 'fecha_creacion', 'nombre']
     ordering = ['-fecha_creacion']
+    # 'list' ya se sirve desde el caché versionado del catálogo
+    conditional_actions = ('retrieve',)
     # Sin restricciones de permisos
     permission_classes = []
 
@@ -38,16 +50,8 @@ class ProductoViewSet(viewsets.ModelViewSet):
         return ProductoSerializer
 
     def get_queryset(self):
+        # La búsqueda (?search=) la aplica ProductoSearchFilter con el índice de texto completo
         queryset = super().get_queryset()
-        
-        # Filtrar por búsqueda si se proporciona
-        search_query = self.request.query_params.get('search', '')
-        if search_query:
-            queryset = queryset.filter(
-                Q(nombre__icontains=search_query) |
-                Q(descripcion__icontains=search_query)
-            )
-        
         return queryset.select_related('categoria')
 
     def destroy(self, request, *args, **kwargs):
@@ -57,21 +61,165 @@ class ProductoViewSet(viewsets.ModelViewSet):
         instance.save()
         return Response(status=status.HTTP_204_NO_CONTENT)
 
+    def _pagina_ordenada(self, queryset):
+        """Pagina con un orden estable (cubierto por índice) para no repetir ni saltar filas."""
+        queryset = queryset.order_by('-fecha_creacion', '-id')
+        page = self.paginate_queryset(queryset)
+        serializer = self.get_serializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
+
     @action(detail=False, methods=['get'])
     def destacados(self, request):
-        """Productos destacados para la página principal"""
-        productos_destacados = self.get_queryset().filter(destacado=True)
-        serializer = self.get_serializer(productos_destacados, many=True)
-        return Response(serializer.data)
+        """Productos destacados para la página principal (paginado)"""
+        def generar():
+            return self._pagina_ordenada(self.get_queryset().filter(destacado=True))
+        return respuesta_cacheada(request, generar)
 
     @action(detail=False, methods=['get'])
     def por_categoria(self, request):
-        """Productos agrupados por categoría"""
-        categoria_id = request.query_params.get('categoria_id')
-        if categoria_id:
-            productos = self.get_queryset().filter(categoria_id=categoria_id)
+        """
+        Productos de una categoría (paginado): ?categoria_id=3&page=2
+        La cantidad y el rango de precios están en el resumen de la categoría.
+        """
+        def generar():
+            categoria_id = request.query_params.get('categoria_id')
+            if categoria_id:
+                try:
+                    productos = self.get_queryset().filter(categoria_id=int(categoria_id))
+                except ValueError:
+                    return Response({'error': 'categoria_id debe ser un entero'}, status=status.HTTP_400_BAD_REQUEST)
+            else:
+                productos = self.get_queryset()
+            return self._pagina_ordenada(productos)
+        return respuesta_cacheada(request, generar)
+
+    @action(detail=False, methods=['get'])
+    def facetas(self, request):
+        """
+        Conteos por categoría, rango de precio y destacado para la búsqueda
+        actual. Acepta los mismos filtros que el listado (?search=&categoria=&destacado=).
+        """
+        def generar():
+            return Response(calcular_facetas(self.filter_queryset(self.get_queryset())))
+        return respuesta_cacheada(request, generar)
+
+    @action(detail=False, methods=['post'], permission_classes=[permissions.IsAdminUser],
+            parser_classes=[MultiPartParser])
+    def importar(self, request):
+        """
+        Importación masiva desde CSV o JSONL (campo 'archivo').
+        Opciones: ?crear_categorias=1 crea las categorías que no existan,
+        ?dry_run=1 solo valida. Devuelve los conteos y los errores por fila.
+        """
+        archivo = request.FILES.get('archivo')
+        if archivo is None:
+            return Response({'error': "Falta el archivo ('archivo')"}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            formato = request.query_params.get('formato') or detectar_formato(archivo.name)
+            resultado = importar_productos(
+                archivo,
+                formato,
+                crear_categorias=request.query_params.get('crear_categorias') in ('1', 'true'),
+                dry_run=request.query_params.get('dry_run') in ('1', 'true'),
+                usuario=request.user,
+            )
+        except (ErrorImportacion, UnicodeDecodeError) as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(resultado)
+
+    @action(detail=False, methods=['post'], url_path='actualizar-precios',
+            permission_classes=[permissions.IsAdminUser])
+    def actualizar_precios(self, request):
+        """
+        Cambio de precios masivo en una sola operación, con historial.
+        Body: { porcentaje | monto, categoria_id?, ids?, motivo? }
+        """
+        serializer = ActualizacionPreciosSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        resultado = actualizar_precios(usuario=request.user, **serializer.validated_data)
+        return Response(resultado)
+
+    @action(detail=True, methods=['get'], url_path='historial-precios')
+    def historial_precios(self, request, pk=None):
+        """Cambios de precio del producto, del más reciente al más antiguo"""
+        producto = self.get_object()
+        historial = HistorialPrecio.objects.filter(producto_id=producto.pk).select_related('usuario')
+        page = self.paginate_queryset(historial)
+        serializer = HistorialPrecioSerializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
+
+    @action(detail=True, methods=['get'])
+    def stock(self, request, pk=None):
+        """
+        Stock disponible del producto (null si no tiene control de stock).
+        Va aparte del catálogo cacheado porque cambia con cada venta.
+        """
+        producto = self.get_object()
+        stock = Inventario.objects.filter(producto=producto).values_list('stock', flat=True).first()
+        return Response({'producto_id': producto.id, 'stock': stock})
+
+    @action(detail=True, methods=['get'])
+    def recomendados(self, request, pk=None):
+        """
+        "Comprados juntos": ?limit=10 (máx. 20). Se leen de la tabla
+        precalculada (python manage.py calcular_recomendados).
+        """
+        try:
+            limite = max(1, min(int(request.query_params.get('limit', 10)), TOP_K))
+        except ValueError:
+            return Response({'error': 'limit debe ser un número'}, status=status.HTTP_400_BAD_REQUEST)
+        producto = self.get_object()
+        relacionados = list(
+            ProductoRelacionado.objects.filter(producto_id=producto.pk, relacionado__activo=True)
+            .select_related('relacionado__categoria')
+            .order_by('posicion')[:limite]
+        )
+        productos = self.get_serializer([r.relacionado for r in relacionados], many=True).data
+        for fila, relacionado in zip(productos, relacionados):
+            fila['veces_juntos'] = relacionado.veces
+            fila['puntaje'] = round(relacionado.puntaje, 4)
+        return Response({'producto_id': producto.pk, 'resultados': productos})
+
+    @action(detail=False, methods=['get'], url_path='para-mi',
+            permission_classes=[permissions.IsAuthenticated])
+    def para_mi(self, request):
+        """
+        Recomendaciones personalizadas del cliente: ?limit=10 (máx. 30).
+        Vienen precalculadas (python manage.py calcular_recomendaciones);
+        sin compras todavía se devuelven los destacados.
+        """
+        try:
+            limite = max(1, min(int(request.query_params.get('limit', 10)), TOP_N))
+        except ValueError:
+            return Response({'error': 'limit debe ser un número'}, status=status.HTTP_400_BAD_REQUEST)
+
+        recomendados = recomendaciones_de(request.user.id)
+        if recomendados:
+            puntajes = dict(recomendados)
+            activos = self.get_queryset().in_bulk(list(puntajes))
+            productos = [activos[pk] for pk, _ in recomendados if pk in activos][:limite]
+            fuente = 'personalizadas'
         else:
-            productos = self.get_queryset()
-        
-        serializer = self.get_serializer(productos, many=True)
-        return Response(serializer.data)
\ No newline at end of file
+            productos = list(self.get_queryset().filter(destacado=True).order_by('-fecha_creacion', '-id')[:limite])
+            puntajes = {}
+            fuente = 'destacados'
+
+        resultados = self.get_serializer(productos, many=True).data
+        for producto in resultados:
+            if producto['id'] in puntajes:
+                producto['puntaje'] = puntajes[producto['id']]
+        return Response({'fuente': fuente, 'resultados': resultados})
+
+    @action(detail=False, methods=['get'])
+    def autocompletar(self, request):
+        """
+        Sugerencias por prefijo para el buscador: ?q=sams&limit=8
+        Se responde desde un índice en memoria, sin consultar la BD.
+        """
+        try:
+            limite = min(max(int(request.query_params.get('limit', 8)), 1), 20)
+        except ValueError:
+            return Response({'error': 'limit debe ser un entero'}, status=status.HTTP_400_BAD_REQUEST)
+        sugerencias = autocomplete.indice.buscar(request.query_params.get('q', ''), limite)
+        return Response(sugerencias)
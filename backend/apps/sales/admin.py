@@ -1,3 +1,16 @@
 from django.contrib import admin
+from .models import AnomaliaVenta, DeteccionAnomalias
 
-# Register your models here.
+
+@admin.register(AnomaliaVenta)
+class AnomaliaVentaAdmin(admin.ModelAdmin):
+    list_display = ['fecha', 'tipo', 'nombre', 'unidades', 'esperado', 'puntaje', 'direccion']
+    list_filter = ['tipo', 'direccion', 'fecha']
+    search_fields = ['nombre']
+    list_per_page = 20
+
+
+@admin.register(DeteccionAnomalias)
+class DeteccionAnomaliasAdmin(admin.ModelAdmin):
+    list_display = ['desde', 'hasta', 'series', 'anomalias', 'fecha_ejecucion']
+    list_per_page = 20
@@ -0,0 +1,197 @@
+"""
+Detección de anomalías en las ventas diarias por producto y por categoría.
+
+Cada serie son las unidades vendidas por día (ventas completadas, días sin
+ventas = 0). Un día es anómalo si se aleja de los VENTANA días anteriores
+más de ANOMALIES_THRESHOLD desviaciones robustas:
+
+    puntaje = (unidades - mediana) / max(1.4826 * MAD, ESCALA_MINIMA)
+
+Mediana y MAD no se afectan por los mismos picos que se buscan, así que un
+error de precio (alza) o un quiebre de stock (baja) no "contaminan" la
+referencia de los días siguientes como lo haría la media.
+
+Todas las series se evalúan juntas: una consulta agrupada trae los totales
+diarios, pandas arma la matriz días x series y las ventanas se calculan
+con NumPy sobre toda la matriz, por bloques de días para acotar la memoria.
+
+Es incremental: cada corrida (DeteccionAnomalias) evalúa desde el día
+siguiente al último evaluado hasta ayer; el día en curso nunca se evalúa.
+Las ventas cargadas después con fecha pasada (ingesta offline) no se
+vuelven a evaluar salvo con --completo.
+
+    python manage.py detectar_anomalias [--completo]
+"""
+from datetime import datetime, time, timedelta
+
+import numpy as np
+import pandas as pd
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Min, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+from numpy.lib.stride_tricks import sliding_window_view
+
+from apps.core.db_router import use_replica
+
+from .models import AnomaliaVenta, DeteccionAnomalias, DetalleVenta, Venta
+
+VENTANA = 28
+# Días con ventas que necesita la ventana para evaluar la serie
+MIN_DIAS_CON_VENTAS = 7
+# Una unidad: evita puntajes enormes en series casi constantes
+ESCALA_MINIMA = 1.0
+# 1.4826 * MAD estima la desviación estándar si los datos fueran normales
+FACTOR_MAD = 1.4826
+BLOQUE_DIAS = 30
+
+
+def _umbral():
+    return float(getattr(settings, 'ANOMALIES_THRESHOLD', 3.5))
+
+
+def _inicio_del_dia(fecha):
+    return timezone.make_aware(datetime.combine(fecha, time.min))
+
+
+@use_replica()
+def ventas_diarias(desde, hasta):
+    """
+    Matriz de unidades (días x series) de 'desde' a 'hasta' inclusive y la
+    lista de series [(tipo, id), ...], productos primero.
+    """
+    filas = (
+        DetalleVenta.objects.filter(
+            venta__estado='COMPLETADO',
+            producto__isnull=False,
+            venta__fecha_creacion__gte=_inicio_del_dia(desde),
+            venta__fecha_creacion__lt=_inicio_del_dia(hasta + timedelta(days=1)),
+        )
+        .annotate(dia=TruncDate('venta__fecha_creacion'))
+        .order_by()
+        .values('dia', 'producto_id', 'producto__categoria_id')
+        .annotate(unidades=Sum('cantidad'))
+        .values_list('dia', 'producto_id', 'producto__categoria_id', 'unidades')
+    )
+    df = pd.DataFrame.from_records(list(filas), columns=['dia', 'producto_id', 'categoria_id', 'unidades'])
+    dias = pd.date_range(desde, hasta, freq='D')
+    if df.empty:
+        return np.zeros((len(dias), 0), dtype=np.float32), []
+
+    df['dia'] = pd.to_datetime(df['dia'])
+    productos = df.pivot_table(index='dia', columns='producto_id', values='unidades', aggfunc='sum', fill_value=0)
+    categorias = (
+        df.dropna(subset=['categoria_id'])
+        .pivot_table(index='dia', columns='categoria_id', values='unidades', aggfunc='sum', fill_value=0)
+    )
+    productos = productos.reindex(dias, fill_value=0)
+    categorias = categorias.reindex(dias, fill_value=0)
+
+    series = [(AnomaliaVenta.PRODUCTO, int(i)) for i in productos.columns]
+    series += [(AnomaliaVenta.CATEGORIA, int(i)) for i in categorias.columns]
+    valores = np.hstack([productos.to_numpy(np.float32), categorias.to_numpy(np.float32)])
+    return valores, series
+
+
+def puntuar(valores, ventana=VENTANA):
+    """
+    Para cada día desde 'ventana' (filas de 'valores'), la mediana, la
+    desviación robusta y el puntaje respecto de los 'ventana' días
+    anteriores, más cuántos de esos días tuvieron ventas. Todo con forma
+    (días - ventana, series).
+    """
+    # ventanas[i] son las filas i..i+ventana-1, la referencia del día i+ventana
+    ventanas = sliding_window_view(valores[:-1], ventana, axis=0)
+    mediana = np.median(ventanas, axis=2)
+    mad = np.median(np.abs(ventanas - mediana[..., None]), axis=2)
+    desviacion = np.maximum(FACTOR_MAD * mad, ESCALA_MINIMA)
+    puntaje = (valores[ventana:] - mediana) / desviacion
+    con_ventas = (ventanas > 0).sum(axis=2)
+    return mediana, desviacion, puntaje, con_ventas
+
+
+def _anomalias(valores, series, dias, umbral):
+    """[AnomaliaVenta sin nombre, ...] de los días 'dias' (los últimos de 'valores')."""
+    mediana, desviacion, puntaje, con_ventas = puntuar(valores)
+    marcadas = (np.abs(puntaje) >= umbral) & (con_ventas >= MIN_DIAS_CON_VENTAS)
+    observados = valores[VENTANA:]
+
+    anomalias = []
+    for fila, columna in zip(*np.nonzero(marcadas)):
+        tipo, serie_id = series[columna]
+        anomalias.append(AnomaliaVenta(
+            tipo=tipo,
+            serie_id=serie_id,
+            fecha=dias[fila],
+            unidades=int(observados[fila, columna]),
+            esperado=round(float(mediana[fila, columna]), 2),
+            desviacion=round(float(desviacion[fila, columna]), 2),
+            puntaje=round(float(puntaje[fila, columna]), 2),
+            direccion=AnomaliaVenta.ALZA if puntaje[fila, columna] > 0 else AnomaliaVenta.BAJA,
+        ))
+    return anomalias
+
+
+def _nombrar(anomalias):
+    from apps.products.models import Categoria, Producto
+
+    ids = {AnomaliaVenta.PRODUCTO: set(), AnomaliaVenta.CATEGORIA: set()}
+    for anomalia in anomalias:
+        ids[anomalia.tipo].add(anomalia.serie_id)
+    nombres = {
+        AnomaliaVenta.PRODUCTO: dict(
+            Producto.objects.filter(id__in=ids[AnomaliaVenta.PRODUCTO]).values_list('id', 'nombre')
+        ),
+        AnomaliaVenta.CATEGORIA: dict(
+            Categoria.objects.filter(id__in=ids[AnomaliaVenta.CATEGORIA]).values_list('id', 'nombre')
+        ),
+    }
+    for anomalia in anomalias:
+        anomalia.nombre = nombres[anomalia.tipo].get(anomalia.serie_id, f"#{anomalia.serie_id}")[:255]
+
+
+def detectar_anomalias(completo=False, hoy=None):
+    """
+    Evalúa los días nuevos (todos con completo) y guarda las anomalías.
+    Devuelve {'desde', 'hasta', 'series', 'anomalias'}; desde y hasta son
+    None si no había días por evaluar.
+    """
+    hoy = hoy or timezone.localdate()
+    hasta = hoy - timedelta(days=1)
+    ultima = None if completo else DeteccionAnomalias.objects.order_by('-hasta').first()
+    if ultima is not None:
+        desde = ultima.hasta + timedelta(days=1)
+    else:
+        primera = Venta.objects.filter(estado='COMPLETADO').aggregate(primera=Min('fecha_creacion'))['primera']
+        if primera is None:
+            return {'desde': None, 'hasta': None, 'series': 0, 'anomalias': 0}
+        # El primer día evaluable es el que ya tiene una ventana completa detrás
+        desde = timezone.localtime(primera).date() + timedelta(days=VENTANA)
+    if desde > hasta:
+        return {'desde': None, 'hasta': None, 'series': 0, 'anomalias': 0}
+
+    umbral = _umbral()
+    valores, series = ventas_diarias(desde - timedelta(days=VENTANA), hasta)
+    dias = [(desde + timedelta(days=i)) for i in range((hasta - desde).days + 1)]
+
+    anomalias = []
+    if series:
+        for inicio in range(0, len(dias), BLOQUE_DIAS):
+            bloque = dias[inicio:inicio + BLOQUE_DIAS]
+            # Filas del bloque más la ventana que lo precede
+            anomalias += _anomalias(valores[inicio:inicio + VENTANA + len(bloque)], series, bloque, umbral)
+        _nombrar(anomalias)
+
+    with transaction.atomic():
+        if completo:
+            AnomaliaVenta.objects.all().delete()
+        AnomaliaVenta.objects.bulk_create(
+            anomalias,
+            update_conflicts=True,
+            unique_fields=['tipo', 'serie_id', 'fecha'],
+            update_fields=['nombre', 'unidades', 'esperado', 'desviacion', 'puntaje', 'direccion'],
+            batch_size=1000,
+        )
+        DeteccionAnomalias.objects.create(desde=desde, hasta=hasta, series=len(series), anomalias=len(anomalias))
+    return {'desde': desde, 'hasta': hasta, 'series': len(series), 'anomalias': len(anomalias)}
@@ -0,0 +1,32 @@
+"""
+Eventos de ventas para el outbox (apps.core.outbox).
+
+Cada venta publica 'venta.creada' y, si quedó completada, también
+'venta.completada', que es el evento al que se suscriben los procesos que
+reaccionan a una venta cerrada.
+"""
+from apps.core.outbox import publicar_eventos
+
+
+def payload_venta(venta):
+    return {
+        'venta_id': venta.pk,
+        'usuario_id': venta.usuario_id,
+        'pago_id': venta.pago_id,
+        'total': venta.total,
+        'estado': venta.estado,
+        'fecha': venta.fecha_creacion,
+    }
+
+
+def eventos_venta(venta):
+    eventos = [('venta.creada', payload_venta(venta))]
+    if venta.estado == 'COMPLETADO':
+        eventos.append(('venta.completada', payload_venta(venta)))
+    return eventos
+
+
+def publicar_ventas(ventas, extra=()):
+    """Publica los eventos de varias ventas (más 'extra') con un solo INSERT."""
+    eventos = [evento for venta in ventas for evento in eventos_venta(venta)]
+    return publicar_eventos(eventos + list(extra))
@@ -0,0 +1,343 @@
+"""
+Ingesta por lotes de ventas fuera de línea (POS, tiendas sin conexión).
+
+Cada carrito trae su fecha real y opcionalmente una referencia del POS:
+
+    {"referencia": "T1-000123", "fecha": "2025-08-14T10:32:00-04:00",
+     "usuario_id": 7, "payment_method": "cash",
+     "items": [{"producto_id": 3, "cantidad": 2}, ...]}
+
+Los carritos se procesan por bloques de CHUNK_SIZE, cada uno en su propia
+transacción: se validan juntos en memoria, los productos y usuarios se
+leen con una consulta por bloque y Payment, Venta y DetalleVenta se
+insertan con bulk_create. Las fechas se fijan después con un UPDATE por
+tabla y bloque (auto_now_add pisa el valor en el INSERT); fecha_actualizacion
+queda con la hora de la ingesta para que la sincronización móvil vea las
+ventas nuevas.
+
+La referencia se guarda como Payment.transaction_id = 'POS-<referencia>':
+reenviar un carrito ya ingerido no lo duplica, se informa como duplicado.
+Los errores se informan por carrito (índice en el lote) sin afectar al
+resto. El stock se descuenta como en el checkout, con un único UPDATE
+condicional por bloque, y los eventos de venta y pago se publican en el
+outbox dentro de la misma transacción.
+"""
+from datetime import timedelta
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import OuterRef, Subquery
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from apps.payments.models import Payment
+from apps.payments.signals import EVENTOS_ESTADO, payload_pago
+from apps.products.inventory import StockInsuficiente, descontar_stock
+from apps.products.models import Inventario, Producto
+from apps.users.models import User
+
+from .events import publicar_ventas
+from .models import DetalleVenta, Venta
+
+CHUNK_SIZE = 500
+# Carritos por petición en el endpoint; el comando no tiene límite
+MAX_LOTE = 1000
+MAX_ERRORES = 1000
+PREFIJO_REFERENCIA = 'POS-'
+# Tolerancia para relojes de caja adelantados
+MARGEN_FUTURO = timedelta(minutes=5)
+# Reintentos de un bloque si un checkout concurrente agota el stock entre la lectura y el descuento
+REINTENTOS_STOCK = 3
+
+_METODOS = dict(Payment.PAYMENT_METHODS)
+
+
+def _validar(carrito, ahora):
+    """Devuelve (valores, errores) de un carrito sin tocar la base de datos."""
+    if not isinstance(carrito, dict):
+        return None, {'carrito': "debe ser un objeto"}
+
+    valores = {}
+    errores = {}
+
+    referencia = carrito.get('referencia')
+    if referencia not in (None, ''):
+        referencia = str(referencia).strip()
+        if len(PREFIJO_REFERENCIA + referencia) > Payment._meta.get_field('transaction_id').max_length:
+            errores['referencia'] = "demasiado larga"
+        valores['referencia'] = referencia
+    else:
+        valores['referencia'] = None
+
+    fecha = carrito.get('fecha')
+    fecha = parse_datetime(fecha) if isinstance(fecha, str) else None
+    if fecha is None:
+        errores['fecha'] = "se requiere una fecha ISO 8601 válida"
+    else:
+        if timezone.is_naive(fecha):
+            fecha = timezone.make_aware(fecha)
+        if fecha > ahora + MARGEN_FUTURO:
+            errores['fecha'] = "está en el futuro"
+        valores['fecha'] = fecha
+
+    metodo = carrito.get('payment_method') or 'cash'
+    if metodo not in _METODOS:
+        errores['payment_method'] = f"debe ser uno de: {', '.join(_METODOS)}"
+    valores['payment_method'] = metodo
+
+    if carrito.get('usuario_id') not in (None, ''):
+        try:
+            valores['usuario_id'] = int(carrito['usuario_id'])
+        except (TypeError, ValueError):
+            errores['usuario_id'] = "no es un entero"
+
+    items = carrito.get('items')
+    if not isinstance(items, list) or not items:
+        errores['items'] = "El carrito no puede estar vacío."
+    else:
+        lineas = []
+        for i, item in enumerate(items):
+            try:
+                producto_id = int(item['producto_id'])
+                cantidad = int(item['cantidad'])
+            except (KeyError, TypeError, ValueError):
+                errores['items'] = f"item {i}: se requieren 'producto_id' y 'cantidad' enteros"
+                break
+            if cantidad < 1:
+                errores['items'] = f"item {i}: la cantidad debe ser al menos 1"
+                break
+            lineas.append((producto_id, cantidad))
+        valores['lineas'] = lineas
+
+    return valores, errores
+
+
+class Ingesta:
+    """Acumula el resultado mientras procesa los carritos por bloques."""
+
+    def __init__(self, usuario=None, chunk_size=CHUNK_SIZE):
+        self.usuario = usuario
+        self.chunk_size = chunk_size
+        self.resultado = {
+            'procesadas': 0,
+            'creadas': 0,
+            'duplicadas': 0,
+            'total_errores': 0,
+            'errores': [],
+            'ventas': [],
+        }
+
+    def _error(self, indice, referencia, errores):
+        self.resultado['total_errores'] += 1
+        if len(self.resultado['errores']) < MAX_ERRORES:
+            self.resultado['errores'].append({'indice': indice, 'referencia': referencia, 'errores': errores})
+
+    def ingerir(self, carritos):
+        bloque = []
+        for indice, carrito in enumerate(carritos):
+            bloque.append((indice, carrito))
+            if len(bloque) >= self.chunk_size:
+                self._procesar_bloque(bloque)
+                bloque = []
+        if bloque:
+            self._procesar_bloque(bloque)
+        return self.resultado
+
+    def _procesar_bloque(self, bloque):
+        self.resultado['procesadas'] += len(bloque)
+        ahora = timezone.now()
+
+        validos = []
+        for indice, carrito in bloque:
+            valores, errores = _validar(carrito, ahora)
+            if errores:
+                referencia = carrito.get('referencia') if isinstance(carrito, dict) else None
+                self._error(indice, referencia, errores)
+            else:
+                validos.append((indice, valores))
+        if not validos:
+            return
+
+        validos = self._resolver(validos)
+        validos = self._descartar_duplicados(validos)
+
+        for intento in range(REINTENTOS_STOCK):
+            aceptados, sin_stock = self._asignar_stock(validos)
+            try:
+                with transaction.atomic():
+                    creadas = self._insertar(aceptados)
+                    # Al final del bloque: el bloqueo de las filas de stock dura lo mínimo
+                    descontar_stock([linea for _, valores in aceptados for linea in valores['lineas']])
+            except StockInsuficiente as e:
+                if intento < REINTENTOS_STOCK - 1:
+                    continue
+                # Stock disputado en todos los intentos: el bloque no se ingiere y sus
+                # carritos se informan como error, sin cortar el resto del lote
+                for indice, valores in aceptados:
+                    producto_ids = {pk for pk, _ in valores['lineas']}
+                    faltantes = [f for f in e.faltantes if f['producto_id'] in producto_ids]
+                    sin_stock.append((indice, valores, faltantes))
+                aceptados, creadas = [], []
+            break
+
+        for indice, valores, faltantes in sin_stock:
+            self._error(indice, valores['referencia'], {'items': 'Stock insuficiente.', 'faltantes': faltantes})
+        for (indice, valores), venta_id in zip(aceptados, creadas):
+            self.resultado['ventas'].append(
+                {'indice': indice, 'referencia': valores['referencia'], 'venta_id': venta_id, 'duplicada': False}
+            )
+        self.resultado['creadas'] += len(creadas)
+
+    def _resolver(self, validos):
+        """Productos y usuarios del bloque con una consulta cada uno."""
+        producto_ids = {pk for _, valores in validos for pk, _ in valores['lineas']}
+        productos = Producto.objects.only('id', 'nombre', 'precio_venta').in_bulk(producto_ids)
+        usuario_ids = {valores['usuario_id'] for _, valores in validos if 'usuario_id' in valores}
+        usuarios = set(User.objects.filter(id__in=usuario_ids).values_list('id', flat=True))
+
+        resueltos = []
+        for indice, valores in validos:
+            errores = {}
+            faltan = sorted({pk for pk, _ in valores['lineas'] if pk not in productos})
+            if faltan:
+                errores['items'] = f"Productos inexistentes: {', '.join(map(str, faltan))}"
+            if 'usuario_id' in valores:
+                if valores['usuario_id'] not in usuarios:
+                    errores['usuario_id'] = "no existe"
+            elif self.usuario is None:
+                errores['usuario_id'] = "requerido"
+            else:
+                valores['usuario_id'] = self.usuario.pk
+            if errores:
+                self._error(indice, valores['referencia'], errores)
+                continue
+
+            # Snapshot de nombre y precio, como en el checkout
+            detalles = []
+            total = Decimal('0.00')
+            for pk, cantidad in valores['lineas']:
+                producto = productos[pk]
+                total += producto.precio_venta * cantidad
+                detalles.append((pk, producto.nombre, producto.precio_venta, cantidad))
+            valores['detalles'] = detalles
+            valores['total'] = total
+            resueltos.append((indice, valores))
+        return resueltos
+
+    def _descartar_duplicados(self, validos):
+        """Carritos con una referencia ya ingerida (antes o en este mismo lote)."""
+        referencias = {PREFIJO_REFERENCIA + v['referencia'] for _, v in validos if v['referencia']}
+        existentes = dict(
+            Payment.objects.filter(transaction_id__in=referencias).values_list('transaction_id', 'venta__id')
+        )
+
+        nuevos = []
+        vistos = set()
+        for indice, valores in validos:
+            if valores['referencia']:
+                clave = PREFIJO_REFERENCIA + valores['referencia']
+                if clave in existentes or clave in vistos:
+                    self.resultado['duplicadas'] += 1
+                    self.resultado['ventas'].append({
+                        'indice': indice,
+                        'referencia': valores['referencia'],
+                        'venta_id': existentes.get(clave),
+                        'duplicada': True,
+                    })
+                    continue
+                vistos.add(clave)
+            nuevos.append((indice, valores))
+        return nuevos
+
+    def _asignar_stock(self, validos):
+        """
+        Reparte el stock disponible entre los carritos en orden: los que no
+        alcanzan quedan como error y el resto se descuenta junto.
+        """
+        producto_ids = {pk for _, valores in validos for pk, _ in valores['lineas']}
+        disponibles = dict(
+            Inventario.objects.filter(producto_id__in=producto_ids).values_list('producto_id', 'stock')
+        )
+
+        aceptados = []
+        sin_stock = []
+        for indice, valores in validos:
+            pedido = {}
+            for pk, cantidad in valores['lineas']:
+                pedido[pk] = pedido.get(pk, 0) + cantidad
+            faltantes = [
+                {'producto_id': pk, 'solicitado': cantidad, 'disponible': disponibles[pk]}
+                for pk, cantidad in pedido.items()
+                if pk in disponibles and disponibles[pk] < cantidad
+            ]
+            if faltantes:
+                sin_stock.append((indice, valores, faltantes))
+                continue
+            for pk, cantidad in pedido.items():
+                if pk in disponibles:
+                    disponibles[pk] -= cantidad
+            aceptados.append((indice, valores))
+        return aceptados, sin_stock
+
+    def _insertar(self, aceptados):
+        """Inserta pagos, ventas y detalles del bloque. Devuelve los ids de venta en orden."""
+        if not aceptados:
+            return []
+
+        pagos = Payment.objects.bulk_create([
+            Payment(
+                user_id=valores['usuario_id'],
+                amount=valores['total'],
+                method=valores['payment_method'],
+                status='completed',
+                transaction_id=PREFIJO_REFERENCIA + valores['referencia'] if valores['referencia'] else None,
+                description='Venta fuera de línea',
+            )
+            for _, valores in aceptados
+        ], batch_size=self.chunk_size)
+
+        ventas = Venta.objects.bulk_create([
+            Venta(
+                usuario_id=valores['usuario_id'],
+                pago=pago,
+                total=valores['total'],
+                estado='COMPLETADO',
+            )
+            for (_, valores), pago in zip(aceptados, pagos)
+        ], batch_size=self.chunk_size)
+
+        detalles = []
+        for (_, valores), venta in zip(aceptados, ventas):
+            venta.fecha_creacion = valores['fecha']
+            detalles.extend(
+                DetalleVenta(
+                    venta=venta,
+                    producto_id=pk,
+                    nombre_producto=nombre,
+                    precio_unitario=precio,
+                    cantidad=cantidad,
+                )
+                for pk, nombre, precio, cantidad in valores['detalles']
+            )
+        DetalleVenta.objects.bulk_create(detalles, batch_size=self.chunk_size)
+
+        # Fechas reales: la de la venta y, copiadas de ella, las del pago y los detalles
+        Venta.objects.bulk_update(ventas, ['fecha_creacion'], batch_size=self.chunk_size)
+        venta_ids = [venta.id for venta in ventas]
+        fecha_venta = Venta.objects.filter(pk=OuterRef('venta_id')).values('fecha_creacion')[:1]
+        DetalleVenta.objects.filter(venta_id__in=venta_ids).update(fecha_creacion=Subquery(fecha_venta))
+        fecha_pago = Venta.objects.filter(pago_id=OuterRef('pk')).values('fecha_creacion')[:1]
+        Payment.objects.filter(id__in=[pago.id for pago in pagos]).update(created_at=Subquery(fecha_pago))
+
+        # bulk_create no dispara señales: los eventos del pago se publican aquí
+        publicar_ventas(ventas, extra=[(EVENTOS_ESTADO['completed'], payload_pago(pago)) for pago in pagos])
+        return venta_ids
+
+
+def ingerir_ventas(carritos, usuario=None, chunk_size=CHUNK_SIZE):
+    """
+    Ingiere ventas ya realizadas. Los carritos sin 'usuario_id' quedan a
+    nombre de 'usuario'. Devuelve {'procesadas', 'creadas', 'duplicadas',
+    'total_errores', 'errores', 'ventas'}.
+    """
+    return Ingesta(usuario=usuario, chunk_size=chunk_size).ingerir(carritos)
@@ -0,0 +1,25 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from apps.sales.anomalies import detectar_anomalias
+
+
+class Command(BaseCommand):
+    help = 'Detecta anomalías en las ventas diarias por producto y categoría (solo los días nuevos)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--completo', action='store_true', help='Reevalúa todo el historial')
+
+    def handle(self, *args, **options):
+        inicio = time.perf_counter()
+        resultado = detectar_anomalias(completo=options['completo'])
+        duracion = time.perf_counter() - inicio
+
+        if resultado['desde'] is None:
+            self.stdout.write('No hay días nuevos para evaluar')
+            return
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ {resultado['desde']} a {resultado['hasta']}: {resultado['series']} series, "
+            f"{resultado['anomalias']} anomalías en {duracion:.1f}s"
+        ))
@@ -0,0 +1,42 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.products.importer import leer_filas
+from apps.sales.ingest import CHUNK_SIZE, ingerir_ventas
+from apps.users.models import User
+
+
+class Command(BaseCommand):
+    help = 'Ingiere ventas fuera de línea (POS) desde un archivo JSONL, un carrito por línea'
+
+    def add_arguments(self, parser):
+        parser.add_argument('ruta', help='Archivo .jsonl')
+        parser.add_argument('--usuario', help='Username para los carritos sin usuario_id')
+        parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE)
+        parser.add_argument('--max-errores', type=int, default=20, help='Errores a mostrar')
+
+    def handle(self, *args, **options):
+        usuario = None
+        if options['usuario']:
+            usuario = User.objects.filter(username=options['usuario']).first()
+            if usuario is None:
+                raise CommandError(f"No existe el usuario {options['usuario']}")
+
+        inicio = time.perf_counter()
+        try:
+            with open(options['ruta'], 'rb') as archivo:
+                carritos = (carrito for _, carrito in leer_filas(archivo, 'jsonl'))
+                resultado = ingerir_ventas(carritos, usuario=usuario, chunk_size=options['chunk_size'])
+        except (OSError, UnicodeDecodeError) as e:
+            raise CommandError(str(e))
+
+        for error in resultado['errores'][:options['max_errores']]:
+            self.stderr.write(f"  carrito {error['indice']} ({error['referencia'] or 'sin referencia'}): {error['errores']}")
+
+        duracion = time.perf_counter() - inicio
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ {resultado['procesadas']} carritos en {duracion:.1f}s: "
+            f"{resultado['creadas']} ventas creadas, {resultado['duplicadas']} duplicadas, "
+            f"{resultado['total_errores']} con errores"
+        ))
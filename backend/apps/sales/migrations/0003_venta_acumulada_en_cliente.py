@@ -0,0 +1,18 @@
+# Generated by Django 5.2.7 on 2026-10-19 15:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sales', '0002_venta_sales_venta_usuario_5074c8_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='venta',
+            name='acumulada_en_cliente',
+            field=models.BooleanField(default=False, editable=False),
+        ),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 5.2.7 on 2026-10-19 16:02
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payments', '0001_initial'),
+        ('sales', '0003_venta_acumulada_en_cliente'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='venta',
+            index=models.Index(fields=['fecha_actualizacion', 'id'], name='sales_venta_fecha_a_2ade28_idx'),
+        ),
+    ]
@@ -0,0 +1,52 @@
+# Generated by Django 5.2.7 on 2026-10-19 16:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sales', '0004_venta_fecha_actualizacion_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DeteccionAnomalias',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('desde', models.DateField()),
+                ('hasta', models.DateField()),
+                ('series', models.PositiveIntegerField(default=0)),
+                ('anomalias', models.PositiveIntegerField(default=0)),
+                ('fecha_ejecucion', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'Detección de anomalías',
+                'verbose_name_plural': 'Detecciones de anomalías',
+                'ordering': ['-hasta'],
+            },
+        ),
+        migrations.CreateModel(
+            name='AnomaliaVenta',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tipo', models.CharField(choices=[('producto', 'Producto'), ('categoria', 'Categoría')], max_length=20)),
+                ('serie_id', models.PositiveIntegerField()),
+                ('nombre', models.CharField(max_length=255)),
+                ('fecha', models.DateField()),
+                ('unidades', models.PositiveIntegerField()),
+                ('esperado', models.FloatField()),
+                ('desviacion', models.FloatField()),
+                ('puntaje', models.FloatField()),
+                ('direccion', models.CharField(choices=[('alza', 'Alza'), ('baja', 'Baja')], max_length=10)),
+                ('fecha_deteccion', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'Anomalía de ventas',
+                'verbose_name_plural': 'Anomalías de ventas',
+                'ordering': ['-fecha', '-puntaje'],
+                'indexes': [models.Index(fields=['-fecha'], name='sales_anoma_fecha_57fa41_idx')],
+                'constraints': [models.UniqueConstraint(fields=('tipo', 'serie_id', 'fecha'), name='unique_anomalia_serie_fecha')],
+            },
+        ),
+    ]
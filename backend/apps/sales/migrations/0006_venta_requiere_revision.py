@@ -0,0 +1,18 @@
+# Generated by Django 5.2.7 on 2026-10-19 16:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sales', '0005_anomalias'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='venta',
+            name='requiere_revision',
+            field=models.BooleanField(default=False),
+        ),
+    ]
@@ -10,6 +10,7 @@ from sklearn.metrics import mean_squared_error
 from django.db.models import Sum
 from django.db.models.functions import TruncMonth
 
+from apps.core.db_router import use_replica
 from .models import Venta, DetalleVenta
 
 # --- Constantes ---
@@ -17,6 +18,7 @@ MODEL_DIR = os.path.dirname(os.path.abspath(__file__))
 MODEL_PATH = os.path.join(MODEL_DIR, 'sales_model.joblib')
 
 # --- Helper para obtener datos filtrados ---
+@use_replica()
 def get_filtered_data(filters):
     """
     Obtiene los datos históricos basados en los filtros del usuario.
@@ -59,6 +61,7 @@ def get_filtered_data(filters):
     return df
 
 # --- Función de Entrenamiento Global (Estático) ---
+@use_replica()
 def get_training_data():
     """
     Prepara los datos históricos globales de la BD para el entrenamiento estático.
@@ -31,6 +31,10 @@ class Venta(models.Model):
     # --- Detalles de la Venta ---
     total = models.DecimalField(max_digits=10, decimal_places=2, default=0.00)
     estado = models.CharField(max_length=20, choices=ESTADO_CHOICES, default='PROCESANDO')
+    # Ya sumada a los totales del cliente (apps.users.customers): evita contarla dos veces
+    acumulada_en_cliente = models.BooleanField(default=False, editable=False)
+    # Pago completado después de vencer la reserva sin stock para volver a tomarlo
+    requiere_revision = models.BooleanField(default=False)
     
     # --- Auditoría ---
     fecha_creacion = models.DateTimeField(auto_now_add=True)
@@ -40,6 +44,22 @@ class Venta(models.Model):
         verbose_name = 'Nota de Venta'
         verbose_name_plural = 'Notas de Venta'
         ordering = ['-fecha_creacion']
+        indexes = [
+            # Keyset de la sincronización incremental (sync.py)
+            models.Index(fields=['usuario', 'fecha_actualizacion', 'id']),
+            # Ventas nuevas para los "comprados juntos" (products/recommendations.py)
+            models.Index(fields=['fecha_actualizacion', 'id']),
+        ]
+
+    def save(self, *args, **kwargs):
+        # acumulada_en_cliente solo la cambia apps.users.customers con update():
+        # guardar una instancia leída antes no debe volver a dejarla en False
+        if not self._state.adding and kwargs.get('update_fields') is None:
+            kwargs['update_fields'] = [
+                campo.name for campo in self._meta.concrete_fields
+                if not campo.primary_key and campo.name != 'acumulada_en_cliente'
+            ]
+        super().save(*args, **kwargs)
 
     def __str__(self):
         return f"Venta #{self.id} - {self.usuario.username} - {self.estado}"
@@ -77,4 +97,71 @@ class DetalleVenta(models.Model):
         ordering = ['fecha_creacion']
 
     def __str__(self):
-        return f"{self.cantidad} x {self.nombre_producto} @ {self.precio_unitario}"
\ No newline at end of file
+        return f"{self.cantidad} x {self.nombre_producto} @ {self.precio_unitario}"
+
+class AnomaliaVenta(models.Model):
+    """
+    Día en que las unidades vendidas de un producto o categoría se salieron
+    de lo habitual (apps.sales.anomalies).
+    La detecta: python manage.py detectar_anomalias
+    """
+    PRODUCTO = 'producto'
+    CATEGORIA = 'categoria'
+    TIPO_CHOICES = [
+        (PRODUCTO, 'Producto'),
+        (CATEGORIA, 'Categoría'),
+    ]
+    ALZA = 'alza'
+    BAJA = 'baja'
+    DIRECCION_CHOICES = [
+        (ALZA, 'Alza'),
+        (BAJA, 'Baja'),
+    ]
+
+    tipo = models.CharField(max_length=20, choices=TIPO_CHOICES)
+    # Id del producto o de la categoría, según el tipo
+    serie_id = models.PositiveIntegerField()
+    # Snapshot del nombre, como en DetalleVenta
+    nombre = models.CharField(max_length=255)
+    fecha = models.DateField()
+    unidades = models.PositiveIntegerField()
+    # Mediana y desviación (MAD escalada) de los días anteriores
+    esperado = models.FloatField()
+    desviacion = models.FloatField()
+    puntaje = models.FloatField()
+    direccion = models.CharField(max_length=10, choices=DIRECCION_CHOICES)
+    fecha_deteccion = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = 'Anomalía de ventas'
+        verbose_name_plural = 'Anomalías de ventas'
+        ordering = ['-fecha', '-puntaje']
+        constraints = [
+            models.UniqueConstraint(fields=['tipo', 'serie_id', 'fecha'], name='unique_anomalia_serie_fecha'),
+        ]
+        indexes = [
+            models.Index(fields=['-fecha']),
+        ]
+
+    def __str__(self):
+        return f"{self.fecha} {self.nombre}: {self.unidades} ({self.direccion}, {self.puntaje:.1f})"
+
+
+class DeteccionAnomalias(models.Model):
+    """
+    Registro de cada corrida de detectar_anomalias. 'hasta' es el último
+    día evaluado: la siguiente corrida empieza en el día siguiente.
+    """
+    desde = models.DateField()
+    hasta = models.DateField()
+    series = models.PositiveIntegerField(default=0)
+    anomalias = models.PositiveIntegerField(default=0)
+    fecha_ejecucion = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = 'Detección de anomalías'
+        verbose_name_plural = 'Detecciones de anomalías'
+        ordering = ['-hasta']
+
+    def __str__(self):
+        return f"{self.desde} a {self.hasta}: {self.anomalias} anomalías"
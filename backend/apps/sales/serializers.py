@@ -1,5 +1,5 @@
 from rest_framework import serializers
-from .models import Venta, DetalleVenta
+from .models import AnomaliaVenta, Venta, DetalleVenta
 from apps.products.models import Producto
 from apps.users.serializers import UserSerializer  # Para mostrar info del usuario
 from apps.payments.models import Payment
@@ -28,6 +28,8 @@ class VentaCreateSerializer(serializers.Serializer):
     """
     items = CartItemSerializer(many=True, allow_empty=False)
     payment_method = serializers.ChoiceField(choices=Payment.PAYMENT_METHODS)
+    # Id de la orden creada en PayPal por el frontend; con él se concilia el pago
+    paypal_order_id = serializers.CharField(max_length=100, required=False, allow_blank=True)
 
     def validate_items(self, value):
         if not value:
@@ -79,4 +81,15 @@ class VentaSerializer(serializers.ModelSerializer):
             'detalles' # La lista de items
         ]
         # 'get_estado_display' es un método del modelo que Django crea para los 'choices'
-        read_only_fields = ['id', 'usuario', 'pago', 'total', 'estado', 'fecha_creacion', 'detalles']
\ No newline at end of file
+        read_only_fields = ['id', 'usuario', 'pago', 'total', 'estado', 'fecha_creacion', 'detalles']
+
+
+class AnomaliaVentaSerializer(serializers.ModelSerializer):
+    tipo_display = serializers.CharField(source='get_tipo_display', read_only=True)
+
+    class Meta:
+        model = AnomaliaVenta
+        fields = [
+            'id', 'tipo', 'tipo_display', 'serie_id', 'nombre', 'fecha',
+            'unidades', 'esperado', 'desviacion', 'puntaje', 'direccion', 'fecha_deteccion'
+        ]
@@ -0,0 +1,115 @@
+"""
+Sincronización incremental para la app móvil.
+
+El cliente envía el cursor de la última sincronización y recibe solo las
+filas de Producto, Categoria y sus propias Ventas creadas o modificadas
+después (incluye productos dados de baja con activo=False).
+
+Cada entidad se recorre por keyset sobre (fecha_actualizacion, id), que
+tiene índice, así que un delta grande se pagina sin OFFSET: el cliente
+repite la llamada con el nuevo cursor mientras 'has_more' sea true.
+
+Solo se entregan filas con más de SYNC_LAG_SECONDS de antigüedad: una
+transacción aún abierta puede confirmar después una fila con una fecha
+anterior a la del cursor, y sin ese margen el cliente no la vería nunca.
+"""
+import base64
+import json
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+
+from apps.products.models import Categoria, Producto
+from apps.products.serializers import CategoriaSerializer, ProductoSerializer
+
+from .models import Venta
+from .serializers import VentaSerializer
+
+DEFAULT_LIMIT = 200
+MAX_LIMIT = 1000
+
+ENTIDADES = ('categorias', 'productos', 'ventas')
+
+
+class CursorInvalido(ValueError):
+    pass
+
+
+def codificar_cursor(posiciones):
+    """{'productos': (datetime, id), ...} -> cadena opaca"""
+    data = {
+        entidad: [fecha.isoformat(), pk]
+        for entidad, (fecha, pk) in posiciones.items()
+        if fecha is not None
+    }
+    return base64.urlsafe_b64encode(json.dumps(data, separators=(',', ':')).encode()).decode()
+
+
+def decodificar_cursor(cursor):
+    if not cursor:
+        return {}
+    try:
+        data = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return {
+            entidad: (datetime.fromisoformat(fecha), int(pk))
+            for entidad, (fecha, pk) in data.items()
+            if entidad in ENTIDADES
+        }
+    except (ValueError, TypeError, AttributeError):
+        raise CursorInvalido("Cursor de sincronización inválido")
+
+
+def _querysets(usuario):
+    return {
+        'categorias': Categoria.objects.select_related('resumen'),
+        'productos': Producto.objects.select_related('categoria'),
+        'ventas': Venta.objects.filter(usuario=usuario).select_related(
+            'usuario', 'pago'
+        ).prefetch_related('detalles'),
+    }
+
+
+SERIALIZERS = {
+    'categorias': CategoriaSerializer,
+    'productos': ProductoSerializer,
+    'ventas': VentaSerializer,
+}
+
+
+def _pagina(queryset, posicion, hasta, limite):
+    """Siguiente página por keyset: devuelve (filas, hay_mas)."""
+    queryset = queryset.filter(fecha_actualizacion__lte=hasta)
+    if posicion is not None:
+        fecha, pk = posicion
+        queryset = queryset.filter(
+            Q(fecha_actualizacion__gt=fecha) | Q(fecha_actualizacion=fecha, id__gt=pk)
+        )
+    filas = list(queryset.order_by('fecha_actualizacion', 'id')[:limite + 1])
+    return filas[:limite], len(filas) > limite
+
+
+def sincronizar(usuario, cursor=None, limite=DEFAULT_LIMIT, context=None):
+    """
+    Devuelve el delta desde 'cursor':
+    { categorias, productos, ventas, cursor, has_more, categorias_vigentes }
+    """
+    posiciones = decodificar_cursor(cursor)
+    lag = getattr(settings, 'SYNC_LAG_SECONDS', 2)
+    hasta = timezone.now() - timedelta(seconds=lag)
+
+    resultado = {}
+    hay_mas = False
+    for entidad, queryset in _querysets(usuario).items():
+        filas, mas = _pagina(queryset, posiciones.get(entidad), hasta, limite)
+        hay_mas = hay_mas or mas
+        if filas:
+            posiciones[entidad] = (filas[-1].fecha_actualizacion, filas[-1].id)
+        resultado[entidad] = SERIALIZERS[entidad](filas, many=True, context=context).data
+
+    resultado['cursor'] = codificar_cursor(posiciones)
+    resultado['has_more'] = hay_mas
+    # Las categorías se borran físicamente: el cliente descarta las que no estén aquí
+    resultado['categorias_vigentes'] = list(Categoria.objects.values_list('id', flat=True))
+    return resultado
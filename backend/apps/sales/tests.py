@@ -1,3 +1,232 @@
-from django.test import TestCase
+import io
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+from openpyxl import load_workbook
+
+from django.test import TestCase, TransactionTestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from apps.core import db_router
+from apps.payments.models import Payment
+from apps.products.inventory import StockInsuficiente
+from apps.products.models import Categoria, Inventario, Producto
+from apps.users.models import User
+from .anomalies import VENTANA, detectar_anomalias
+from .ingest import ingerir_ventas
+from .models import AnomaliaVenta, DeteccionAnomalias, Venta, DetalleVenta
+
+
+class AnalyticsReplicaTests(TransactionTestCase):
+    """
+    'default' y 'replica' son dos SQLite distintas (settings_test), así se
+    puede comprobar desde qué base lee cada endpoint.
+    """
+    databases = {'default', 'replica'}
+
+    def setUp(self):
+        db_router._replica_state['checked_at'] = None
+        for alias in ('default', 'replica'):
+            user = User.objects.db_manager(alias).create_user('cliente', 'cliente@test.com', 'clave123')
+            categoria = Categoria.objects.using(alias).create(nombre='Audio')
+            producto = Producto.objects.using(alias).create(
+                nombre='Parlante', precio_venta=Decimal('100.00'), categoria=categoria
+            )
+        self.user, self.producto = user, producto
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def crear_venta(self, alias):
+        pago = Payment.objects.using(alias).create(
+            user=self.user, amount=Decimal('200.00'), method='cash', status='completed'
+        )
+        venta = Venta.objects.using(alias).create(
+            usuario=self.user, pago=pago, total=Decimal('200.00'), estado='COMPLETADO'
+        )
+        DetalleVenta.objects.using(alias).create(
+            venta=venta, producto=self.producto, nombre_producto='Parlante',
+            precio_unitario=Decimal('100.00'), cantidad=2
+        )
+
+    def test_dashboard_lee_de_la_replica(self):
+        self.crear_venta('replica')
+
+        response = self.client.post('/api/sales/dashboard/historical-data/', {}, format='json')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data), 1)
+        self.assertEqual(response.data[0]['valor'], Decimal('200.00'))
+
+    def test_reporte_lee_de_la_replica(self):
+        self.crear_venta('replica')
+
+        response = self.client.post('/api/sales/reportes/generar/', {
+            'fecha_inicio': '2000-01-01', 'fecha_fin': '2100-01-01',
+            'agrupar_por': 'producto', 'formato': 'excel',
+        }, format='json')
+
+        self.assertEqual(response.status_code, 200)
+        filas = list(load_workbook(io.BytesIO(response.content)).active.values)
+        self.assertEqual(filas[3][:2], ('Parlante', 2))
+
+    def test_checkout_escribe_en_el_primario(self):
+        response = self.client.post('/api/sales/ventas/crear-desde-carrito/', {
+            'items': [{'producto_id': self.producto.id, 'cantidad': 1}],
+            'payment_method': 'cash',
+        }, format='json')
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(Venta.objects.using('default').count(), 1)
+        self.assertEqual(Venta.objects.using('replica').count(), 0)
+
+
+class IngestaStockDisputadoTests(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user('cajero', 'cajero@test.com', 'clave123')
+        categoria = Categoria.objects.create(nombre='Audio')
+        self.producto = Producto.objects.create(nombre='Parlante', precio_venta=Decimal('100.00'), categoria=categoria)
+        Inventario.objects.create(producto=self.producto, stock=10)
+
+    def carritos(self, cantidad):
+        return [
+            {'referencia': f'T1-{i}', 'fecha': '2025-08-14T10:32:00-04:00', 'payment_method': 'cash',
+             'items': [{'producto_id': self.producto.id, 'cantidad': 1}]}
+            for i in range(cantidad)
+        ]
+
+    def test_bloque_sin_stock_en_todos_los_intentos_se_informa_como_error(self):
+        faltante = StockInsuficiente([{'producto_id': self.producto.id, 'solicitado': 2, 'disponible': 0}])
+        # El primer bloque entra; el segundo pierde siempre la carrera con otro checkout
+        with mock.patch('apps.sales.ingest.descontar_stock', side_effect=[None, faltante, faltante, faltante]):
+            resultado = ingerir_ventas(self.carritos(4), usuario=self.user, chunk_size=2)
+
+        self.assertEqual((resultado['creadas'], resultado['total_errores']), (2, 2))
+        self.assertEqual([e['indice'] for e in resultado['errores']], [2, 3])
+        self.assertEqual(resultado['errores'][0]['errores']['items'], 'Stock insuficiente.')
+        self.assertEqual(Venta.objects.count(), 2)
+        self.assertEqual(Payment.objects.filter(transaction_id__in=['POS-T1-2', 'POS-T1-3']).count(), 0)
+
+
+class SyncTests(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user('cliente', 'cliente@test.com', 'clave123')
+        self.categoria = Categoria.objects.create(nombre='Audio')
+        self.productos = [
+            Producto.objects.create(nombre=f'Producto {i}', precio_venta=Decimal('10.00'), categoria=self.categoria)
+            for i in range(5)
+        ]
+        # Todos con la misma fecha: el orden lo decide el id
+        self.fecha = timezone.now() - timedelta(minutes=10)
+        Producto.objects.update(fecha_actualizacion=self.fecha)
+        Categoria.objects.update(fecha_actualizacion=self.fecha)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def sincronizar(self, since=None, limit=2):
+        params = {'limit': limit}
+        if since:
+            params['since'] = since
+        response = self.client.get('/api/sales/sync/', params)
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def test_pagina_sin_repetir_ni_saltar_filas_con_la_misma_fecha(self):
+        vistos, paginas, cursor = [], 0, None
+        while True:
+            data = self.sincronizar(cursor)
+            vistos += [p['id'] for p in data['productos']]
+            cursor, paginas = data['cursor'], paginas + 1
+            if not data['has_more']:
+                break
+
+        self.assertEqual(paginas, 3)
+        self.assertEqual(vistos, sorted(p.id for p in self.productos))
+        self.assertEqual(self.sincronizar(cursor)['productos'], [])
+
+    def test_solo_entrega_cambios_posteriores_al_cursor(self):
+        cursor = self.sincronizar(limit=100)['cursor']
+        Producto.objects.filter(id=self.productos[2].id).update(
+            precio_venta=Decimal('12.00'), fecha_actualizacion=timezone.now() - timedelta(minutes=1)
+        )
+
+        data = self.sincronizar(cursor, limit=100)
+
+        self.assertEqual([(p['id'], p['precio_venta']) for p in data['productos']], [(self.productos[2].id, '12.00')])
+        self.assertEqual(data['categorias'], [])
+
+    def test_no_entrega_filas_mas_nuevas_que_el_margen(self):
+        cursor = self.sincronizar(limit=100)['cursor']
+        # Recién escrita: una transacción más vieja todavía podría confirmar algo anterior
+        Producto.objects.filter(id=self.productos[0].id).update(fecha_actualizacion=timezone.now())
+
+        data = self.sincronizar(cursor, limit=100)
+        self.assertEqual(data['productos'], [])
+
+        Producto.objects.filter(id=self.productos[0].id).update(fecha_actualizacion=timezone.now() - timedelta(minutes=1))
+        data = self.sincronizar(data['cursor'], limit=100)
+        self.assertEqual([p['id'] for p in data['productos']], [self.productos[0].id])
+
+    def test_cursor_invalido_responde_400(self):
+        for cursor in ('no-es-base64!', 'bm8gZXMganNvbg==', 'eyJwcm9kdWN0b3MiOlsibWFsIiwxXX0='):
+            response = self.client.get('/api/sales/sync/', {'since': cursor})
+            self.assertEqual(response.status_code, 400, cursor)
+
+
+class AnomaliasTests(TestCase):
+
+    def setUp(self):
+        patcher = mock.patch('apps.core.db_router.replica_available', return_value=False)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.categoria = Categoria.objects.create(nombre='Audio')
+        self.parlante = Producto.objects.create(nombre='Parlante', precio_venta=Decimal('10.00'), categoria=self.categoria)
+        self.inicio = timezone.localdate() - timedelta(days=60)
+
+    def vender(self, dia, unidades, estado='COMPLETADO'):
+        venta = Venta.objects.create(estado=estado)
+        DetalleVenta.objects.create(
+            venta=venta, producto=self.parlante, nombre_producto='Parlante',
+            cantidad=unidades, precio_unitario=Decimal('10.00'),
+        )
+        fecha = timezone.make_aware(datetime.combine(self.inicio + timedelta(days=dia), time(12)))
+        Venta.objects.filter(id=venta.id).update(fecha_creacion=fecha)
+
+    def test_marca_el_dia_que_se_aleja_de_la_mediana(self):
+        for dia in range(VENTANA):
+            self.vender(dia, 10 + dia % 2)
+        self.vender(VENTANA, 40)
+        # Las canceladas no cuentan
+        self.vender(VENTANA, 500, estado='CANCELADO')
+
+        resultado = detectar_anomalias(hoy=self.inicio + timedelta(days=VENTANA + 1))
+
+        self.assertEqual(resultado['desde'], self.inicio + timedelta(days=VENTANA))
+        self.assertEqual((resultado['series'], resultado['anomalias']), (2, 2))
+        anomalias = {
+            (a.tipo, a.serie_id): (a.fecha, a.unidades, a.esperado, a.direccion)
+            for a in AnomaliaVenta.objects.all()
+        }
+        dia = self.inicio + timedelta(days=VENTANA)
+        self.assertEqual(anomalias, {
+            (AnomaliaVenta.PRODUCTO, self.parlante.id): (dia, 40, 10.5, AnomaliaVenta.ALZA),
+            (AnomaliaVenta.CATEGORIA, self.categoria.id): (dia, 40, 10.5, AnomaliaVenta.ALZA),
+        })
+        self.assertEqual(AnomaliaVenta.objects.get(tipo=AnomaliaVenta.PRODUCTO).nombre, 'Parlante')
+
+    def test_es_incremental(self):
+        for dia in range(VENTANA + 1):
+            self.vender(dia, 10)
+        hoy = self.inicio + timedelta(days=VENTANA + 1)
+        detectar_anomalias(hoy=hoy)
+
+        self.assertEqual(detectar_anomalias(hoy=hoy)['desde'], None)
+        self.vender(VENTANA + 1, 1)
+        resultado = detectar_anomalias(hoy=hoy + timedelta(days=1))
+
+        self.assertEqual((resultado['desde'], resultado['hasta']), (hoy, hoy))
+        self.assertEqual(AnomaliaVenta.objects.get(tipo=AnomaliaVenta.PRODUCTO).direccion, AnomaliaVenta.BAJA)
+        self.assertEqual(DeteccionAnomalias.objects.count(), 2)
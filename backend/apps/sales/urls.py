@@ -1,13 +1,15 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 from .views import VentaViewSet, ReportGeneratorViewSet # <-- 1. IMPORTA EL NUEVO VIEWSET
-from .views import VentaViewSet, ReportGeneratorViewSet, DashboardViewSet
+from .views import VentaViewSet, ReportGeneratorViewSet, DashboardViewSet, SyncViewSet, AnomaliaVentaViewSet
 
 router = DefaultRouter()
 router.register(r'ventas', VentaViewSet, basename='venta')
 # --- 👇 2. AÑADE ESTA LÍNEA ---
 router.register(r'reportes', ReportGeneratorViewSet, basename='reporte') 
+router.register(r'dashboard/anomalias', AnomaliaVentaViewSet, basename='anomalia')
 router.register(r'dashboard', DashboardViewSet, basename='dashboard')
+router.register(r'sync', SyncViewSet, basename='sync')
 
 
 urlpatterns = [
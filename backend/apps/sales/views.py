@@ -20,17 +20,23 @@ from apps.users.models import User
 from django.db.models.functions import TruncMonth
 
 
-from .models import Venta, DetalleVenta
-from .serializers import VentaSerializer, VentaCreateSerializer
+from .models import AnomaliaVenta, Venta, DetalleVenta
+from .serializers import AnomaliaVentaSerializer, VentaSerializer, VentaCreateSerializer
 from apps.products.models import Producto
+from apps.products.inventory import StockInsuficiente, descontar_stock, reservar_stock
 from apps.payments.models import Payment
 
 from .ml_model import train_model, predict_future_sales
 
 from .ml_model import get_filtered_data, predict_dynamic # Importa las nuevas funciones
 from django.db.models import F
+from apps.core.idempotency import idempotente
+from apps.core.mixins import ConditionalGetMixin, ReplicaReadMixin
+from . import sync
+from .events import publicar_ventas
+from .ingest import MAX_LOTE, ingerir_ventas
 
-class VentaViewSet(viewsets.ReadOnlyModelViewSet):
+class VentaViewSet(ConditionalGetMixin, viewsets.ReadOnlyModelViewSet):
     """
     API endpoint que permite a los usuarios ver sus Notas de Venta.
     """
@@ -44,10 +50,12 @@ class VentaViewSet(viewsets.ReadOnlyModelViewSet):
         return Venta.objects.filter(usuario=self.request.user).order_by('-fecha_creacion')
 
     @action(detail=False, methods=['post'], url_path='crear-desde-carrito')
+    @idempotente('checkout')
     @transaction.atomic
     def crear_desde_carrito(self, request):
         """
         Crea una Venta, sus Detalles, y un Pago a partir de un carrito.
+        Con la cabecera Idempotency-Key los reintentos devuelven la misma venta.
         """
         serializer = VentaCreateSerializer(data=request.data)
         if not serializer.is_valid():
@@ -89,7 +97,8 @@ class VentaViewSet(viewsets.ReadOnlyModelViewSet):
             user=user,
             amount=total_calculado,
             method=payment_method,
-            status=payment_status
+            status=payment_status,
+            transaction_id=(validated_data.get('paypal_order_id') or None) if payment_method == 'paypal' else None
         )
 
         venta_status = 'PROCESANDO'
@@ -108,12 +117,48 @@ class VentaViewSet(viewsets.ReadOnlyModelViewSet):
         
         DetalleVenta.objects.bulk_create(detalles_para_crear)
 
+        # Al final de la transacción: el bloqueo de las filas de stock dura lo mínimo
+        lineas = [(detalle.producto_id, detalle.cantidad) for detalle in detalles_para_crear]
+        try:
+            if payment_status == 'completed':
+                descontar_stock(lineas)
+            else:
+                reservar_stock(payment, lineas)
+        except StockInsuficiente as e:
+            transaction.set_rollback(True)
+            return Response(
+                {'error': 'Stock insuficiente.', 'faltantes': e.faltantes},
+                status=status.HTTP_409_CONFLICT
+            )
+
+        # En la misma transacción: lo que reacciona a la venta corre después (despachar_outbox)
+        publicar_ventas([venta])
+
         return Response(
             VentaSerializer(venta).data, 
             status=status.HTTP_201_CREATED
         )
 
     
+    @action(detail=False, methods=['post'], url_path='lote',
+            permission_classes=[permissions.IsAdminUser])
+    def lote(self, request):
+        """
+        Ingesta de ventas ya realizadas (POS, tiendas sin conexión).
+        Body: { ventas: [{ referencia?, fecha, usuario_id?, payment_method?, items }] }
+        Los carritos sin usuario_id quedan a nombre de quien envía el lote.
+        Devuelve los conteos, la venta de cada carrito y los errores por carrito.
+        """
+        carritos = request.data.get('ventas') if isinstance(request.data, dict) else request.data
+        if not isinstance(carritos, list) or not carritos:
+            return Response({'error': "Se requiere una lista 'ventas'."}, status=status.HTTP_400_BAD_REQUEST)
+        if len(carritos) > MAX_LOTE:
+            return Response(
+                {'error': f'Máximo {MAX_LOTE} ventas por lote.'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        return Response(ingerir_ventas(carritos, usuario=request.user))
+
     # --- Acciones para descargar PDF/Excel de UNA sola venta ---
     @action(detail=True, methods=['get'], url_path='download-pdf')
     def download_pdf(self, request, pk=None):
@@ -203,10 +248,11 @@ class VentaViewSet(viewsets.ReadOnlyModelViewSet):
 # ---     VIEWSET DE REPORTES (CON LAS CORRECCIONES PARA ERROR 500)     ---
 # --- --- --- --- --- --- --- --- --- --- --- --- --- --- --- --- --- --- --- ---
 
-class ReportGeneratorViewSet(viewsets.ViewSet):
+class ReportGeneratorViewSet(ReplicaReadMixin, viewsets.ViewSet):
     """
     API endpoint para la generación dinámica de reportes
     basado en filtros o prompts de voz/texto.
+    Las consultas se leen desde la réplica si está configurada.
     """
     permission_classes = [permissions.IsAuthenticated]
 
@@ -380,9 +426,10 @@ class ReportGeneratorViewSet(viewsets.ViewSet):
             headers={'Content-Disposition': 'attachment; filename="reporte.xlsx"'}
         )
     
-class DashboardViewSet(viewsets.ViewSet):
+class DashboardViewSet(ReplicaReadMixin, viewsets.ViewSet):
     """
     API endpoint para los datos del Dashboard de Ventas e IA.
+    Las consultas se leen desde la réplica si está configurada.
     """
     permission_classes = [permissions.IsAuthenticated]
 
@@ -430,4 +477,52 @@ class DashboardViewSet(viewsets.ViewSet):
         if isinstance(predictions, dict) and 'error' in predictions:
             return Response(predictions, status=status.HTTP_400_BAD_REQUEST)
             
-        return Response(predictions)
\ No newline at end of file
+        return Response(predictions)
+
+
+class AnomaliaVentaViewSet(viewsets.ReadOnlyModelViewSet):
+    """
+    Días con ventas fuera de lo habitual (python manage.py detectar_anomalias).
+    GET /api/sales/dashboard/anomalias/?tipo=producto&direccion=baja&fecha__gte=2025-01-01
+    """
+    queryset = AnomaliaVenta.objects.all()
+    serializer_class = AnomaliaVentaSerializer
+    permission_classes = [permissions.IsAdminUser]
+    filterset_fields = {
+        'tipo': ['exact'],
+        'direccion': ['exact'],
+        'serie_id': ['exact'],
+        'fecha': ['exact', 'gte', 'lte'],
+    }
+    search_fields = ['nombre']
+    ordering_fields = ['fecha', 'puntaje', 'unidades']
+    ordering = ['-fecha', '-puntaje']
+
+
+class SyncViewSet(viewsets.ViewSet):
+    """
+    Sincronización incremental para la app móvil.
+    GET /api/sales/sync/?since=<cursor>&limit=200
+    Devuelve categorías, productos (incluye dados de baja) y ventas propias
+    modificadas desde el cursor, el nuevo 'cursor' y 'has_more'.
+    Sin 'since' se entrega todo desde el inicio, paginado.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def list(self, request):
+        try:
+            limite = int(request.query_params.get('limit', sync.DEFAULT_LIMIT))
+        except ValueError:
+            return Response({'error': 'limit debe ser un número'}, status=status.HTTP_400_BAD_REQUEST)
+        limite = max(1, min(limite, sync.MAX_LIMIT))
+
+        try:
+            data = sync.sincronizar(
+                request.user,
+                cursor=request.query_params.get('since'),
+                limite=limite,
+                context={'request': request},
+            )
+        except sync.CursorInvalido as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(data)
@@ -1,6 +1,6 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
-from .models import User, Rol, Permiso, HistorialUsuario
+from .models import User, Rol, Permiso, HistorialUsuario, SegmentoCliente
 
 @admin.register(Permiso)
 class PermisoAdmin(admin.ModelAdmin):
@@ -65,4 +65,12 @@ class HistorialUsuarioAdmin(admin.ModelAdmin):
     list_filter = ['modulo', 'created_at']
     search_fields = ['usuario__username', 'accion', 'modulo']
     readonly_fields = ['created_at']
-    ordering = ['-created_at']
\ No newline at end of file
+    ordering = ['-created_at']
+
+
+@admin.register(SegmentoCliente)
+class SegmentoClienteAdmin(admin.ModelAdmin):
+    list_display = ['usuario', 'segmento', 'recencia_dias', 'frecuencia', 'monto', 'puntaje_r', 'puntaje_f', 'puntaje_m']
+    list_filter = ['segmento']
+    search_fields = ['usuario__username', 'usuario__email']
+    raw_id_fields = ['usuario']
@@ -0,0 +1,121 @@
+"""
+Totales por cliente: total_compras, ultima_compra y puntos_fidelidad.
+
+Se mantienen de forma incremental con el evento 'venta.completada' del
+outbox (handlers.py): cada venta suma su total y sus puntos con un UPDATE
+con F(), fuera del checkout. Venta.acumulada_en_cliente se marca en la
+misma transacción, así un evento entregado dos veces no suma dos veces.
+
+Los puntos son uno por cada LOYALTY_AMOUNT_PER_POINT Bs. de cada venta,
+más los ajustes manuales (update_points), que quedan en HistorialUsuario.
+
+python manage.py recalcular_clientes los recalcula desde cero con una
+consulta agrupada sobre las ventas completadas.
+"""
+from collections import defaultdict
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import DateTimeField, F, IntegerField, Max, Sum, Value
+from django.db.models.functions import Cast, Coalesce, Floor, Greatest
+from django.utils import timezone
+
+from .models import HistorialUsuario, User
+
+ACCION_AJUSTE_PUNTOS = 'Actualización de puntos'
+
+
+def _monto_por_punto():
+    return Decimal(str(getattr(settings, 'LOYALTY_AMOUNT_PER_POINT', 10)))
+
+
+def puntos_por_venta(total):
+    return int(Decimal(total) // _monto_por_punto())
+
+
+def acumular_venta(venta_id, using='default'):
+    """
+    Suma una venta completada a los totales de su cliente. Devuelve False
+    si ya estaba sumada (o no corresponde sumarla).
+    """
+    from apps.sales.models import Venta
+
+    with transaction.atomic(using=using):
+        marcada = Venta.objects.using(using).filter(
+            pk=venta_id, estado='COMPLETADO', acumulada_en_cliente=False, usuario__isnull=False
+        ).update(acumulada_en_cliente=True)
+        if not marcada:
+            return False
+
+        venta = Venta.objects.using(using).filter(pk=venta_id).values('usuario_id', 'total', 'fecha_creacion').get()
+        fecha = Value(venta['fecha_creacion'], output_field=DateTimeField())
+        User.objects.using(using).filter(pk=venta['usuario_id']).update(
+            total_compras=F('total_compras') + venta['total'],
+            puntos_fidelidad=F('puntos_fidelidad') + puntos_por_venta(venta['total']),
+            ultima_compra=Greatest(Coalesce('ultima_compra', fecha), fecha),
+            updated_at=timezone.now(),
+        )
+    return True
+
+
+def _ajustes_manuales(using):
+    ajustes = defaultdict(int)
+    for usuario_id, detalles in HistorialUsuario.objects.using(using).filter(
+        accion=ACCION_AJUSTE_PUNTOS
+    ).values_list('usuario_id', 'detalles'):
+        try:
+            ajustes[usuario_id] += int((detalles or {}).get('puntos_anadidos', 0))
+        except (TypeError, ValueError):
+            continue
+    return ajustes
+
+
+def recalcular_clientes(using='default'):
+    """
+    Recalcula los totales de todos los clientes desde las ventas
+    completadas. Devuelve la cantidad de usuarios corregidos.
+    """
+    from apps.sales.models import Venta
+
+    with transaction.atomic(using=using):
+        # Primero se marcan: las que se completen durante el recálculo quedan
+        # sin marcar y las suma su evento, no esta consulta
+        Venta.objects.using(using).filter(estado='COMPLETADO', acumulada_en_cliente=False).update(
+            acumulada_en_cliente=True
+        )
+        totales = {
+            fila['usuario_id']: fila
+            for fila in Venta.objects.using(using)
+            .filter(estado='COMPLETADO', acumulada_en_cliente=True, usuario__isnull=False)
+            .order_by()
+            .values('usuario_id')
+            .annotate(
+                suma=Sum('total'),
+                ultima=Max('fecha_creacion'),
+                puntos=Sum(Cast(Floor(F('total') / Value(_monto_por_punto())), IntegerField())),
+            )
+        }
+        ajustes = _ajustes_manuales(using)
+
+        ahora = timezone.now()
+        corregidos = []
+        for usuario in User.objects.using(using).select_for_update().only(
+            'id', 'total_compras', 'ultima_compra', 'puntos_fidelidad'
+        ):
+            fila = totales.get(usuario.id, {})
+            total = fila.get('suma') or Decimal('0.00')
+            ultima = fila.get('ultima')
+            puntos = (fila.get('puntos') or 0) + ajustes.get(usuario.id, 0)
+            if (usuario.total_compras, usuario.ultima_compra, usuario.puntos_fidelidad) != (total, ultima, puntos):
+                usuario.total_compras = total
+                usuario.ultima_compra = ultima
+                usuario.puntos_fidelidad = puntos
+                # bulk_update no aplica auto_now
+                usuario.updated_at = ahora
+                corregidos.append(usuario)
+
+        User.objects.using(using).bulk_update(
+            corregidos, ['total_compras', 'ultima_compra', 'puntos_fidelidad', 'updated_at'], batch_size=500
+        )
+    return len(corregidos)
@@ -0,0 +1,9 @@
+"""Manejadores del outbox (apps.core.outbox) de la app de usuarios."""
+from apps.core.outbox import manejador
+
+from .customers import acumular_venta
+
+
+@manejador('venta.completada')
+def sumar_venta_al_cliente(evento):
+    acumular_venta(evento.payload['venta_id'])
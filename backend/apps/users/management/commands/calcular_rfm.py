@@ -0,0 +1,33 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from apps.users.rfm import calcular_rfm
+
+
+class Command(BaseCommand):
+    help = 'Recalcula la segmentación RFM (recencia, frecuencia, monto) de los clientes'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--fecha-referencia', help='Fecha ISO desde la que se mide la recencia (por defecto, ahora)')
+
+    def handle(self, *args, **options):
+        fecha = None
+        if options['fecha_referencia']:
+            fecha = parse_datetime(options['fecha_referencia'])
+            if fecha is None:
+                raise CommandError('Fecha de referencia inválida')
+            if timezone.is_naive(fecha):
+                fecha = timezone.make_aware(fecha)
+
+        inicio = time.perf_counter()
+        segmentos = calcular_rfm(fecha)
+        duracion = time.perf_counter() - inicio
+
+        for segmento, total in segmentos.items():
+            self.stdout.write(f"  {segmento}: {total}")
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ {sum(segmentos.values())} clientes segmentados en {duracion:.1f}s"
+        ))
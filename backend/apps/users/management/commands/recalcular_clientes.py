@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from apps.users.customers import recalcular_clientes
+
+
+class Command(BaseCommand):
+    help = 'Recalcula total_compras, ultima_compra y puntos_fidelidad de todos los clientes desde sus ventas'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', default='default')
+
+    def handle(self, *args, **options):
+        corregidos = recalcular_clientes(using=options['database'])
+        self.stdout.write(self.style.SUCCESS(f"✅ {corregidos} clientes con totales corregidos"))
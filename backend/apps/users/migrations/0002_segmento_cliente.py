@@ -0,0 +1,34 @@
+# Generated by Django 5.2.7 on 2026-10-19 15:59
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SegmentoCliente',
+            fields=[
+                ('usuario', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='segmento', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('recencia_dias', models.PositiveIntegerField()),
+                ('frecuencia', models.PositiveIntegerField()),
+                ('monto', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('puntaje_r', models.PositiveSmallIntegerField()),
+                ('puntaje_f', models.PositiveSmallIntegerField()),
+                ('puntaje_m', models.PositiveSmallIntegerField()),
+                ('segmento', models.CharField(max_length=30)),
+                ('fecha_calculo', models.DateTimeField()),
+            ],
+            options={
+                'verbose_name': 'Segmento de cliente',
+                'verbose_name_plural': 'Segmentos de clientes',
+                'indexes': [models.Index(fields=['segmento', '-monto'], name='users_segme_segment_cece0b_idx')],
+            },
+        ),
+    ]
@@ -162,4 +162,36 @@ class HistorialUsuario(models.Model):
         ordering = ['-created_at']
     
     def __str__(self):
-        return f"{self.usuario.username} - {self.accion} - {self.created_at}"
\ No newline at end of file
+        return f"{self.usuario.username} - {self.accion} - {self.created_at}"
+
+class SegmentoCliente(models.Model):
+    """
+    Segmento RFM (recencia, frecuencia, monto) de un cliente con compras.
+    La tabla se regenera completa con: python manage.py calcular_rfm
+    """
+    usuario = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='segmento'
+    )
+    recencia_dias = models.PositiveIntegerField()
+    frecuencia = models.PositiveIntegerField()
+    monto = models.DecimalField(max_digits=12, decimal_places=2)
+    # Puntajes por quintil: 5 es lo mejor (más reciente, más frecuente, más gasto)
+    puntaje_r = models.PositiveSmallIntegerField()
+    puntaje_f = models.PositiveSmallIntegerField()
+    puntaje_m = models.PositiveSmallIntegerField()
+    segmento = models.CharField(max_length=30)
+    fecha_calculo = models.DateTimeField()
+
+    class Meta:
+        verbose_name = 'Segmento de cliente'
+        verbose_name_plural = 'Segmentos de clientes'
+        indexes = [
+            # Listado por segmento, de mayor a menor gasto
+            models.Index(fields=['segmento', '-monto']),
+        ]
+
+    def __str__(self):
+        return f"{self.usuario_id}: {self.segmento} ({self.puntaje_r}{self.puntaje_f}{self.puntaje_m})"
@@ -0,0 +1,116 @@
+"""
+Segmentación RFM de clientes (recencia, frecuencia, monto).
+
+Los agregados por cliente salen de una sola consulta agrupada sobre las
+ventas completadas; los puntajes por quintil (1 a 5) y el segmento se
+calculan vectorizados con pandas/NumPy, sin recorrer usuario por usuario.
+El resultado reemplaza completa la tabla SegmentoCliente.
+
+Los empates (por ejemplo, todos los clientes con una sola compra) reciben
+el mismo puntaje.
+"""
+import numpy as np
+import pandas as pd
+from django.db import transaction
+from django.db.models import Count, Max, Sum
+from django.utils import timezone
+
+from apps.core.db_router import use_replica
+
+from .models import SegmentoCliente
+
+QUINTILES = 5
+BATCH_SIZE = 5000
+
+# Se evalúan en orden: el primero que se cumple define el segmento
+SEGMENTOS = [
+    ('campeones', lambda r, f, m, frecuencia: (r >= 4) & (f >= 4) & (m >= 4)),
+    ('leales', lambda r, f, m, frecuencia: (r >= 3) & (f >= 4)),
+    ('nuevos', lambda r, f, m, frecuencia: (r >= 4) & (frecuencia == 1)),
+    ('potenciales', lambda r, f, m, frecuencia: r >= 3),
+    ('en_riesgo', lambda r, f, m, frecuencia: (r <= 2) & (f >= 3)),
+    ('perdidos', lambda r, f, m, frecuencia: r == 1),
+]
+SEGMENTO_DEFAULT = 'hibernando'
+
+
+@use_replica()
+def _agregados():
+    """(usuario_id, ultima_compra, frecuencia, monto) por cliente, en una consulta."""
+    from apps.sales.models import Venta
+
+    filas = (
+        Venta.objects.filter(estado='COMPLETADO', usuario__isnull=False)
+        .order_by()
+        .values('usuario_id')
+        .annotate(ultima=Max('fecha_creacion'), frecuencia=Count('id'), monto=Sum('total'))
+        .values_list('usuario_id', 'ultima', 'frecuencia', 'monto')
+    )
+    return pd.DataFrame.from_records(
+        filas.iterator(chunk_size=BATCH_SIZE),
+        columns=['usuario_id', 'ultima', 'frecuencia', 'monto'],
+    )
+
+
+def _puntaje(serie, ascendente=True):
+    """Quintil de cada valor (1..5) según su percentil."""
+    percentil = serie.rank(method='average', pct=True, ascending=ascendente)
+    return np.clip(np.ceil(percentil * QUINTILES), 1, QUINTILES).astype(np.int16)
+
+
+def puntuar(df, fecha_referencia):
+    """Agrega al DataFrame de agregados la recencia, los puntajes y el segmento."""
+    ultima = pd.to_datetime(df['ultima'], utc=True)
+    df['recencia_dias'] = (pd.Timestamp(fecha_referencia) - ultima).dt.days.clip(lower=0).astype(np.int64)
+
+    # Menos días desde la última compra es mejor: el ranking va al revés
+    df['puntaje_r'] = _puntaje(df['recencia_dias'], ascendente=False)
+    df['puntaje_f'] = _puntaje(df['frecuencia'])
+    df['puntaje_m'] = _puntaje(df['monto'].astype(float))
+
+    r, f, m = df['puntaje_r'], df['puntaje_f'], df['puntaje_m']
+    df['segmento'] = np.select(
+        [condicion(r, f, m, df['frecuencia']) for _, condicion in SEGMENTOS],
+        [nombre for nombre, _ in SEGMENTOS],
+        default=SEGMENTO_DEFAULT,
+    )
+    return df
+
+
+def calcular_rfm(fecha_referencia=None):
+    """
+    Recalcula los segmentos de todos los clientes con compras. Devuelve
+    {segmento: cantidad_de_clientes}.
+    """
+    fecha_referencia = fecha_referencia or timezone.now()
+    df = _agregados()
+
+    if not df.empty:
+        df = puntuar(df, fecha_referencia)
+
+    columnas = ['usuario_id', 'recencia_dias', 'frecuencia', 'monto', 'puntaje_r', 'puntaje_f', 'puntaje_m', 'segmento']
+    with transaction.atomic():
+        SegmentoCliente.objects.all().delete()
+        if not df.empty:
+            # Se arma por lotes para no tener todos los objetos en memoria a la vez
+            for inicio in range(0, len(df), BATCH_SIZE):
+                lote = df.iloc[inicio:inicio + BATCH_SIZE]
+                SegmentoCliente.objects.bulk_create([
+                    SegmentoCliente(
+                        usuario_id=usuario_id,
+                        recencia_dias=int(recencia),
+                        frecuencia=int(frecuencia),
+                        monto=monto,
+                        puntaje_r=int(r),
+                        puntaje_f=int(f),
+                        puntaje_m=int(m),
+                        segmento=segmento,
+                        fecha_calculo=fecha_referencia,
+                    )
+                    for usuario_id, recencia, frecuencia, monto, r, f, m, segmento
+                    in lote[columnas].itertuples(index=False, name=None)
+                ])
+
+    if df.empty:
+        return {}
+    return {segmento: int(total) for segmento, total in df['segmento'].value_counts().items()}
@@ -1,6 +1,6 @@
 from rest_framework import serializers
 from django.contrib.auth.password_validation import validate_password
-from .models import User, Rol, Permiso, HistorialUsuario
+from .models import User, Rol, Permiso, HistorialUsuario, SegmentoCliente
 
 class PermisoSerializer(serializers.ModelSerializer):
     class Meta:
@@ -103,6 +103,20 @@ class HistorialUsuarioSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'created_at']
 
 
+class SegmentoClienteSerializer(serializers.ModelSerializer):
+    username = serializers.CharField(source='usuario.username', read_only=True)
+    email = serializers.CharField(source='usuario.email', read_only=True)
+    nombre_completo = serializers.CharField(source='usuario.nombre_completo', read_only=True)
+
+    class Meta:
+        model = SegmentoCliente
+        fields = [
+            'usuario', 'username', 'email', 'nombre_completo',
+            'segmento', 'recencia_dias', 'frecuencia', 'monto',
+            'puntaje_r', 'puntaje_f', 'puntaje_m', 'fecha_calculo'
+        ]
+
+
 class UserLoginSerializer(serializers.Serializer):
     username = serializers.CharField()
     password = serializers.CharField()
\ No newline at end of file
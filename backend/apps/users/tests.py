@@ -1,3 +1,127 @@
+from datetime import timedelta
+from decimal import Decimal
+from unittest import mock
+
 from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from apps.core.outbox import despachar_lote
+from apps.products.models import Categoria, Producto
+from apps.sales.models import Venta
+from .customers import acumular_venta, recalcular_clientes
+from .models import SegmentoCliente, User
+from .rfm import calcular_rfm
+
+
+class TotalesClienteTests(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user('cliente', 'cliente@test.com', 'clave123')
+        categoria = Categoria.objects.create(nombre='Audio')
+        self.producto = Producto.objects.create(nombre='Parlante', precio_venta=Decimal('125.00'), categoria=categoria)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def comprar(self, payment_method='cash'):
+        response = self.client.post('/api/sales/ventas/crear-desde-carrito/', {
+            'items': [{'producto_id': self.producto.id, 'cantidad': 1}],
+            'payment_method': payment_method,
+        }, format='json')
+        self.assertEqual(response.status_code, 201)
+        return Venta.objects.get(id=response.data['id'])
+
+    def totales(self):
+        self.user.refresh_from_db()
+        return self.user.total_compras, self.user.puntos_fidelidad
+
+    def test_una_venta_completada_suma_al_cliente(self):
+        venta = self.comprar()
+
+        despachar_lote()
+
+        self.assertEqual(self.totales(), (Decimal('125.00'), 12))
+        self.assertEqual(self.user.ultima_compra, venta.fecha_creacion)
+        venta.refresh_from_db()
+        self.assertTrue(venta.acumulada_en_cliente)
+
+    def test_una_venta_guardada_de_nuevo_no_suma_dos_veces(self):
+        venta = self.comprar()
+        despachar_lote()
+
+        venta.save()
+        # El mismo evento entregado otra vez
+        self.assertFalse(acumular_venta(venta.id))
+
+        self.assertEqual(self.totales(), (Decimal('125.00'), 12))
+
+    def test_una_venta_cancelada_no_suma(self):
+        venta = self.comprar(payment_method='paypal')
+        Venta.objects.filter(id=venta.id).update(estado='CANCELADO')
+
+        self.assertFalse(acumular_venta(venta.id))
+        despachar_lote()
+
+        self.assertEqual(self.totales(), (Decimal('0.00'), 0))
+
+    def test_recalcular_descuenta_una_venta_anulada_despues_de_sumarla(self):
+        self.comprar()
+        anulada = self.comprar()
+        despachar_lote()
+        self.assertEqual(self.totales(), (Decimal('250.00'), 24))
+
+        Venta.objects.filter(id=anulada.id).update(estado='CANCELADO')
+
+        self.assertEqual(recalcular_clientes(), 1)
+        self.assertEqual(self.totales(), (Decimal('125.00'), 12))
+
+
+class SegmentacionRFMTests(TestCase):
+
+    def setUp(self):
+        # Sin réplica: las lecturas analíticas van al primario
+        patcher = mock.patch('apps.core.db_router.replica_available', return_value=False)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.ahora = timezone.now()
+
+    def cliente(self, nombre, compras, dias, monto):
+        user = User.objects.create_user(nombre, f'{nombre}@test.com', 'clave123')
+        for i in range(compras):
+            venta = Venta.objects.create(usuario=user, total=Decimal(monto) / compras, estado='COMPLETADO')
+            # La última compra fue hace 'dias' días; las anteriores, antes
+            Venta.objects.filter(id=venta.id).update(fecha_creacion=self.ahora - timedelta(days=dias + i))
+        return user
+
+    def test_puntua_por_quintil_y_asigna_el_segmento(self):
+        campeon = self.cliente('campeon', 5, 1, 500)
+        nuevo = self.cliente('nuevo', 1, 2, 50)
+        potencial = self.cliente('potencial', 2, 30, 100)
+        en_riesgo = self.cliente('en_riesgo', 4, 200, 400)
+        antiguo = self.cliente('antiguo', 3, 300, 300)
+        # Sin compras completadas: no se segmenta
+        Venta.objects.create(usuario=User.objects.create_user('sin_compras', 'sin@test.com', 'clave123'), total=Decimal('80.00'), estado='CANCELADO')
+
+        resultado = calcular_rfm(self.ahora)
+
+        self.assertEqual(resultado, {'campeones': 1, 'nuevos': 1, 'potenciales': 1, 'en_riesgo': 2})
+        segmentos = {
+            s.usuario_id: (s.recencia_dias, s.frecuencia, s.puntaje_r, s.puntaje_f, s.puntaje_m, s.segmento)
+            for s in SegmentoCliente.objects.all()
+        }
+        self.assertEqual(segmentos, {
+            campeon.id: (1, 5, 5, 5, 5, 'campeones'),
+            nuevo.id: (2, 1, 4, 1, 1, 'nuevos'),
+            potencial.id: (30, 2, 3, 2, 2, 'potenciales'),
+            en_riesgo.id: (200, 4, 2, 4, 4, 'en_riesgo'),
+            antiguo.id: (300, 3, 1, 3, 3, 'en_riesgo'),
+        })
+        self.assertEqual(SegmentoCliente.objects.get(usuario=campeon).monto, Decimal('500.00'))
+
+    def test_reemplaza_la_tabla_completa(self):
+        cliente = self.cliente('cliente', 1, 1, 50)
+        calcular_rfm(self.ahora)
+        Venta.objects.filter(usuario=cliente).update(estado='CANCELADO')
 
-# Create your tests here.
+        self.assertEqual(calcular_rfm(self.ahora), {})
+        self.assertFalse(SegmentoCliente.objects.exists())
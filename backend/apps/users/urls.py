@@ -1,12 +1,13 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import UserViewSet, RolViewSet, PermisoViewSet, HistorialUsuarioViewSet
+from .views import UserViewSet, RolViewSet, PermisoViewSet, HistorialUsuarioViewSet, SegmentoClienteViewSet
 
 router = DefaultRouter()
 router.register(r'users', UserViewSet)
 router.register(r'roles', RolViewSet)
 router.register(r'permisos', PermisoViewSet)
 router.register(r'historial', HistorialUsuarioViewSet)
+router.register(r'segmentos', SegmentoClienteViewSet)
 
 urlpatterns = [
     path('', include(router.urls)),
@@ -1,18 +1,23 @@
 from rest_framework import viewsets, status, permissions
 from rest_framework.decorators import action
 from rest_framework.response import Response
-from django.db.models import Q
+from django.db.models import Avg, Count, F, Q
+from django.utils import timezone
 
 # --- 👇 AÑADIDO ---
 from django.contrib.auth import authenticate
 from rest_framework.authtoken.models import Token
 # --- 👆 FIN AÑADIDO ---
 
-from .models import User, Rol, Permiso, HistorialUsuario
+from apps.core.mixins import ConditionalGetMixin
+
+from .customers import ACCION_AJUSTE_PUNTOS
+from .models import User, Rol, Permiso, HistorialUsuario, SegmentoCliente
 from .serializers import (
     UserSerializer, UserCreateSerializer, UserUpdateSerializer,
     UserProfileSerializer, UserLoginSerializer,
-    RolSerializer, PermisoSerializer, HistorialUsuarioSerializer
+    RolSerializer, PermisoSerializer, HistorialUsuarioSerializer,
+    SegmentoClienteSerializer
 )
 
 class PermisoViewSet(viewsets.ModelViewSet):
@@ -50,8 +55,9 @@ class RolViewSet(viewsets.ModelViewSet):
             return Response(serializer.data)
         return Response({"error": "No hay rol por defecto"}, status=404)
 
-class UserViewSet(viewsets.ModelViewSet):
+class UserViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     queryset = User.objects.all()
+    etag_field = 'updated_at'
     serializer_class = UserSerializer
     permission_classes = [permissions.AllowAny]
     filter_fields = ['role', 'ciudad', 'is_active']
@@ -172,12 +178,16 @@ class UserViewSet(viewsets.ModelViewSet):
         
         try:
             puntos = int(puntos)
-            user.puntos_fidelidad += puntos
-            user.save()
+            # UPDATE con F(): no pisa los totales que suma el outbox al mismo tiempo
+            User.objects.filter(pk=user.pk).update(
+                puntos_fidelidad=F('puntos_fidelidad') + puntos,
+                updated_at=timezone.now(),
+            )
+            user.refresh_from_db(fields=['puntos_fidelidad'])
             
             HistorialUsuario.objects.create(
                 usuario=user,
-                accion='Actualización de puntos',
+                accion=ACCION_AJUSTE_PUNTOS,
                 modulo='Fidelidad',
                 detalles={'puntos_anadidos': puntos, 'total_puntos': user.puntos_fidelidad}
             )
@@ -225,4 +235,34 @@ class HistorialUsuarioViewSet(viewsets.ReadOnlyModelViewSet):
     filter_fields = ['modulo', 'usuario']
     search_fields = ['usuario__username', 'accion', 'modulo']
     ordering_fields = ['created_at']
-    ordering = ['-created_at']
\ No newline at end of file
+    ordering = ['-created_at']
+
+
+class SegmentoClienteViewSet(viewsets.ReadOnlyModelViewSet):
+    """
+    Clientes por segmento RFM (python manage.py calcular_rfm).
+    GET /api/users/segmentos/?segmento=campeones&ordering=-monto
+    """
+    queryset = SegmentoCliente.objects.select_related('usuario')
+    serializer_class = SegmentoClienteSerializer
+    permission_classes = [permissions.IsAdminUser]
+    filterset_fields = ['segmento']
+    search_fields = ['usuario__username', 'usuario__email']
+    ordering_fields = ['monto', 'frecuencia', 'recencia_dias']
+    ordering = ['-monto']
+
+    @action(detail=False, methods=['get'])
+    def resumen(self, request):
+        """Cantidad de clientes y promedios por segmento."""
+        filas = (
+            SegmentoCliente.objects.order_by()
+            .values('segmento')
+            .annotate(
+                clientes=Count('usuario'),
+                recencia_promedio=Avg('recencia_dias'),
+                frecuencia_promedio=Avg('frecuencia'),
+                monto_promedio=Avg('monto'),
+            )
+            .order_by('-clientes')
+        )
+        return Response(list(filas))
@@ -0,0 +1,106 @@
+import argparse
+import os
+import sys
+import threading
+import time
+
+import django
+
+# Configurar Django
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'smartsales_config.settings')
+django.setup()
+
+from django.db import OperationalError, connection, transaction
+from django.db.models import F
+
+from apps.products.inventory import StockInsuficiente, descontar_stock
+from apps.products.models import Categoria, Inventario, Producto
+
+
+def checkout_con_bloqueo(producto_id, trabajo_ms):
+    """
+    Estrategia ingenua: SELECT FOR UPDATE al inicio del checkout. El
+    bloqueo se mantiene durante todo el resto del trabajo de la transacción.
+    """
+    with transaction.atomic():
+        inventario = Inventario.objects.select_for_update().get(producto_id=producto_id)
+        time.sleep(trabajo_ms / 1000)  # Venta, detalles, pago...
+        if inventario.stock < 1:
+            raise StockInsuficiente([])
+        Inventario.objects.filter(producto_id=producto_id).update(stock=F('stock') - 1)
+
+
+def checkout_condicional(producto_id, trabajo_ms):
+    """Como el checkout real: el trabajo primero y el UPDATE condicional al final."""
+    with transaction.atomic():
+        time.sleep(trabajo_ms / 1000)
+        descontar_stock([(producto_id, 1)])
+
+
+def correr(estrategia, producto_id, hilos, por_hilo, trabajo_ms):
+    resultados = {'ok': 0, 'sin_stock': 0, 'errores': 0}
+    lock = threading.Lock()
+
+    def worker():
+        for _ in range(por_hilo):
+            try:
+                estrategia(producto_id, trabajo_ms)
+                clave = 'ok'
+            except StockInsuficiente:
+                clave = 'sin_stock'
+            except OperationalError:
+                clave = 'errores'  # p. ej. 'database is locked' en SQLite
+            with lock:
+                resultados[clave] += 1
+        connection.close()
+
+    inicio = time.perf_counter()
+    threads = [threading.Thread(target=worker) for _ in range(hilos)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    resultados['segundos'] = time.perf_counter() - inicio
+    return resultados
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Checkouts concurrentes sobre un único producto popular')
+    parser.add_argument('--hilos', type=int, default=16)
+    parser.add_argument('--por-hilo', type=int, default=20)
+    parser.add_argument('--stock', type=int, default=250, help='Menor que hilos x por-hilo para probar el agotamiento')
+    parser.add_argument('--trabajo-ms', type=float, default=5, help='Resto del trabajo del checkout dentro de la transacción')
+    args = parser.parse_args()
+
+    categoria, _ = Categoria.objects.get_or_create(nombre='Benchmark')
+    producto = Producto.objects.create(nombre='Producto popular (benchmark)', precio_venta=10, categoria=categoria)
+
+    print("🛒 BENCHMARK DE CHECKOUTS CONCURRENTES")
+    print(f"   Motor: {connection.vendor} · {args.hilos} hilos x {args.por_hilo} checkouts · stock inicial {args.stock}")
+    if connection.vendor == 'sqlite':
+        print("   ⚠️ SQLite serializa todas las escrituras: use PostgreSQL para resultados representativos")
+    print("=" * 60)
+
+    try:
+        for nombre, estrategia in [
+            ('SELECT FOR UPDATE al inicio', checkout_con_bloqueo),
+            ('UPDATE condicional al final', checkout_condicional),
+        ]:
+            Inventario.objects.update_or_create(producto=producto, defaults={'stock': args.stock})
+            r = correr(estrategia, producto.id, args.hilos, args.por_hilo, args.trabajo_ms)
+            stock_final = Inventario.objects.get(producto=producto).stock
+            total = r['ok'] + r['sin_stock'] + r['errores']
+            print(f"{nombre}:")
+            print(f"   {r['segundos']:.2f} s · {total / r['segundos']:.0f} checkouts/s · "
+                  f"{r['ok']} vendidos · {r['sin_stock']} sin stock · {r['errores']} errores")
+            consistente = stock_final == args.stock - r['ok'] and stock_final >= 0
+            print(f"   stock final {stock_final} {'✅ consistente' if consistente else '❌ INCONSISTENTE'}")
+    finally:
+        producto.delete()
+        if not categoria.productos.exists():
+            categoria.delete()
+
+
+if __name__ == '__main__':
+    main()
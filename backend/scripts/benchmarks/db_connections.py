@@ -0,0 +1,103 @@
+import argparse
+import os
+import statistics
+import sys
+import time
+
+import django
+
+# Configurar Django
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'smartsales_config.settings')
+django.setup()
+
+from django.core.signals import request_started, request_finished
+from django.db import connection
+
+
+def simulate_requests(n):
+    """
+    Reproduce el ciclo de vida de la conexión de n requests: Django cierra
+    o recicla la conexión en request_started/request_finished según
+    CONN_MAX_AGE, y cada "request" hace una consulta trivial.
+    Devuelve la duración de cada request en milisegundos.
+    """
+    durations = []
+    for _ in range(n):
+        start = time.perf_counter()
+        request_started.send(sender=None)
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT 1')
+            cursor.fetchone()
+        request_finished.send(sender=None)
+        durations.append((time.perf_counter() - start) * 1000)
+    return durations
+
+
+def configure(conn_max_age, pool_options=None):
+    """Reconfigura la conexión 'default' para el modo a medir."""
+    connection.close()
+    if hasattr(connection, 'close_pool'):
+        connection.close_pool()
+    connection.settings_dict['CONN_MAX_AGE'] = conn_max_age
+    options = connection.settings_dict.setdefault('OPTIONS', {})
+    if pool_options:
+        options['pool'] = pool_options
+    else:
+        options.pop('pool', None)
+
+
+def pool_available():
+    if connection.vendor != 'postgresql':
+        return False
+    try:
+        import psycopg_pool  # noqa: F401
+        from django.db.backends.postgresql.psycopg_any import is_psycopg3
+    except ImportError:
+        return False
+    return is_psycopg3
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Costo por request de las conexiones a la BD')
+    parser.add_argument('--requests', type=int, default=500)
+    args = parser.parse_args()
+
+    original = dict(connection.settings_dict)
+    original_options = dict(original.get('OPTIONS') or {})
+    pool_options = original_options.get('pool') or {'min_size': 2, 'max_size': 4}
+
+    modes = [
+        ('Nueva conexión por request (CONN_MAX_AGE=0)', 0, None),
+        ('Persistente + health checks (CONN_MAX_AGE=60)', 60, None),
+    ]
+    if pool_available():
+        modes.append(('Pool psycopg (OPTIONS["pool"])', 0, pool_options))
+
+    print("🔌 BENCHMARK DE CONEXIONES A LA BASE DE DATOS")
+    print(f"   Motor: {connection.vendor} · Host: {original.get('HOST') or '-'} · Requests por modo: {args.requests}")
+    print("=" * 60)
+
+    results = {}
+    for nombre, conn_max_age, pool in modes:
+        configure(conn_max_age, pool)
+        simulate_requests(10)  # Calentamiento
+        durations = simulate_requests(args.requests)
+        results[nombre] = statistics.mean(durations)
+        p95 = statistics.quantiles(durations, n=20)[18]
+        print(f"{nombre}:")
+        print(f"   promedio {results[nombre]:.3f} ms · p95 {p95:.3f} ms")
+
+    baseline = results[modes[0][0]]
+    print("-" * 60)
+    for nombre, promedio in list(results.items())[1:]:
+        ahorro = baseline - promedio
+        print(f"💡 {nombre}: ahorra {ahorro:.3f} ms por request ({ahorro / baseline * 100:.0f}%)")
+
+    # Restaurar la configuración original
+    connection.settings_dict['OPTIONS'] = original_options
+    configure(original['CONN_MAX_AGE'], original_options.get('pool'))
+
+
+if __name__ == '__main__':
+    main()
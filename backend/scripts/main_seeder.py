@@ -7,6 +7,8 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'smartsales_config.settings')
 django.setup()
 
+from django.db import connections
+
 # --- 👇 1. IMPORTAR EL NUEVO SEEDER Y MODELOS ---
 from scripts.seeders import categories, products, users, sales
 from apps.products.models import Producto, Categoria
@@ -85,4 +87,9 @@ def main():
     print("=" * 60)
 
 if __name__ == '__main__':
-    main()
\ No newline at end of file
+    try:
+        main()
+    finally:
+        # Fuera del ciclo request/response nadie devuelve la conexión:
+        # cerrarla explícitamente la libera (o la regresa al pool si DB_POOL=True)
+        connections.close_all()
\ No newline at end of file
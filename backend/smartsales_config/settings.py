@@ -59,6 +59,8 @@ INSTALLED_APPS = [
 AUTH_USER_MODEL = 'users.User'
 
 MIDDLEWARE = [
+    'apps.core.middleware.RequestMetricsMiddleware',  # Primero: mide el request completo
+    'apps.core.middleware.SlowQueryLogMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -67,6 +69,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',  # ✅ DESCOMENTADO
     'django.contrib.messages.middleware.MessageMiddleware',    # ✅ DESCOMENTADO
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'apps.core.middleware.ProfilerMiddleware',  # Al final: perfila solo la vista
 ]
 
 ROOT_URLCONF = 'smartsales_config.urls'
@@ -114,9 +117,42 @@ DATABASES = {
         'PASSWORD': config('DB_PASSWORD', default='1234'),
         'HOST': config('DB_HOST', default='localhost'),
         'PORT': config('DB_PORT', default='5432'),
+        # Conexiones persistentes: se reutilizan entre requests durante
+        # CONN_MAX_AGE segundos y se verifican antes de reutilizarlas.
+        'CONN_MAX_AGE': config('DB_CONN_MAX_AGE', default=60, cast=int),
+        'CONN_HEALTH_CHECKS': config('DB_CONN_HEALTH_CHECKS', default=True, cast=bool),
+        'OPTIONS': {},
     }
 }
 
+# Pool de conexiones nativo de Django 5.1+ (psycopg 3 + psycopg-pool).
+# Con pool, Django exige CONN_MAX_AGE = 0: el pool se encarga de reutilizar.
+DB_POOL = config('DB_POOL', default=False, cast=bool)
+if DB_POOL and DATABASES['default']['ENGINE'] == 'django.db.backends.postgresql':
+    DATABASES['default']['CONN_MAX_AGE'] = 0
+    DATABASES['default']['OPTIONS']['pool'] = {
+        'min_size': config('DB_POOL_MIN_SIZE', default=2, cast=int),
+        'max_size': config('DB_POOL_MAX_SIZE', default=10, cast=int),
+        'timeout': config('DB_POOL_TIMEOUT', default=10, cast=int),
+    }
+
+# Réplica de lectura para reportes/dashboard (opcional). Si DB_REPLICA_HOST
+# está vacío no se define el alias y todo se lee del primario.
+DB_REPLICA_HOST = config('DB_REPLICA_HOST', default='')
+if DB_REPLICA_HOST:
+    DATABASES['replica'] = {
+        **DATABASES['default'],
+        'HOST': DB_REPLICA_HOST,
+        'PORT': config('DB_REPLICA_PORT', default=DATABASES['default']['PORT']),
+        'NAME': config('DB_REPLICA_NAME', default=DATABASES['default']['NAME']),
+        'USER': config('DB_REPLICA_USER', default=DATABASES['default']['USER']),
+        'PASSWORD': config('DB_REPLICA_PASSWORD', default=DATABASES['default']['PASSWORD']),
+        'OPTIONS': dict(DATABASES['default']['OPTIONS']),
+        'TEST': {'MIRROR': 'default'},
+    }
+DB_REPLICA_RECHECK_SECONDS = config('DB_REPLICA_RECHECK_SECONDS', default=30, cast=int)
+DATABASE_ROUTERS = ['apps.core.db_router.AnalyticsReplicaRouter']
+
 
 
 # Password validation - Mantener vacío pero sin comentar
@@ -239,6 +275,89 @@ SECURE_BROWSER_XSS_FILTER = True
 SECURE_CONTENT_TYPE_NOSNIFF = True
 X_FRAME_OPTIONS = 'DENY'
 
+# Cachés: 'default' para uso general y 'catalogo' para las respuestas del
+# catálogo (apps.products.cache). Backends: locmem | file | redis
+# (redis requiere el paquete 'redis'). Por defecto file: la invalidación del
+# catálogo tiene que llegar a todos los procesos (workers, comandos, outbox);
+# locmem solo sirve con un único proceso.
+def _cache_backend(tipo, location):
+    if tipo == 'file':
+        return {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': location}
+    if tipo == 'redis':
+        return {'BACKEND': 'django.core.cache.backends.redis.RedisCache', 'LOCATION': location}
+    return {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': location}
+
+CACHE_BACKEND = config('CACHE_BACKEND', default='file')
+CATALOG_CACHE_BACKEND = config('CATALOG_CACHE_BACKEND', default=CACHE_BACKEND)
+CACHES = {
+    'default': _cache_backend(
+        CACHE_BACKEND,
+        config('CACHE_LOCATION', default=os.path.join(BASE_DIR, 'cache', 'default') if CACHE_BACKEND == 'file' else 'smartsales')
+    ),
+    'catalogo': {
+        **_cache_backend(
+            CATALOG_CACHE_BACKEND,
+            config('CATALOG_CACHE_LOCATION', default=os.path.join(BASE_DIR, 'cache', 'catalogo') if CATALOG_CACHE_BACKEND == 'file' else 'smartsales-catalogo')
+        ),
+        'TIMEOUT': config('CATALOG_CACHE_TIMEOUT', default=600, cast=int),
+        'KEY_PREFIX': 'catalogo',
+    },
+}
+
+# Instrumentación (apps.core.middleware / apps.core.metrics)
+SERVER_TIMING_ENABLED = config('SERVER_TIMING_ENABLED', default=True, cast=bool)
+METRICS_TOKEN = config('METRICS_TOKEN', default='')
+SLOW_QUERY_THRESHOLD_MS = config('SLOW_QUERY_THRESHOLD_MS', default=200, cast=int)
+SLOW_QUERY_MAX_FINGERPRINTS = config('SLOW_QUERY_MAX_FINGERPRINTS', default=500, cast=int)
+PROFILER_SAMPLE_RATE = config('PROFILER_SAMPLE_RATE', default=0.0, cast=float)
+PROFILER_DIR = config('PROFILER_DIR', default=os.path.join(BASE_DIR, 'profiles'))
+PROFILER_MAX_FILES = config('PROFILER_MAX_FILES', default=200, cast=int)
+
+# Sincronización incremental de la app móvil (apps.sales.sync): margen para
+# no saltarse filas de transacciones que aún no se confirmaron
+SYNC_LAG_SECONDS = config('SYNC_LAG_SECONDS', default=2, cast=int)
+
+# Miniaturas de productos (apps.products.images): hilos de fondo y modo
+# síncrono (útil en tests o sin workers)
+IMAGE_WORKERS = config('IMAGE_WORKERS', default=2, cast=int)
+IMAGE_DERIVATIVES_SYNC = config('IMAGE_DERIVATIVES_SYNC', default=False, cast=bool)
+
+# Respuestas guardadas para la cabecera Idempotency-Key (apps.core.idempotency)
+IDEMPOTENCY_TTL_HOURS = config('IDEMPOTENCY_TTL_HOURS', default=24, cast=int)
+
+# Minutos que se reserva el stock de un pago PayPal pendiente (apps.products.inventory)
+STOCK_RESERVATION_MINUTES = config('STOCK_RESERVATION_MINUTES', default=30, cast=int)
+
+# Outbox de eventos de ventas y pagos (apps.core.outbox): tamaño de lote,
+# intentos antes de marcar un evento como fallido, segundos que un lote
+# queda reservado para su despachador y días que se conservan los procesados
+OUTBOX_BATCH_SIZE = config('OUTBOX_BATCH_SIZE', default=100, cast=int)
+OUTBOX_MAX_ATTEMPTS = config('OUTBOX_MAX_ATTEMPTS', default=10, cast=int)
+OUTBOX_LEASE_SECONDS = config('OUTBOX_LEASE_SECONDS', default=300, cast=int)
+OUTBOX_RETENTION_DAYS = config('OUTBOX_RETENTION_DAYS', default=7, cast=int)
+
+# Bs. de compra por cada punto de fidelidad (apps.users.customers)
+LOYALTY_AMOUNT_PER_POINT = config('LOYALTY_AMOUNT_PER_POINT', default=10, cast=int)
+
+# Matriz de co-ocurrencias de "comprados juntos" (apps.products.recommendations)
+RECOMMENDATIONS_MATRIX_PATH = config(
+    'RECOMMENDATIONS_MATRIX_PATH', default=os.path.join(BASE_DIR, 'cache', 'coocurrencias.npz')
+)
+# Procesos para precalcular las recomendaciones por cliente (apps.products.personalized)
+RECOMMENDATIONS_WORKERS = config('RECOMMENDATIONS_WORKERS', default=2, cast=int)
+
+# Desviaciones robustas a partir de las que un día de ventas es anómalo (apps.sales.anomalies)
+ANOMALIES_THRESHOLD = config('ANOMALIES_THRESHOLD', default=3.5, cast=float)
+
+# Pasarela para conciliar los pagos pendientes (apps.payments.gateways), por
+# ejemplo 'apps.payments.gateways.PasarelaPayPal'; vacía, conciliar_pagos no
+# corre. Y horas tras las que un pago que sigue pendiente se cancela
+PAYMENTS_GATEWAY = config('PAYMENTS_GATEWAY', default='')
+PAYMENTS_PENDING_EXPIRY_HOURS = config('PAYMENTS_PENDING_EXPIRY_HOURS', default=24, cast=int)
+PAYPAL_CLIENT_ID = config('PAYPAL_CLIENT_ID', default='')
+PAYPAL_CLIENT_SECRET = config('PAYPAL_CLIENT_SECRET', default='')
+PAYPAL_API_URL = config('PAYPAL_API_URL', default='https://api-m.sandbox.paypal.com')
+
 # Logging configuration
 LOGGING = {
     'version': 1,
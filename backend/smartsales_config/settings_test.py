@@ -0,0 +1,39 @@
+"""
+Settings para correr la suite de tests sin PostgreSQL:
+
+    python manage.py test --settings=smartsales_config.settings_test
+
+Usa dos bases SQLite independientes como primario y réplica para probar
+el router de lectura analítica (apps.core.db_router).
+"""
+from .settings import *  # noqa: F401,F403
+
+DATABASES = {
+    'default': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': BASE_DIR / 'test_default.sqlite3',
+    },
+    'replica': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': BASE_DIR / 'test_replica.sqlite3',
+    },
+}
+
+PASSWORD_HASHERS = ['django.contrib.auth.hashers.MD5PasswordHasher']
+
+# Sin el handler de archivo: los tests no deben escribir en debug.log
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {'null': {'class': 'logging.NullHandler'}},
+    'root': {'handlers': ['null']},
+}
+
+# Miniaturas en el mismo hilo: sin trabajo pendiente al terminar cada test
+IMAGE_DERIVATIVES_SYNC = True
+
+# Cachés en memoria: cada test corre en un solo proceso y no deja archivos
+CACHES = {
+    alias: {**ajustes, 'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': f'test-{alias}'}
+    for alias, ajustes in CACHES.items()
+}
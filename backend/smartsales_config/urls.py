@@ -30,6 +30,7 @@ urlpatterns = [
     path('api/docs/', SpectacularSwaggerView.as_view(url_name='schema'), name='swagger-ui'),
     path('api/', include('apps.payments.urls')),
     path('api/sales/', include('apps.sales.urls')),
+    path('api/core/', include('apps.core.urls')),
 ]
 
 if settings.DEBUG: